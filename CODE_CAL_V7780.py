@@ -1,11 +1,19 @@
 import streamlit as st
-from openai import OpenAI
-import sqlite3
-from fpdf import FPDF
-import base64
-from io import BytesIO
-import re
+import copy
+import hmac
+import itertools
 import os
+import re
+import sys
+import time
+import uuid
+import numpy as np
+
+# openai, pandas, altair, fpdf y Pillow tardan en importarse y la primera
+# pantalla no los usa: se importan en las funciones que los necesitan
+from calculadora import db, deudas, graficos, ia, libro, metricas, montecarlo, plan_local, reporte, retiro, sesiones, trabajos
+from calculadora import perfil as perfil_inversion
+from calculadora.moneda import format_currency, parse_currency
 
 # Configuración inicial de la página
 st.set_page_config(
@@ -15,317 +23,270 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Configuración del cliente de OpenAI
-client = None
-if 'OPENAI_API_KEY' in st.secrets:
+MOSTRAR_TIEMPOS = os.environ.get("CALCULADORA_TIEMPOS", "") not in ("", "0")
+# Con esta clave, ?admin=<clave> en la URL muestra las métricas del proceso
+ADMIN_CLAVE = os.environ.get("CALCULADORA_ADMIN_CLAVE", "")
+
+# Semilla fija: la misma persona ve los mismos resultados en cada re-ejecución
+SEMILLA_SIMULACION = 2024
+
+# Configuración del cliente de OpenAI: se crea al pedir el primer plan y se
+# comparte entre sesiones y re-ejecuciones
+@st.cache_resource
+def obtener_cliente_openai(api_key):
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+def cliente_openai():
+    return obtener_cliente_openai(st.secrets["OPENAI_API_KEY"])
+
+# Métricas en formato Prometheus (/metrics) en su propio puerto, una vez por
+# proceso
+@st.cache_resource
+def iniciar_servidor_metricas():
+    if not metricas.PUERTO:
+        return None
     try:
-        client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-        st.session_state['openai_configured'] = True
-    except Exception as e:
-        st.error(f"Error al configurar OpenAI: {str(e)}")
-        st.session_state['openai_configured'] = False
-else:
+        return metricas.servir(metricas.PUERTO)
+    except OSError as e:
+        print(f"No se pudo abrir /metrics en el puerto {metricas.PUERTO}: {e}", file=sys.stderr)
+        return None
+
+iniciar_servidor_metricas()
+
+st.session_state['openai_configured'] = 'OPENAI_API_KEY' in st.secrets
+if not st.session_state['openai_configured']:
     st.warning("Funcionalidad de IA limitada - No se configuró OPENAI_API_KEY")
-    st.session_state['openai_configured'] = False
 
-# Estilos CSS personalizados
+# Estilos CSS personalizados (static/estilos.css)
+RUTA_ESTATICOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+@st.cache_resource
+def cargar_estilos():
+    # Se lee y compacta una sola vez por proceso; cada ejecución sólo reenvía
+    # el bloque ya compactado
+    with open(os.path.join(RUTA_ESTATICOS, "estilos.css"), encoding="utf-8") as archivo:
+        css = archivo.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+@metricas.medido("Estilos CSS")
 def load_css():
-    st.markdown("""
-    <style>
-        :root {
-            --azul-oscuro: #1E3A8A;
-            --gris: #6B7280;
-            --blanco: #FFFFFF;
-            --verde: #10B981;
-            --rojo: #EF4444;
-        }
-        
-        .stApp {
-            max-width: 900px;
-            margin: auto;
-            font-family: 'Arial', sans-serif;
-            background-color: #F9FAFB;
-        }
-        
-        .header-container {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 20px;
-        }
-        
-        .logo {
-            height: 80px;
-            border-radius: 10px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }
-        
-        .calculator-container {
-            background-color: white;
-            border-radius: 10px;
-            padding: 20px;
-            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-            margin-bottom: 20px;
-            border: 1px solid #E5E7EB;
-        }
-        
-        .stButton>button {
-            background-color: var(--azul-oscuro);
-            color: white;
-            border-radius: 8px;
-            padding: 10px 24px;
-            font-weight: bold;
-            width: 100%;
-            transition: all 0.3s ease;
-        }
-        
-        .stButton>button:hover {
-            background-color: #1E40AF;
-            transform: translateY(-2px);
-            box-shadow: 0 4px 8px rgba(30, 58, 138, 0.2);
-        }
-        
-        .stTextInput>div>div>input, 
-        .stNumberInput>div>div>input,
-        .stSelectbox>div>div>select,
-        .stMultiselect>div>div>div {
-            border-radius: 8px;
-            border: 1px solid var(--gris);
-            padding: 10px;
-        }
-        
-        .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {
-            color: var(--azul-oscuro);
-        }
-        
-        .positive-value {
-            color: var(--verde);
-            font-weight: bold;
-        }
-        
-        .negative-value {
-            color: var(--rojo);
-            font-weight: bold;
-        }
-        
-        .help-icon {
-            display: inline-flex;
-            align-items: center;
-            cursor: pointer;
-            margin-left: 5px;
-        }
-        
-        .help-text {
-            display: none;
-            position: absolute;
-            background-color: white;
-            border: 1px solid var(--gris);
-            padding: 10px;
-            border-radius: 5px;
-            z-index: 100;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.2);
-            width: 250px;
-            left: 20px;
-            top: 0;
-        }
-        
-        .help-icon:hover .help-text {
-            display: block;
-        }
-        
-        @media (max-width: 768px) {
-            .header-container {
-                flex-direction: column;
-                text-align: center;
-            }
-            
-            .logo {
-                margin-bottom: 15px;
-            }
-        }
-        
-        /* Estilos para la tabla de ejemplo */
-        .example-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 10px 0;
-            font-size: 0.9em;
-        }
-        
-        .example-table th, .example-table td {
-            padding: 8px 12px;
-            text-align: left;
-            border-bottom: 1px solid #ddd;
-        }
-        
-        .example-table th {
-            background-color: #f2f2f2;
-            font-weight: bold;
-        }
-        
-        .example-table tr:nth-child(even) {
-            background-color: #f9f9f9;
-        }
-        
-        .example-table tr:hover {
-            background-color: #f1f1f1;
-        }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(cargar_estilos(), unsafe_allow_html=True)
 
 # Funciones utilitarias
-def format_currency(value):
-    return f"${value:,.2f}" if value else "$0.00"
+def registrar_tiempo(ambito, inicio):
+    # Guarda la duración de la última ejecución de cada ámbito, la suma a las
+    # métricas del proceso y la muestra si CALCULADORA_TIEMPOS está activo
+    duracion = (time.perf_counter() - inicio) * 1000
+    metricas.observar(ambito, duracion / 1000)
+    st.session_state.setdefault('tiempos_ejecucion', {})[ambito] = duracion
+    if MOSTRAR_TIEMPOS:
+        st.caption(f"⏱️ {ambito}: {duracion:.1f} ms")
 
-def parse_currency(currency_str):
-    if not currency_str:
-        return 0.0
-    num_str = re.sub(r'[^\d.]', '', currency_str)
-    return float(num_str) if num_str else 0.0
+# Datos de la sesión: libros y datos del reporte viven en un registro del
+# proceso que archiva en SQLite las sesiones inactivas (calculadora.sesiones);
+# st.session_state sólo guarda el identificador
+@st.cache_resource
+def obtener_registro_sesiones():
+    return sesiones.RegistroSesiones()
 
-def emoji_help_tooltip(text, emoji="🧠"):
-    st.markdown(f"""
-    <span class="help-icon">
-        {emoji}
-        <span class="help-text">{text}</span>
-    </span>
-    """, unsafe_allow_html=True)
+def sesion():
+    if 'id_sesion' not in st.session_state:
+        st.session_state['id_sesion'] = uuid.uuid4().hex
+    return obtener_registro_sesiones().obtener(st.session_state['id_sesion'])
 
-# Funciones de base de datos
-def crear_base_datos():
-    conn = sqlite3.connect('usuarios.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT,
-            edad INTEGER,
-            email TEXT,
-            telefono TEXT
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS finanzas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            usuario_id INTEGER,
-            ingresos_mensuales REAL,
-            gastos_mensuales REAL,
-            activos_totales REAL,
-            pasivos_totales REAL,
-            FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
+def mostrar_memoria_sesiones():
+    registro = obtener_registro_sesiones()
+    estadisticas = registro.estadisticas()
+    st.caption(
+        f"💾 Esta sesión: {registro.tamano_sesion(st.session_state['id_sesion']) / 1024:.1f} KB · "
+        f"{estadisticas['activas']} sesiones en memoria ({estadisticas['bytes_por_sesion'] / 1024:.1f} KB por sesión) · "
+        f"{estadisticas['archivadas']} archivadas en SQLite ({estadisticas['bytes_archivadas'] / 1024:.1f} KB)"
+    )
+
+def mostrar_metricas():
+    # p50/p95 de cada etapa en todas las sesiones del proceso
+    with st.expander("📊 Métricas del proceso", expanded=True):
+        st.dataframe(
+            metricas.obtener_metricas().etapas(),
+            hide_index=True,
+            column_config={
+                "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+                "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+                "max_ms": st.column_config.NumberColumn("máx (ms)", format="%.1f"),
+                "total_s": st.column_config.NumberColumn("total (s)", format="%.2f")
+            }
         )
-    ''')
-    conn.commit()
-    conn.close()
+        contadores = metricas.obtener_metricas().contadores()
+        if contadores:
+            st.caption(" · ".join(
+                f"{c['nombre']}{''.join(f' {v}' for v in c['etiquetas'].values())}: {c['total']:,}"
+                for c in contadores
+            ))
+        if metricas.PUERTO:
+            st.caption(f"Formato Prometheus en http://<servidor>:{metricas.PUERTO}/metrics")
+
+def es_admin():
+    return bool(ADMIN_CLAVE) and hmac.compare_digest(st.query_params.get("admin", ""), ADMIN_CLAVE)
+
+# Partidas de activos, pasivos y flujo de caja
+ACTIVOS_ITEMS = [
+    {"nombre": "Inmueble 1", "help": "Valor de mercado de tu primera propiedad"},
+    {"nombre": "Inmueble 2", "help": "Valor de mercado de tu segunda propiedad"},
+    {"nombre": "Automóvil 1", "help": "Valor actual de tu vehículo principal"},
+    {"nombre": "Automóvil 2", "help": "Valor actual de tu segundo vehículo"},
+    {"nombre": "Muebles", "help": "Valor estimado de muebles y enseres"},
+    {"nombre": "Joyas", "help": "Valor estimado de joyas y artículos de valor"},
+    {"nombre": "Arte", "help": "Valor estimado de obras de arte y colecciones"},
+    {"nombre": "Efectivo cuenta 1", "help": "Saldo disponible en tu cuenta principal"},
+    {"nombre": "Efectivo cuenta 2", "help": "Saldo disponible en cuentas secundarias"},
+    {"nombre": "Deudas por cobrar", "help": "Dinero que te deben otras personas o empresas"},
+    {"nombre": "Bonos o títulos valores", "help": "Valor de tus inversiones financieras"},
+    {"nombre": "Fondo de retiro", "help": "Saldo acumulado en fondos de pensiones"},
+    {"nombre": "Bonos o derechos laborales", "help": "Valor de prestaciones laborales"}
+]
+
+PASIVOS_ITEMS = [
+    {"nombre": "Tarjeta de crédito 1", "help": "Saldo pendiente en tu tarjeta principal"},
+    {"nombre": "Tarjeta de crédito 2", "help": "Saldo pendiente en tarjetas secundarias"},
+    {"nombre": "Tarjeta de crédito 3", "help": "Otras deudas con tarjetas de crédito"},
+    {"nombre": "Otra deuda 1", "help": "Préstamos personales o de consumo"},
+    {"nombre": "Otra deuda 2", "help": "Préstamos estudiantiles o educativos"},
+    {"nombre": "Otra deuda 3", "help": "Otras obligaciones financieras"},
+    {"nombre": "Otros", "help": "Cualquier otra deuda no clasificada"}
+]
 
+INGRESOS_ITEMS = [
+    "Ingresos mensuales adulto 1",
+    "Ingresos mensuales adulto 2",
+    "Otros ingresos"
+]
+
+GASTOS_ITEMS = [
+    "Gasto de Inmueble 1",
+    "Gasto de Inmueble 2",
+    "Alimentación",
+    "Educación",
+    "Transporte",
+    "Salud",
+    "Entretenimiento",
+    "Servicios públicos",
+    "Seguros",
+    "Otros gastos"
+]
+
+# Columnas adicionales de los pasivos para el plan de pago de deudas
+CAMPOS_PASIVOS = ("valor", "deuda", "tasa", "pago_minimo")
+
+# Libros de partidas: cada tabla actualiza sólo las partidas que cambian
+def inicializar_libro(clave, nombres, signo=1, campos=libro.CAMPOS):
+    datos = sesion()
+    if clave not in datos:
+        datos[clave] = libro.Libro(nombres, signo, campos)
+    return datos[clave]
+
+def clave_editor(clave_libro):
+    # Clave fija: la tabla no se vuelve a montar al editar, así que no se
+    # pierden el foco ni la posición de desplazamiento
+    return f"editor_{clave_libro}"
+
+def aplicar_ediciones(clave_libro, clave, columnas):
+    # edited_rows acumula todas las celdas editadas desde que se montó la
+    # tabla; volver a aplicar las anteriores deja el libro igual
+    libro_ = sesion()[clave_libro]
+    nombres = libro_.nombres()
+    for fila, cambios in st.session_state[clave]["edited_rows"].items():
+        for columna, monto in cambios.items():
+            if columna in columnas:
+                libro_.actualizar(nombres[int(fila)], columnas[columna], monto or 0.0)
+
+def tabla_libro(clave_libro, columnas, con_neto=True):
+    # Una sola tabla editable por sección en lugar de un campo por partida
+    import pandas as pd
+    
+    libro_ = sesion()[clave_libro]
+    nombres = libro_.nombres()
+    datos = pd.DataFrame({"Descripción": nombres})
+    config = {"Descripción": st.column_config.TextColumn(disabled=True)}
+    for columna, campo in columnas.items():
+        datos[columna] = libro_.columna(campo)
+        if campo == "tasa":
+            config[columna] = st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=0.01, format="%.2f%%")
+        else:
+            config[columna] = st.column_config.NumberColumn(min_value=0.0, step=0.01, format="$%.2f")
+    if con_neto:
+        datos["Neto ($)"] = [libro_.neto(nombre) for nombre in nombres]
+        config["Neto ($)"] = st.column_config.NumberColumn(disabled=True, format="$%.2f")
+    
+    clave = clave_editor(clave_libro)
+    st.data_editor(
+        datos,
+        key=clave,
+        column_config=config,
+        hide_index=True,
+        width="stretch",
+        on_change=aplicar_ediciones,
+        args=(clave_libro, clave, columnas)
+    )
+
+def ayuda_partidas(items):
+    with st.expander("🧠 ¿Qué va en cada partida?"):
+        st.markdown("\n".join(f"- **{item['nombre']}**: {item['help']}" for item in items))
+
+# Funciones de base de datos
 def registrar_usuario(nombre, edad, email, telefono):
     if edad < 18:
         st.warning("Debes ser mayor de 18 años para usar este programa.")
         return None
-    conn = sqlite3.connect('usuarios.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO usuarios (nombre, edad, email, telefono)
-        VALUES (?, ?, ?, ?)
-    ''', (nombre, edad, email, telefono))
-    usuario_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return usuario_id
+    return db.insertar_usuario(nombre, edad, email, telefono)
 
-# Funciones de análisis financiero
-def analizar_proyeccion_retiro(edad_actual, edad_retiro, ingresos_retiro, gastos_retiro, ahorros_retiro, patrimonio_neto, flujo_caja):
-    años_ahorro = edad_retiro - edad_actual
-    necesidad_total = (ingresos_retiro - gastos_retiro) * (100 - edad_retiro)
-    ahorro_necesario_anual = (necesidad_total - ahorros_retiro) / años_ahorro if años_ahorro > 0 else 0
-    
-    if patrimonio_neto > 50000 and flujo_caja > 1000:
-        nivel = "Alto"
-        recomendaciones = [
-            "Tienes un excelente perfil para comenzar a invertir en bienes raíces de inmediato.",
-            "Considera propiedades generadoras de ingresos pasivos como apartamentos en arriendo o locales comerciales."
-        ]
-        cursos_recomendados = ["Curso Avanzado de Inversión en Bienes Raíces"]
-    elif patrimonio_neto > 20000 and flujo_caja > 500:
-        nivel = "Medio"
-        recomendaciones = [
-            "Tienes potencial para inversión en bienes raíces, pero necesitas mejorar tu flujo de caja.",
-            "Considera comenzar con propiedades pequeñas o co-inversiones."
-        ]
-        cursos_recomendados = ["Curso Intermedio de Bienes Raíces"]
-    else:
-        nivel = "Bajo"
-        recomendaciones = [
-            "Necesitas fortalecer tu situación financiera antes de invertir en bienes raíces.",
-            "Enfócate en aumentar tus ingresos y reducir deudas."
-        ]
-        cursos_recomendados = ["Curso Básico de Educación Financiera para Bienes Raíces"]
-    
-    return {
-        "años_ahorro": años_ahorro,
-        "necesidad_total": necesidad_total,
-        "ahorro_necesario_anual": ahorro_necesario_anual,
-        "nivel_inversion": nivel,
-        "analisis": f"""
-        Proyección de Retiro con Enfoque en Bienes Raíces:
-        - Años hasta el retiro: {años_ahorro}
-        - Necesidad total estimada: {format_currency(necesidad_total)}
-        - Ahorros actuales: {format_currency(ahorros_retiro)}
-        - Necesitas ahorrar aproximadamente {format_currency(ahorro_necesario_anual)} anuales para alcanzar tu meta.
-        
-        Perfil de Inversión: {nivel}
-        
-        Recomendaciones Específicas:
-        {"\n".join(recomendaciones)}
-        
-        Cursos Recomendados:
-        {"\n".join(cursos_recomendados)}
-        """
-    }
+def partidas_libros():
+    partidas = []
+    for categoria, clave in (("activo", "libro_activos"), ("pasivo", "libro_pasivos"),
+                             ("ingreso", "libro_ingresos"), ("gasto", "libro_gastos")):
+        if clave in sesion():
+            for nombre, valor, deuda in sesion()[clave].partidas():
+                # Las partidas en cero no aportan al reporte ni a la base de datos
+                if valor or deuda:
+                    partidas.append((categoria, nombre, valor, deuda))
+    return partidas
 
-def analizar_situacion_financiera(ingresos, gastos, activos, pasivos):
-    flujo_caja_mensual = ingresos - gastos
-    patrimonio_neto = activos - pasivos
-    
-    if patrimonio_neto > 50000 and flujo_caja_mensual > 1000:
-        perfil = "Alto (70-100%)"
-        descripcion = "Excelente perfil para inversión en bienes raíces. Tienes la capacidad financiera para comenzar a invertir en propiedades generadoras de ingresos pasivos."
-        recomendaciones = mostrar_recomendacion_curso(
-            "🚀 Recomendación para tu Perfil Alto",
-            "Mentoría Avanzada en Tiendas Online",
-            "https://landing.carlosdevis.com/mentoria-tienda-online",
-            [
-                "Estrategias avanzadas de escalamiento",
-                "Automatización de procesos",
-                "Fuentes alternativas de ingreso"
-            ]
-        )
-    elif patrimonio_neto > 20000 and flujo_caja_mensual > 500:
-        perfil = "Medio (40-69%)"
-        descripcion = "Buen potencial para inversión en bienes raíces. Considera comenzar con propiedades pequeñas o co-inversiones mientras mejoras tu flujo de caja."
-        recomendaciones = mostrar_recomendacion_curso(
-            "📈 Recomendación para tu Perfil Medio",
-            "Programa Avanzado en Tiendas Online",
-            "https://landing.carlosdevis.com/cv-avanzado-tienda-online",
-            [
-                "Modelos de negocio probados",
-                "Tácticas de conversión",
-                "Fuentes de tráfico escalables"
-            ]
-        )
-    else:
-        perfil = "Bajo (0-39%)"
-        descripcion = "Necesitas fortalecer tu situación financiera antes de invertir en bienes raíces. Enfócate en aumentar ingresos, reducir deudas y ahorrar."
-        recomendaciones = mostrar_recomendacion_curso(
-            "📚 Recomendación para tu Perfil Bajo",
-            "Programa Avanzado en Tiendas Online",
-            "https://landing.carlosdevis.com/cv-avanzado-tienda-online",
-            [
-                "Fundamentos sólidos",
-                "Gestión financiera básica",
-                "Primeros pasos en digital"
-            ]
+def deudas_pasivos():
+    # [(nombre, saldo, tasa anual %, pago mínimo)] de los pasivos con saldo
+    libro_pasivos = sesion()['libro_pasivos']
+    return [(nombre, libro_pasivos.monto(nombre, "deuda"), libro_pasivos.monto(nombre, "tasa"),
+             libro_pasivos.monto(nombre, "pago_minimo"))
+            for nombre in libro_pasivos.nombres() if libro_pasivos.monto(nombre, "deuda") > 0]
+
+def guardar_finanzas(usuario_id, finanzas):
+    if usuario_id is None:
+        return
+    try:
+        db.guardar_finanzas(
+            usuario_id, finanzas['ingresos'], finanzas['gastos'],
+            finanzas['activos'], finanzas['pasivos'], finanzas.get('partidas', [])
         )
+    except Exception as e:
+        st.error(f"Error al guardar tus datos financieros: {str(e)}")
+
+# Funciones de análisis financiero
+@metricas.medido("Análisis financiero")
+def analizar_situacion_financiera(ingresos, gastos, activos, pasivos):
+    calificacion = perfil_inversion.calificar(ingresos, gastos, activos, pasivos)
+    flujo_caja_mensual = calificacion['flujo_caja']
+    patrimonio_neto = calificacion['patrimonio']
+    perfil = calificacion['perfil']
+    descripcion = calificacion['descripcion']
+    recomendacion = calificacion['recomendacion']
+    recomendaciones = mostrar_recomendacion_curso(
+        recomendacion['titulo'],
+        recomendacion['curso'],
+        recomendacion['enlace'],
+        recomendacion['tips']
+    )
     
     # Mostrar métricas
     st.subheader("📊 Análisis Resumen de tu Situación Financiera")
@@ -369,19 +330,7 @@ def analizar_situacion_financiera(ingresos, gastos, activos, pasivos):
     return {
         "flujo_caja": flujo_caja_mensual,
         "patrimonio": patrimonio_neto,
-        "perfil_inversion": {"nivel": perfil, "descripcion": descripcion},
-        "resumen": f"""
-        Situación Financiera Actual:
-        - Ingresos Mensuales: {format_currency(ingresos)}
-        - Gastos Mensuales: {format_currency(gastos)}
-        - Flujo de Caja: {format_currency(flujo_caja_mensual)} ({'Positivo' if flujo_caja_mensual > 0 else 'Negativo'})
-        - Activos Totales: {format_currency(activos)}
-        - Pasivos Totales: {format_currency(pasivos)}
-        - Patrimonio Neto: {format_currency(patrimonio_neto)} ({'Positivo' if patrimonio_neto > 0 else 'Negativo'})
-        
-        Perfil de Inversión en Bienes Raíces: {perfil}
-        {descripcion}
-        """
+        "perfil_inversion": {"nivel": perfil, "descripcion": descripcion}
     }
 
 def mostrar_recomendacion_curso(titulo, curso, enlace, tips):
@@ -396,110 +345,341 @@ def mostrar_recomendacion_curso(titulo, curso, enlace, tips):
     3. **{tips[2]}**
     """
 
-def generar_pdf(usuario_data, finanzas_data, analisis_data):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
+# Sin IA (no configurada, con error o con límite de uso) se usa el plan
+# armado localmente con plantillas, que no depende de la red. En la sesión se
+# guarda como None y su texto se vuelve a armar al mostrarlo
+# (plan_local.texto_plan)
+def avisar_plan_local(error):
+    st.warning(f"No se pudo generar el plan con IA ({str(error)}). Te mostramos un plan base calculado con tus datos.")
+
+def mostrar_plan_trabajo(ingresos, gastos, activos, pasivos):
+    # Muestra el plan local al instante y lo reemplaza por el de la IA apenas
+    # llega su primer fragmento; devuelve el texto de la IA, o None si quedó
+    # el plan local
+    base = plan_local.generar_plan(ingresos, gastos, activos, pasivos)
+    espacio = st.empty()
+    espacio.markdown(base)
+    if not st.session_state.get('openai_configured', False):
+        return None
     
-    # Encabezado
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(200, 10, txt="Informe Financiero - Taller de Bienes Raíces", ln=1, align='C')
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(200, 10, txt="Análisis de Inversión en Bienes Raíces", ln=1, align='C')
-    pdf.ln(10)
+    try:
+        fragmentos = ia.generar_plan_stream(cliente_openai(), ingresos, gastos, activos, pasivos)
+        primero = next(fragmentos, None)
+        if primero is None:
+            return None
+        with espacio.container():
+            plan = st.write_stream(itertools.chain([primero], fragmentos))
+        return plan if isinstance(plan, str) else "".join(str(p) for p in plan)
+    except Exception as e:
+        espacio.markdown(base)
+        avisar_plan_local(e)
+        return None
+
+# Los gráficos se dibujan una vez por conjunto de datos y se guardan como PNG;
+# la página y el PDF muestran el mismo archivo
+def mostrar_graficos(seccion):
+    datos = sesion()['reporte_data']
+    for seccion_grafico, ruta in graficos.graficos_reporte(datos['finanzas'], datos['analisis']):
+        if seccion_grafico == seccion:
+            st.image(ruta, width="stretch")
+
+@st.cache_data(max_entries=256)
+def comparar_estrategias_deudas(deudas_, presupuesto, personalizado):
+    return deudas.comparar_estrategias(deudas_, presupuesto, personalizado)
+
+def mostrar_plan_deudas():
+    import pandas as pd
+    
+    finanzas = sesion()['reporte_data']['finanzas']
+    analisis = sesion()['reporte_data']['analisis']
+    lista = finanzas.get('deudas', [])
+    if not lista:
+        analisis.pop('deudas', None)
+        return
+    
+    st.subheader("💳 Plan de pago de deudas")
+    minimos = sum(d[3] for d in lista)
+    sugerido = minimos + max(finanzas['ingresos'] - finanzas['gastos'], 0.0) * plan_local.FRACCION_DEUDAS
+    presupuesto = st.number_input("Pago mensual total para tus deudas ($)", min_value=0.0,
+                                  value=round(sugerido, 2), step=50.0, key="presupuesto_deudas")
+    if presupuesto < minimos:
+        st.warning(f"El pago mensual no cubre los mínimos; se simula con {format_currency(minimos)}.")
+    personalizado = st.multiselect("Tu orden de pago (opcional)", [d[0] for d in lista], key="orden_deudas")
+    
+    comparacion = comparar_estrategias_deudas(tuple(lista), presupuesto, tuple(personalizado))
+    estrategias = comparacion['estrategias']
+    st.dataframe(pd.DataFrame({
+        "Estrategia": [e['nombre'] for e in estrategias.values()],
+        "Meses": [e['meses'] if e['meses'] is not None else "Más de 50 años" for e in estrategias.values()],
+        "Intereses": [format_currency(e['intereses']) for e in estrategias.values()],
+        "Orden de pago": [" → ".join(e['orden']) for e in estrategias.values()]
+    }), hide_index=True, width="stretch")
+    if any(e['meses'] is None for e in estrategias.values()):
+        st.warning("Con este pago mensual algunas deudas no se saldan: los intereses superan lo que abonas.")
+    if comparacion['ordenes_posibles'] > 1 and 'optimo' in estrategias:
+        st.caption(f"El orden óptimo se buscó entre las {comparacion['ordenes_posibles']:,} combinaciones posibles.")
+    largo = max(len(e['saldo_mensual']) for e in estrategias.values())
+    st.line_chart(
+        pd.DataFrame({e['nombre']: e['saldo_mensual'] + [0.0] * (largo - len(e['saldo_mensual']))
+                      for e in estrategias.values()},
+                     index=pd.Index(range(largo), name="Mes")),
+        y_label="Deuda total"
+    )
+    
+    # El PDF sólo necesita el resumen de cada estrategia
+    analisis['deudas'] = {
+        'presupuesto': comparacion['presupuesto'],
+        'total_deuda': comparacion['total_deuda'],
+        'estrategias': {clave: {campo: e[campo] for campo in ('nombre', 'orden', 'meses', 'intereses')}
+                        for clave, e in estrategias.items()}
+    }
+
+EJEMPLO_INMUEBLES = """nombre,precio,arriendo,gastos
+Apartamento centro,180000,1600,350
+Casa norte,240000,1900,520
+Local comercial,150000,1500,300"""
+
+@st.cache_data(max_entries=32)
+def analizar_inmuebles(texto, supuestos, ingresos_mensuales):
+    from calculadora import inmuebles
+    return inmuebles.analizar(inmuebles.leer_texto(texto), dict(supuestos), ingresos_mensuales)
+
+def mostrar_analisis_inmuebles():
+    import pandas as pd
+    from calculadora import inmuebles
     
-    # Datos personales
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(200, 10, txt="Datos Personales:", ln=1)
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Nombre: {usuario_data.get('nombre', '')}", ln=1)
-    pdf.cell(200, 10, txt=f"Edad: {usuario_data.get('edad', '')}", ln=1)
-    pdf.cell(200, 10, txt=f"Email: {usuario_data.get('email', '')}", ln=1)
-    pdf.ln(5)
+    st.markdown("### 🏘️ Analiza propiedades candidatas")
+    st.caption("Pega una tabla (desde Excel o un CSV) con las columnas **precio** y **arriendo** mensual; "
+               "opcionales: nombre, gastos (mensuales), cuota_inicial, tasa, plazo, vacancia y cierre (en %).")
+    texto = st.text_area("Propiedades", placeholder=EJEMPLO_INMUEBLES, height=150, key="texto_inmuebles")
+    col1, col2, col3, col4 = st.columns(4)
+    supuestos = {
+        'cuota_inicial': col1.number_input("Cuota inicial (%)", 0.0, 100.0, inmuebles.SUPUESTOS['cuota_inicial'], 1.0),
+        'tasa': col2.number_input("Tasa del crédito (%)", 0.0, 50.0, inmuebles.SUPUESTOS['tasa'], 0.25),
+        'plazo': col3.number_input("Plazo (años)", 1, 40, inmuebles.SUPUESTOS['plazo']),
+        'vacancia': col4.number_input("Vacancia (%)", 0.0, 100.0, inmuebles.SUPUESTOS['vacancia'], 1.0)
+    }
+    analisis = sesion()['reporte_data']['analisis']
+    if not texto.strip():
+        analisis.pop('inmuebles', None)
+        return
     
-    # Datos financieros
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(200, 10, txt="Situación Financiera:", ln=1)
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Ingresos Mensuales: {format_currency(finanzas_data.get('ingresos', 0))}", ln=1)
-    pdf.cell(200, 10, txt=f"Gastos Mensuales: {format_currency(finanzas_data.get('gastos', 0))}", ln=1)
-    pdf.cell(200, 10, txt=f"Activos Totales: {format_currency(finanzas_data.get('activos', 0))}", ln=1)
-    pdf.cell(200, 10, txt=f"Pasivos Totales: {format_currency(finanzas_data.get('pasivos', 0))}", ln=1)
-    pdf.ln(5)
+    try:
+        resultado = analizar_inmuebles(texto, tuple(supuestos.items()),
+                                       sesion()['reporte_data']['finanzas'].get('ingresos'))
+    except (ValueError, pd.errors.ParserError) as e:
+        st.error(f"No se pudo leer la tabla: {e}")
+        return
     
-    # Perfil de inversión
-    if 'perfil_inversion' in analisis_data:
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(200, 10, txt=f"Perfil de Inversión en Bienes Raíces: {analisis_data['perfil_inversion']['nivel']}", ln=1)
-        pdf.set_font("Arial", size=12)
-        pdf.multi_cell(0, 10, txt=analisis_data['perfil_inversion']['descripcion'])
-        pdf.ln(5)
+    col1, col2 = st.columns(2)
+    col1.metric("Propiedades analizadas", len(resultado))
+    col2.metric(f"Cubren la deuda (DSCR ≥ {inmuebles.DSCR_MINIMO})", int(resultado['viable'].sum()))
+    columnas = ["puesto", "nombre", "precio", "arriendo", "cuota_mensual", "flujo_mensual", "cap_rate",
+                "cash_on_cash", "dscr", "ocupacion_equilibrio", "inversion_inicial"]
+    if 'alcanzable' in resultado.columns:
+        columnas.append("alcanzable")
+    dinero = st.column_config.NumberColumn(format="$%.2f")
+    st.dataframe(resultado[columnas], hide_index=True, width="stretch", column_config={
+        "puesto": "#", "nombre": "Propiedad", "precio": dinero, "arriendo": dinero,
+        "cuota_mensual": st.column_config.NumberColumn("Cuota", format="$%.2f"),
+        "flujo_mensual": st.column_config.NumberColumn("Flujo mensual", format="$%.2f"),
+        "cap_rate": st.column_config.NumberColumn("Cap rate", format="percent"),
+        "cash_on_cash": st.column_config.NumberColumn("Cash on cash", format="percent"),
+        "dscr": st.column_config.NumberColumn("DSCR", format="%.2f"),
+        "ocupacion_equilibrio": st.column_config.NumberColumn("Ocupación de equilibrio", format="percent"),
+        "inversion_inicial": st.column_config.NumberColumn("Efectivo inicial", format="$%.2f"),
+        "alcanzable": st.column_config.CheckboxColumn(f"Cuota ≤ {inmuebles.CUOTA_MAXIMA_INGRESOS:.0%} de tus ingresos")
+    })
     
-    # Análisis
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(200, 10, txt="Análisis y Recomendaciones:", ln=1)
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, txt=analisis_data.get('resumen', ''))
-    pdf.ln(5)
+    puesto = st.selectbox("Ver la amortización del crédito de", resultado['puesto'].head(20),
+                          format_func=lambda p: f"{p}. {resultado['nombre'].iloc[p - 1]}")
+    fila = resultado.iloc[puesto - 1]
+    tabla = inmuebles.amortizacion(fila['prestamo'], fila['tasa'], fila['plazo'])
+    if fila['prestamo'] > 0 and len(tabla):
+        anual = tabla.groupby((tabla['mes'] - 1) // 12 + 1).agg(
+            interes=('interes', 'sum'), abono_capital=('abono_capital', 'sum'))
+        anual.index.name = "Año"
+        st.caption(f"Crédito de {format_currency(fila['prestamo'])}: cuota de {format_currency(tabla['cuota'].iloc[0])} "
+                   f"al mes durante {len(tabla)} meses, intereses totales de {format_currency(tabla['interes'].sum())}.")
+        st.bar_chart(anual.rename(columns={'interes': "Intereses", 'abono_capital': "Abono a capital"}),
+                     y_label="Pagado en el año")
     
-    # Plan de trabajo
-    if 'plan_trabajo' in analisis_data:
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(200, 10, txt="Plan de Trabajo Personalizado:", ln=1)
-        pdf.set_font("Arial", size=12)
-        pdf.multi_cell(0, 10, txt=analisis_data['plan_trabajo'])
+    analisis['inmuebles'] = inmuebles.resumen(resultado)
+
+def mostrar_sensibilidad_retiro(edad_actual, edad_retiro, necesidad_anual, ahorros_retiro, rendimiento, inflacion):
+    import altair as alt
     
-    # Generar el PDF en memoria
-    pdf_output = BytesIO()
-    pdf.output(pdf_output)
-    pdf_bytes = pdf_output.getvalue()
-    pdf_output.close()
+    edades = np.arange(max(edad_actual + 1, edad_retiro - 10), min(100, edad_retiro + 10) + 1)
+    rendimientos = np.round(np.arange(max(rendimiento - 0.05, 0.0), rendimiento + 0.0501, 0.01), 4)
+    tabla = retiro.tabla_sensibilidad(edad_actual, ahorros_retiro, necesidad_anual, edades, rendimientos, inflacion)
     
-    return pdf_bytes
+    st.subheader("📊 Sensibilidad: ahorro anual necesario")
+    st.caption(f"Para retirar {format_currency(necesidad_anual)} al año hasta los 100, según tu edad de retiro y el "
+               f"rendimiento de tus inversiones, con inflación de {inflacion:.1%} anual (en dinero de hoy).")
+    datos = tabla.reset_index().melt(id_vars="Edad de retiro", var_name="Rendimiento anual", value_name="Ahorro anual")
+    mapa = alt.Chart(datos).mark_rect().encode(
+        x=alt.X("Rendimiento anual:O", sort=list(tabla.columns)),
+        y=alt.Y("Edad de retiro:O"),
+        color=alt.Color("Ahorro anual:Q", scale=alt.Scale(scheme="redyellowgreen", reverse=True)),
+        tooltip=["Edad de retiro", "Rendimiento anual", alt.Tooltip("Ahorro anual:Q", format="$,.0f")]
+    )
+    st.altair_chart(mapa, width="stretch")
+    with st.expander("Ver tabla de sensibilidad"):
+        st.dataframe(tabla.style.format(format_currency))
 
-def generar_plan_trabajo(ingresos, gastos, activos, pasivos):
-    if not st.session_state.get('openai_configured', False):
-        return "Servicio de IA no disponible. Configura tu clave de OpenAI API para habilitar esta función."
+def mostrar_simulacion_retiro(edad_actual, edad_retiro, ahorros_retiro, aporte_anual, necesidad_anual, renta_anual, rendimiento, inflacion):
+    import pandas as pd
+    
+    with st.spinner('Simulando escenarios...'):
+        simulacion = montecarlo.simular_retiro(
+            edad_actual, edad_retiro, ahorros_retiro, aporte_anual, necesidad_anual,
+            renta_anual=renta_anual, semilla=SEMILLA_SIMULACION,
+            rendimiento=rendimiento, inflacion=inflacion
+        )
+    
+    st.subheader("🎲 Simulación de escenarios")
+    st.caption(f"{simulacion['rutas']:,} escenarios de rendimiento, inflación y ocupación de tus inmuebles. "
+               f"Ahorras tu flujo de caja actual ({format_currency(aporte_anual)} al año) hasta los {edad_retiro} años "
+               f"y desde ahí retiras {format_currency(necesidad_anual)} al año, como en la proyección; la renta de tus "
+               f"inmuebles ({format_currency(renta_anual)} al año) se suma cada año según la ocupación.")
+    col1, col2 = st.columns(2)
+    col1.metric("Probabilidad de no agotar tus ahorros", f"{simulacion['probabilidad_exito']:.0%}")
+    col2.metric("Ahorro a la edad de retiro (mediana)", format_currency(simulacion['saldo_retiro'][50]))
+    st.line_chart(
+        pd.DataFrame({"Probabilidad de haber agotado los ahorros": simulacion['prob_agotado']},
+                     index=pd.Index(simulacion['edades'], name="Edad")),
+        y_label="Probabilidad"
+    )
+
+# Secciones del presupuesto como fragmentos: editar un campo re-ejecuta sólo
+# su sección, no la página completa
+@st.fragment
+def seccion_activos_pasivos():
+    inicio = time.perf_counter()
+    # Inicializar valores
+    libro_activos = inicializar_libro('libro_activos', [item['nombre'] for item in ACTIVOS_ITEMS])
+    libro_pasivos = inicializar_libro('libro_pasivos', [item['nombre'] for item in PASIVOS_ITEMS], signo=-1, campos=CAMPOS_PASIVOS)
     
-    prompt = f"""
-    Como experto en bienes raíces y finanzas personales, analiza esta situación:
-    - Ingresos: {format_currency(ingresos)}/mes
-    - Gastos: {format_currency(gastos)}/mes
-    - Activos: {format_currency(activos)}
-    - Pasivos: {format_currency(pasivos)}
+    # Tabla de activos
+    st.markdown("### Activos")
+    ayuda_partidas(ACTIVOS_ITEMS)
+    tabla_libro('libro_activos', {"Valor ($)": "valor", "Deuda ($)": "deuda"})
+    activos_total = libro_activos.totales()
     
-    Crea un plan detallado para inversión en bienes raíces que incluya:
-    1. Diagnóstico de la situación actual
-    2. Estrategias para mejorar flujo de caja
-    3. Plan de reducción de deudas
-    4. Recomendaciones de inversión personalizadas
-    5. Metas a corto, mediano y largo plazo
-    6. Ejercicios prácticos
-    7. Recomendaciones de cursos
+    # Tabla de pasivos
+    st.markdown("### Pasivos")
+    ayuda_partidas(PASIVOS_ITEMS)
+    tabla_libro('libro_pasivos', {"Valor ($)": "valor", "Deuda ($)": "deuda",
+                                  "Tasa anual (%)": "tasa", "Pago mínimo ($)": "pago_minimo"})
+    pasivos_total = libro_pasivos.totales()
     
-    Usa lenguaje claro y motivador, con ejemplos concretos.
-    Respuesta en español.
-    """
+    # Mostrar totales
+    st.markdown("### Resumen Financiero")
+    patrimonio_neto = activos_total['neto'] + pasivos_total['neto']
+    
+    st.markdown(f"""
+    - **Total Valor Activos:** {format_currency(activos_total['valor'])}
+    - **Total Deuda Activos:** {format_currency(activos_total['deuda'])}
+    - **Total Activos Netos:** {format_currency(activos_total['neto'])}
+    - **Total Pasivos:** {format_currency(pasivos_total['neto'])}
+    - **Patrimonio Neto:** {format_currency(patrimonio_neto)}
+    """)
     
+    registrar_tiempo("Activos y pasivos", inicio)
+
+@st.fragment
+def seccion_flujo_caja():
+    inicio = time.perf_counter()
+    # Flujo de caja mensual
+    st.subheader("💸 Flujo de Caja Mensual")
+    
+    # Inicializar valores
+    libro_ingresos = inicializar_libro('libro_ingresos', INGRESOS_ITEMS)
+    libro_gastos = inicializar_libro('libro_gastos', GASTOS_ITEMS)
+    
+    # Ingresos
+    st.markdown("#### Ingresos")
+    tabla_libro('libro_ingresos', {"Monto mensual ($)": "valor"}, con_neto=False)
+    ingresos_total = libro_ingresos.total()
+    
+    # Gastos
+    st.markdown("#### Gastos")
+    tabla_libro('libro_gastos', {"Monto mensual ($)": "valor"}, con_neto=False)
+    gastos_total = libro_gastos.total()
+    
+    # Calcular saldo mensual
+    saldo_mensual = ingresos_total - gastos_total
+    st.markdown(f"""
+    **Resumen Flujo de Caja:**
+    - **Total Ingresos:** {format_currency(ingresos_total)}
+    - **Total Gastos:** {format_currency(gastos_total)}
+    - **Saldo Mensual:** {format_currency(saldo_mensual)}
+    """)
+    
+    registrar_tiempo("Flujo de caja", inicio)
+
+# Generación del plan en segundo plano
+@st.cache_resource
+def obtener_gestor_trabajos():
+    return trabajos.GestorTrabajos()
+
+def lanzar_plan_trabajo(ingresos, gastos, activos, pasivos):
+    analisis = sesion()['reporte_data']['analisis']
+    if not st.session_state.get('openai_configured', False):
+        analisis['plan_trabajo'] = None
+        return
+    
+    # El límite por usuario se aplica a la sesión si el usuario no se pudo guardar;
+    # si no, todos los visitantes sin id compartirían el mismo cupo
+    usuario = st.session_state.get('usuario_id')
+    if usuario is None:
+        usuario = f"sesion-{st.session_state['id_sesion']}"
     try:
-        with st.spinner('Generando tu plan personalizado...'):
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Eres un asesor experto en inversión en bienes raíces. Responde en español con enfoque práctico."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-        return response.choices[0].message.content
+        trabajo = obtener_gestor_trabajos().enviar(
+            usuario,
+            ia.generar_plan_stream, cliente_openai(), ingresos, gastos, activos, pasivos
+        )
     except Exception as e:
-        st.error(f"Error al generar el plan: {str(e)}")
-        return "No se pudo generar el plan en este momento."
+        # Límite de solicitudes (TrabajoRechazado) o cliente de OpenAI inválido
+        avisar_plan_local(e)
+        analisis['plan_trabajo'] = None
+        return
+    st.session_state['plan_trabajo_id'] = trabajo.id
+    analisis.pop('plan_trabajo', None)
+
+@st.fragment(run_every=1)
+def mostrar_plan_en_curso():
+    # Se refresca cada segundo sin re-ejecutar el resto de la página; al
+    # terminar el trabajo se re-ejecuta la página completa, que ya muestra el
+    # plan sin este fragmento, y así deja de refrescarse
+    gestor = obtener_gestor_trabajos()
+    trabajo_id = st.session_state.get('plan_trabajo_id')
+    trabajo = gestor.obtener(trabajo_id) if trabajo_id else None
+    finanzas = sesion()['reporte_data']['finanzas']
+    if trabajo is not None and not trabajo.terminado:
+        if trabajo.texto:
+            st.markdown(trabajo.texto)
+        else:
+            st.caption("Plan base calculado con tus datos; tu plan personalizado con IA está en camino...")
+            st.markdown(plan_local.generar_plan(finanzas['ingresos'], finanzas['gastos'], finanzas['activos'], finanzas['pasivos']))
+        return
+    
+    analisis = sesion()['reporte_data']['analisis']
+    if trabajo is not None:
+        if trabajo.error is not None:
+            avisar_plan_local(trabajo.error)
+            analisis['plan_trabajo'] = None
+        else:
+            analisis['plan_trabajo'] = trabajo.texto
+        gestor.descartar(trabajo.id)
+    st.session_state.pop('plan_trabajo_id', None)
+    analisis.setdefault('plan_trabajo', None)
+    st.rerun()
 
 # Interfaz principal
 def main():
+    inicio = time.perf_counter()
     load_css()
-    crear_base_datos()
     
     # Encabezado
     st.markdown("""
@@ -508,7 +688,7 @@ def main():
             <h1 style="margin:0;color:#1E3A8A;">Taller de Bienes Raíces</h1>
             <h3 style="margin:0;color:#6B7280;">Calculadora Financiera para Inversión Inmobiliaria</h3>
         </div>
-        <img src="https://raw.githubusercontent.com/jkarlost/calculadora/main/Logo_TRB-app.jpg" class="logo" alt="Logo">
+        <img src="app/static/Logo_TRB-app.jpg" class="logo" alt="Logo">
     </div>
     
     <div class="calculator-container">
@@ -518,8 +698,8 @@ def main():
     """, unsafe_allow_html=True)
     
     # Inicializar variables de sesión
-    if 'reporte_data' not in st.session_state:
-        st.session_state['reporte_data'] = {'usuario': {}, 'finanzas': {}, 'analisis': {}}
+    if 'reporte_data' not in sesion():
+        sesion()['reporte_data'] = {'usuario': {}, 'finanzas': {}, 'analisis': {}}
     
     # Paso 1: Registro de usuario
     with st.container():
@@ -533,7 +713,7 @@ def main():
             if nombre and email:
                 usuario_id = registrar_usuario(nombre, edad, email, telefono)
                 st.session_state['usuario_id'] = usuario_id
-                st.session_state['reporte_data']['usuario'] = {
+                sesion()['reporte_data']['usuario'] = {
                     'nombre': nombre, 'edad': edad, 'email': email, 'telefono': telefono
                 }
                 st.success("Información guardada correctamente")
@@ -707,6 +887,7 @@ def main():
             2. **Valor**: Valor total del activo o monto total de la deuda
             3. **Deuda**: Para activos, la deuda asociada (ej: hipoteca)
             4. **Neto**: Diferencia entre Valor y Deuda (calculado automáticamente)
+            5. **Tasa anual y Pago mínimo**: Para pasivos, la tasa de interés y la cuota mínima mensual de cada deuda (se usan en el plan de pago de deudas)
             
             Ejemplos:
             - Inmueble: Valor = precio de mercado, Deuda = saldo hipotecario
@@ -714,244 +895,50 @@ def main():
             - Tarjetas: Valor = límite de crédito, Deuda = saldo adeudado
             """)
             
-            # Definir items de activos y pasivos
-            activos_items = [
-                {"nombre": "Inmueble 1", "help": "Valor de mercado de tu primera propiedad"},
-                {"nombre": "Inmueble 2", "help": "Valor de mercado de tu segunda propiedad"},
-                {"nombre": "Automóvil 1", "help": "Valor actual de tu vehículo principal"},
-                {"nombre": "Automóvil 2", "help": "Valor actual de tu segundo vehículo"},
-                {"nombre": "Muebles", "help": "Valor estimado de muebles y enseres"},
-                {"nombre": "Joyas", "help": "Valor estimado de joyas y artículos de valor"},
-                {"nombre": "Arte", "help": "Valor estimado de obras de arte y colecciones"},
-                {"nombre": "Efectivo cuenta 1", "help": "Saldo disponible en tu cuenta principal"},
-                {"nombre": "Efectivo cuenta 2", "help": "Saldo disponible en cuentas secundarias"},
-                {"nombre": "Deudas por cobrar", "help": "Dinero que te deben otras personas o empresas"},
-                {"nombre": "Bonos o títulos valores", "help": "Valor de tus inversiones financieras"},
-                {"nombre": "Fondo de retiro", "help": "Saldo acumulado en fondos de pensiones"},
-                {"nombre": "Bonos o derechos laborales", "help": "Valor de prestaciones laborales"}
-            ]
-            
-            pasivos_items = [
-                {"nombre": "Tarjeta de crédito 1", "help": "Saldo pendiente en tu tarjeta principal"},
-                {"nombre": "Tarjeta de crédito 2", "help": "Saldo pendiente en tarjetas secundarias"},
-                {"nombre": "Tarjeta de crédito 3", "help": "Otras deudas con tarjetas de crédito"},
-                {"nombre": "Otra deuda 1", "help": "Préstamos personales o de consumo"},
-                {"nombre": "Otra deuda 2", "help": "Préstamos estudiantiles o educativos"},
-                {"nombre": "Otra deuda 3", "help": "Otras obligaciones financieras"},
-                {"nombre": "Otros", "help": "Cualquier otra deuda no clasificada"}
-            ]
-            
-            # Inicializar valores
-            if 'activos_values' not in st.session_state:
-                st.session_state['activos_values'] = {item['nombre']: {"valor": 0.0, "deuda": 0.0} for item in activos_items}
-            
-            if 'pasivos_values' not in st.session_state:
-                st.session_state['pasivos_values'] = {item['nombre']: {"valor": 0.0, "deuda": 0.0} for item in pasivos_items}
+            seccion_activos_pasivos()
+            seccion_flujo_caja()
             
-            # Tabla de activos con títulos de columna
-            st.markdown("### Activos")
-            
-            # Encabezados de columna para activos
-            cols = st.columns([3, 1, 1, 1])
-            with cols[0]:
-                st.markdown("**Descripción**")
-            with cols[1]:
-                st.markdown("**Valor ($)**")
-            with cols[2]:
-                st.markdown("**Deuda ($)**")
-            with cols[3]:
-                st.markdown("**Neto ($)**")
-            
-            activos_total = {"valor": 0.0, "deuda": 0.0, "neto": 0.0}
-            
-            for item in activos_items:
-                cols = st.columns([3, 1, 1, 1])
-                
-                with cols[0]:
-                    st.markdown(f"{item['nombre']}", unsafe_allow_html=True)
-                    emoji_help_tooltip(item['help'])
-                
-                valor = cols[1].text_input(
-                    f"Valor {item['nombre']}",
-                    value=format_currency(st.session_state['activos_values'][item['nombre']]['valor']),
-                    key=f"activo_valor_{item['nombre']}",
-                    label_visibility="collapsed"
-                )
-                
-                deuda = cols[2].text_input(
-                    f"Deuda {item['nombre']}",
-                    value=format_currency(st.session_state['activos_values'][item['nombre']]['deuda']),
-                    key=f"activo_deuda_{item['nombre']}",
-                    label_visibility="collapsed"
-                )
-                
-                valor_parsed = parse_currency(valor)
-                deuda_parsed = parse_currency(deuda)
-                neto = valor_parsed - deuda_parsed
-                
-                cols[3].markdown(format_currency(neto))
-                
-                st.session_state['activos_values'][item['nombre']] = {
-                    "valor": valor_parsed,
-                    "deuda": deuda_parsed
-                }
-                
-                activos_total["valor"] += valor_parsed
-                activos_total["deuda"] += deuda_parsed
-                activos_total["neto"] += neto
-            
-            # Tabla de pasivos con títulos de columna
-            st.markdown("### Pasivos")
-            
-            # Encabezados de columna para pasivos
-            cols = st.columns([3, 1, 1, 1])
-            with cols[0]:
-                st.markdown("**Descripción**")
-            with cols[1]:
-                st.markdown("**Valor ($)**")
-            with cols[2]:
-                st.markdown("**Deuda ($)**")
-            with cols[3]:
-                st.markdown("**Neto ($)**")
-            
-            pasivos_total = {"valor": 0.0, "deuda": 0.0, "neto": 0.0}
-            
-            for item in pasivos_items:
-                cols = st.columns([3, 1, 1, 1])
-                
-                with cols[0]:
-                    st.markdown(f"{item['nombre']}", unsafe_allow_html=True)
-                    emoji_help_tooltip(item['help'])
-                
-                valor = cols[1].text_input(
-                    f"Valor {item['nombre']}",
-                    value=format_currency(st.session_state['pasivos_values'][item['nombre']]['valor']),
-                    key=f"pasivo_valor_{item['nombre']}",
-                    label_visibility="collapsed"
-                )
-                
-                deuda = cols[2].text_input(
-                    f"Deuda {item['nombre']}",
-                    value=format_currency(st.session_state['pasivos_values'][item['nombre']]['deuda']),
-                    key=f"pasivo_deuda_{item['nombre']}",
-                    label_visibility="collapsed"
-                )
-                
-                valor_parsed = parse_currency(valor)
-                deuda_parsed = parse_currency(deuda)
-                neto = -(valor_parsed - deuda_parsed)
-                
-                cols[3].markdown(format_currency(neto))
-                
-                st.session_state['pasivos_values'][item['nombre']] = {
-                    "valor": valor_parsed,
-                    "deuda": deuda_parsed
-                }
-                
-                pasivos_total["valor"] += valor_parsed
-                pasivos_total["deuda"] += deuda_parsed
-                pasivos_total["neto"] += neto
-            
-            # Mostrar totales
-            st.markdown("### Resumen Financiero")
-            patrimonio_neto = activos_total['neto'] + pasivos_total['neto']
-            
-            st.markdown(f"""
-            - **Total Valor Activos:** {format_currency(activos_total['valor'])}
-            - **Total Deuda Activos:** {format_currency(activos_total['deuda'])}
-            - **Total Activos Netos:** {format_currency(activos_total['neto'])}
-            - **Total Pasivos:** {format_currency(pasivos_total['neto'])}
-            - **Patrimonio Neto:** {format_currency(patrimonio_neto)}
-            """)
-            
-            # Flujo de caja mensual
-            st.subheader("💸 Flujo de Caja Mensual")
-            
-            # Inicializar valores
-            if 'ingresos_values' not in st.session_state:
-                st.session_state['ingresos_values'] = {
-                    "Ingresos mensuales adulto 1": {"valor": 0.0},
-                    "Ingresos mensuales adulto 2": {"valor": 0.0},
-                    "Otros ingresos": {"valor": 0.0}
-                }
-            
-            if 'gastos_values' not in st.session_state:
-                st.session_state['gastos_values'] = {
-                    "Gasto de Inmueble 1": {"valor": 0.0},
-                    "Gasto de Inmueble 2": {"valor": 0.0},
-                    "Alimentación": {"valor": 0.0},
-                    "Educación": {"valor": 0.0},
-                    "Transporte": {"valor": 0.0},
-                    "Salud": {"valor": 0.0},
-                    "Entretenimiento": {"valor": 0.0},
-                    "Servicios públicos": {"valor": 0.0},
-                    "Seguros": {"valor": 0.0},
-                    "Otros gastos": {"valor": 0.0}
-                }
-            
-            # Ingresos
-            st.markdown("#### Ingresos")
-            ingresos_total = 0.0
-            
-            for item, data in st.session_state['ingresos_values'].items():
-                value = st.text_input(
-                    item,
-                    value=format_currency(data['valor']),
-                    key=f"ingreso_{item}"
-                )
-                parsed_value = parse_currency(value)
-                st.session_state['ingresos_values'][item]['valor'] = parsed_value
-                ingresos_total += parsed_value
-            
-            # Gastos
-            st.markdown("#### Gastos")
-            gastos_total = 0.0
-            
-            for item, data in st.session_state['gastos_values'].items():
-                value = st.text_input(
-                    item,
-                    value=format_currency(data['valor']),
-                    key=f"gasto_{item}"
-                )
-                parsed_value = parse_currency(value)
-                st.session_state['gastos_values'][item]['valor'] = parsed_value
-                gastos_total += parsed_value
-            
-            # Calcular saldo mensual
-            saldo_mensual = ingresos_total - gastos_total
-            st.markdown(f"""
-            **Resumen Flujo de Caja:**
-            - **Total Ingresos:** {format_currency(ingresos_total)}
-            - **Total Gastos:** {format_currency(gastos_total)}
-            - **Saldo Mensual:** {format_currency(saldo_mensual)}
-            """)
+            activos_total = sesion()['libro_activos'].totales()
+            pasivos_total = sesion()['libro_pasivos'].totales()
+            ingresos_total = sesion()['libro_ingresos'].total()
+            gastos_total = sesion()['libro_gastos'].total()
             
             if st.button("Analizar mi situación financiera para bienes raíces"):
                 analisis = analizar_situacion_financiera(
                     ingresos_total, gastos_total, 
                     activos_total['neto'], abs(pasivos_total['neto'])
                 )
-                st.session_state['reporte_data']['finanzas'] = {
+                sesion()['reporte_data']['finanzas'] = {
                     'ingresos': ingresos_total,
                     'gastos': gastos_total,
                     'activos': activos_total['neto'],
-                    'pasivos': abs(pasivos_total['neto'])
+                    'pasivos': abs(pasivos_total['neto']),
+                    'partidas': partidas_libros(),
+                    'deudas': deudas_pasivos()
                 }
-                st.session_state['reporte_data']['analisis'].update({
-                    'resumen': analisis['resumen'],
-                    'perfil_inversion': analisis['perfil_inversion']
-                })
+                guardar_finanzas(st.session_state['usuario_id'], sesion()['reporte_data']['finanzas'])
+                # El perfil y el resumen del reporte se derivan de las cifras al generar el PDF
+                sesion()['reporte_data']['analisis']['analizado'] = True
                 
-                plan = generar_plan_trabajo(
+                lanzar_plan_trabajo(
                     ingresos_total, gastos_total, 
                     activos_total['neto'], abs(pasivos_total['neto'])
                 )
+            
+            if sesion()['reporte_data']['analisis'].get('analizado'):
+                mostrar_graficos("finanzas")
+                mostrar_plan_deudas()
+            
+            # El plan se genera en segundo plano y se muestra al estar listo
+            if 'plan_trabajo_id' in st.session_state:
+                st.subheader("📝 Plan de Trabajo para Inversión en Bienes Raíces")
+                mostrar_plan_en_curso()
+            elif 'plan_trabajo' in sesion()['reporte_data']['analisis']:
                 st.subheader("📝 Plan de Trabajo para Inversión en Bienes Raíces")
-                st.write(plan)
-                st.session_state['reporte_data']['analisis']['plan_trabajo'] = plan
+                st.write(plan_local.texto_plan(sesion()['reporte_data']['analisis'], sesion()['reporte_data']['finanzas']))
     
     # Paso 3: Plan de inversión
-    if 'usuario_id' in st.session_state and 'reporte_data' in st.session_state and 'finanzas' in st.session_state['reporte_data']:
+    if 'usuario_id' in st.session_state and 'reporte_data' in sesion() and 'finanzas' in sesion()['reporte_data']:
         with st.container():
             st.subheader("📈 Plan de Inversión en Bienes Raíces")
             
@@ -981,19 +968,20 @@ def main():
                                        ["Alquiler residencial", "Alquiler comercial", "Rehabilitación y venta", 
                                         "Terrenos", "Remates bancarios", "Rentas vacacionales", "Co-inversiones"])
             
+            mostrar_analisis_inmuebles()
+            
             if st.button("Generar estrategia personalizada"):
-                st.session_state['plan_inversion'] = (objetivos, horizonte, ", ".join(estrategias))
-                ingresos = st.session_state['reporte_data']['finanzas']['ingresos']
-                gastos = st.session_state['reporte_data']['finanzas']['gastos']
-                activos = st.session_state['reporte_data']['finanzas']['activos']
-                pasivos = st.session_state['reporte_data']['finanzas']['pasivos']
+                sesion()['plan_inversion'] = (objetivos, horizonte, ", ".join(estrategias))
+                ingresos = sesion()['reporte_data']['finanzas']['ingresos']
+                gastos = sesion()['reporte_data']['finanzas']['gastos']
+                activos = sesion()['reporte_data']['finanzas']['activos']
+                pasivos = sesion()['reporte_data']['finanzas']['pasivos']
                 
-                analisis_ia = generar_plan_trabajo(ingresos, gastos, activos, pasivos)
-                st.write(analisis_ia)
-                st.session_state['reporte_data']['analisis']['analisis_ia'] = analisis_ia
+                # Reemplaza el plan del paso 2: es el mismo pedido con las mismas cifras
+                sesion()['reporte_data']['analisis']['plan_trabajo'] = mostrar_plan_trabajo(ingresos, gastos, activos, pasivos)
     
     # Paso 4: Plan de retiro
-    if 'usuario_id' in st.session_state and 'reporte_data' in st.session_state and 'finanzas' in st.session_state['reporte_data']:
+    if 'usuario_id' in st.session_state and 'reporte_data' in sesion() and 'finanzas' in sesion()['reporte_data']:
         with st.container():
             st.subheader("👴 Plan de Retiro con Bienes Raíces")
             
@@ -1004,38 +992,73 @@ def main():
             ingresos_retiro = parse_currency(st.text_input("Ingresos anuales esperados durante el retiro ($)", value="$40,000"))
             gastos_retiro = parse_currency(st.text_input("Gastos anuales esperados durante el retiro ($)", value="$30,000"))
             ahorros_retiro = parse_currency(st.text_input("Ahorros actuales para el retiro ($)", value="$10,000"))
+            col1, col2 = st.columns(2)
+            rendimiento_retiro = col1.number_input("Rendimiento anual esperado de tus inversiones (%)", min_value=0.0, max_value=30.0, value=7.0, step=0.5) / 100
+            inflacion_retiro = col2.number_input("Inflación anual esperada (%)", min_value=0.0, max_value=30.0, value=3.0, step=0.5) / 100
+            simular_escenarios = st.checkbox("Incluir simulación de escenarios (Monte Carlo)")
+            if simular_escenarios:
+                renta_retiro = parse_currency(st.text_input("Renta anual de tus inmuebles en arriendo ($)", value="$0"))
             
             if st.button("Calcular proyección de retiro con bienes raíces"):
-                ingresos = st.session_state['reporte_data']['finanzas']['ingresos']
-                gastos = st.session_state['reporte_data']['finanzas']['gastos']
-                activos = st.session_state['reporte_data']['finanzas']['activos']
-                pasivos = st.session_state['reporte_data']['finanzas']['pasivos']
+                ingresos = sesion()['reporte_data']['finanzas']['ingresos']
+                gastos = sesion()['reporte_data']['finanzas']['gastos']
+                activos = sesion()['reporte_data']['finanzas']['activos']
+                pasivos = sesion()['reporte_data']['finanzas']['pasivos']
                 
                 flujo_caja = ingresos - gastos
                 patrimonio_neto = activos - pasivos
+                # El mismo retiro anual en la proyección, la sensibilidad y la simulación
+                necesidad_retiro = retiro.necesidad_anual(ingresos_retiro, gastos_retiro)
                 
-                analisis = analizar_proyeccion_retiro(
+                analisis = retiro.analizar_proyeccion(
                     edad_actual, edad_retiro, 
                     ingresos_retiro, gastos_retiro, 
                     ahorros_retiro, patrimonio_neto, flujo_caja
                 )
-                st.session_state['reporte_data']['analisis']['proyeccion_retiro'] = analisis
-                
-                st.write(analisis['analisis'])
+                proyeccion = retiro.trayectoria(
+                    edad_actual, edad_retiro, ahorros_retiro, max(flujo_caja, 0) * 12,
+                    necesidad_retiro, rendimiento_retiro, inflacion_retiro
+                )
+                analisis['trayectoria'] = {
+                    'edades': proyeccion['edades'].tolist(),
+                    'capital': proyeccion['capital'].tolist(),
+                    'edad_retiro': int(edad_retiro)
+                }
+                # El texto del análisis sólo se muestra; el reporte usa las cifras
+                st.write(analisis.pop('analisis'))
+                sesion()['reporte_data']['analisis']['proyeccion_retiro'] = analisis
+                mostrar_graficos("retiro")
+                st.caption(f"Ahorras {format_currency(max(flujo_caja, 0) * 12)} al año hasta los {edad_retiro} y "
+                           f"desde ahí retiras {format_currency(necesidad_retiro)} al año, con rendimiento de "
+                           f"{rendimiento_retiro:.1%} e inflación de {inflacion_retiro:.1%} (en dinero de hoy).")
+                mostrar_sensibilidad_retiro(
+                    edad_actual, edad_retiro, necesidad_retiro,
+                    ahorros_retiro, rendimiento_retiro, inflacion_retiro
+                )
+                if simular_escenarios:
+                    mostrar_simulacion_retiro(
+                        edad_actual, edad_retiro, ahorros_retiro, max(flujo_caja, 0) * 12,
+                        necesidad_retiro, renta_retiro, rendimiento_retiro, inflacion_retiro
+                    )
     
     # Descargar PDF
-    if 'reporte_data' in st.session_state and st.session_state['reporte_data']['usuario']:
-        if st.button("📄 Descargar Reporte Completo en PDF"):
-            pdf_bytes = generar_pdf(
-                st.session_state['reporte_data']['usuario'],
-                st.session_state['reporte_data']['finanzas'],
-                st.session_state['reporte_data']['analisis']
-            )
-            
-            st.success("Reporte generado con éxito!")
-            b64 = base64.b64encode(pdf_bytes).decode()
-            href = f'<a href="data:application/octet-stream;base64,{b64}" download="reporte_bienes_raices.pdf">Haz clic aquí para descargar</a>'
-            st.markdown(href, unsafe_allow_html=True)
+    if 'reporte_data' in sesion() and sesion()['reporte_data']['usuario']:
+        # El PDF se genera (o se toma de la caché) sólo cuando se hace clic, y
+        # se entrega como archivo, sin base64. La copia de los datos también
+        # se hace en el clic, no en cada rerun.
+        reporte_data = sesion()['reporte_data']
+
+        def pdf_reporte():
+            datos = copy.deepcopy(reporte_data)
+            return reporte.pdf_en_cache(datos['usuario'], datos['finanzas'], datos['analisis'])
+
+        st.download_button(
+            "📄 Descargar Reporte Completo en PDF",
+            data=pdf_reporte,
+            file_name="reporte_bienes_raices.pdf",
+            mime="application/pdf",
+            on_click="ignore"
+        )
     
     # Pie de página
     st.markdown("---")
@@ -1046,6 +1069,12 @@ def main():
     - Asiste a nuestros eventos presenciales y online
     - Comienza con una propiedad pequeña y escala progresivamente
     """)
+    
+    registrar_tiempo("Página completa", inicio)
+    if MOSTRAR_TIEMPOS:
+        mostrar_memoria_sesiones()
+    if MOSTRAR_TIEMPOS or es_admin():
+        mostrar_metricas()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
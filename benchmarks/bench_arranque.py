@@ -0,0 +1,69 @@
+# Tiempo de arranque de la app: importaciones de la primera ejecución
+#
+# Ejecuta CODE_CAL_V7780.py en modo "bare" (sin servidor) con
+# python -X importtime en procesos nuevos y resume el tiempo total, el de
+# las importaciones y los módulos de primer nivel más pesados. Sirve para
+# vigilar que openai, pandas, altair, fpdf y Pillow sigan fuera del arranque.
+# Uso: python benchmarks/bench_arranque.py [--repeticiones 5] [--top 10]
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "CODE_CAL_V7780.py")
+
+# Módulos que la primera pantalla no necesita
+DIFERIDOS = ["openai", "pandas", "altair", "fpdf", "PIL"]
+
+
+def ejecutar(objetivo):
+    # Devuelve (segundos de reloj, {módulo de primer nivel: microsegundos
+    # acumulados}, nombres de todos los módulos importados)
+    with tempfile.TemporaryDirectory(prefix="bench_arranque_") as temporal:
+        entorno = dict(os.environ, CALCULADORA_DB=os.path.join(temporal, "app.db"),
+                       CALCULADORA_GRAFICOS=os.path.join(temporal, "graficos"))
+        inicio = time.perf_counter()
+        proceso = subprocess.run([sys.executable, "-X", "importtime", *objetivo], cwd=RAIZ, env=entorno,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        duracion = time.perf_counter() - inicio
+    modulos = {}
+    todos = set()
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "[us]" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        todos.add(nombre.strip())
+        # Los submódulos vienen sangrados; sólo cuentan los de primer nivel
+        if not nombre.startswith("  "):
+            modulos[nombre.strip()] = int(acumulado)
+    return duracion, modulos, todos
+
+
+def medir(nombre, objetivo, repeticiones):
+    corridas = [ejecutar(objetivo) for _ in range(repeticiones)]
+    duracion, modulos, todos = min(corridas, key=lambda corrida: corrida[0])
+    importaciones = sum(modulos.values()) / 1e6
+    print(f"{nombre:<32} {duracion:6.2f} s en total, {importaciones:6.2f} s importando (mejor de {repeticiones})")
+    return modulos, todos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de CODE_CAL_V7780.py")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    medir("sólo streamlit", ["-c", "import streamlit"], args.repeticiones)
+    modulos, todos = medir("CODE_CAL_V7780.py", [APP], args.repeticiones)
+    print("\nMódulos más pesados:")
+    for nombre, acumulado in sorted(modulos.items(), key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"  {nombre:<36} {acumulado / 1000:8.1f} ms")
+    cargados = [m for m in DIFERIDOS if m in todos]
+    print(f"\nDiferidos cargados al arrancar: {', '.join(cargados) or 'ninguno'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+# Prueba de carga: N sesiones simultáneas contra la app real
+#
+# Levanta `streamlit run CODE_CAL_V7780.py` con una base de datos temporal y
+# benchmarks/servidor_openai.py en lugar de OpenAI (o usa un servidor ya
+# levantado con --url) y abre N sesiones por el websocket de Streamlit
+# (/_stcore/stream, mensajes protobuf BackMsg/ForwardMsg), como el navegador.
+# Cada sesión hace el recorrido completo: abrir la página, registrarse, llenar
+# las partidas, Analizar, esperar el plan de la IA (el fragmento que se
+# refresca cada segundo), calcular la proyección de retiro y descargar el
+# PDF. Las sesiones llegan repartidas en --llegada segundos, como en un
+# webinar en vivo.
+#
+# Informa por paso la cantidad, los errores y los percentiles de latencia,
+# las sesiones completas por segundo y los errores agrupados: excepciones de
+# la app, avisos de falla (por ejemplo "database is locked" de SQLite al
+# guardar), planes que cayeron al plan local, tiempos agotados y
+# desconexiones; los avisos de consejo de la app se cuentan aparte. Si la
+# app levantada por la prueba expone /metrics, agrega las etapas más lentas
+# medidas dentro del servidor.
+# Requiere websockets (pip install -r requirements-dev.txt).
+# Uso: python benchmarks/bench_carga.py --sesiones 50 --llegada 10 [--latencia-openai 2]
+#      [--tasa-errores-openai 0.05] [--url http://127.0.0.1:8501] [--json carga.json]
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "CODE_CAL_V7780.py")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import servidor_openai  # noqa: E402
+
+PASOS = ["abrir", "registro", "partidas", "analizar", "plan_ia", "retiro", "pdf"]
+BOTON_REGISTRO = "Guardar información personal"
+BOTON_ANALIZAR = "Analizar mi situación financiera"
+BOTON_RETIRO = "Calcular proyección de retiro"
+PLAN_EN_CAMINO = "está en camino"
+AVISO_PLAN_LOCAL = "No se pudo generar el plan con IA"
+# st.error que informan una falla (guardar en SQLite, leer una tabla); los
+# demás son consejos sobre las finanzas del usuario
+FALLAS_APP = ("Error al guardar", "No se pudo")
+
+
+class ErrorSesion(Exception):
+    pass
+
+
+class Sesion:
+    # Un navegador: guarda los valores de los widgets y los reenvía en cada
+    # re-ejecución, como hace el frontend de Streamlit
+    def __init__(self, url, timeout):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.ws = None
+        self.session_id = ""
+        self.widgets = {}
+        self.valores = {}
+        self.ediciones = {}
+        self.fragmento = None
+        self.intervalo = 1.0
+        self.textos = []
+        self.errores = []
+        self.avisos = []
+        self._operaciones = 0
+
+    async def abrir(self):
+        ws_url = self.url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None,
+                                           open_timeout=self.timeout, ping_interval=None)
+        await self.ejecutar()
+
+    async def cerrar(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def _estado(self, disparos):
+        mensaje = BackMsg()
+        mensaje.rerun_script.SetInParent()
+        estado = mensaje.rerun_script.widget_states
+        for valor in self.valores.values():
+            estado.widgets.append(valor)
+        for id_widget in disparos:
+            estado.widgets.append(WidgetState(id=id_widget, trigger_value=True))
+        return mensaje
+
+    async def ejecutar(self, disparos=(), fragmento=None):
+        # Re-ejecuta el script (o sólo un fragmento) y lee hasta script_finished
+        mensaje = self._estado(disparos)
+        if fragmento is not None:
+            mensaje.rerun_script.fragment_id = fragmento
+            mensaje.rerun_script.is_auto_rerun = True
+        else:
+            self.widgets = {}
+        self.textos = []
+        self.errores = []
+        self.avisos = []
+        await self.ws.send(mensaje.SerializeToString())
+        await self._leer_hasta(lambda f: f.WhichOneof("type") == "script_finished")
+
+    async def _leer_hasta(self, fin):
+        limite = time.monotonic() + self.timeout
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise asyncio.TimeoutError
+            datos = await asyncio.wait_for(self.ws.recv(), restante)
+            mensaje = ForwardMsg()
+            mensaje.ParseFromString(datos)
+            self._procesar(mensaje)
+            if fin(mensaje):
+                return mensaje
+
+    def _procesar(self, mensaje):
+        tipo = mensaje.WhichOneof("type")
+        if tipo == "new_session":
+            self.session_id = mensaje.new_session.initialize.session_id
+        elif tipo == "auto_rerun":
+            self.fragmento = mensaje.auto_rerun.fragment_id
+            self.intervalo = mensaje.auto_rerun.interval
+        elif tipo == "delta" and mensaje.delta.WhichOneof("type") == "new_element":
+            elemento = mensaje.delta.new_element
+            clase = elemento.WhichOneof("type")
+            contenido = getattr(elemento, clase)
+            if clase == "exception":
+                self.errores.append(f"excepción: {contenido.type}: {contenido.message}")
+            elif clase == "alert":
+                self.textos.append(contenido.body)
+                if contenido.format == contenido.ERROR and contenido.body.startswith(FALLAS_APP):
+                    self.errores.append(f"aviso: {contenido.body}")
+                elif contenido.format == contenido.ERROR:
+                    self.avisos.append(contenido.body)
+            elif clase == "markdown":
+                self.textos.append(contenido.body)
+            if getattr(contenido, "id", ""):
+                self.widgets[contenido.id] = (clase, getattr(contenido, "label", ""), contenido)
+
+    def widget(self, clase, texto):
+        # Primer widget del tipo dado cuyo label empieza por texto o cuyo id
+        # (que incluye la clave) lo contiene
+        for id_widget, (clase_widget, etiqueta, contenido) in self.widgets.items():
+            if clase_widget == clase and (etiqueta.startswith(texto) or texto in id_widget):
+                return id_widget, contenido
+        raise ErrorSesion(f"no se encontró {clase} '{texto}'")
+
+    def escribir(self, etiqueta, valor):
+        id_widget, _ = self.widget("text_input", etiqueta)
+        self.valores[id_widget] = WidgetState(id=id_widget, string_value=valor)
+
+    async def editar(self, clave, filas):
+        # Edición de un st.data_editor: el valor es el JSON de cambios. Como el
+        # navegador, se envían todas las celdas editadas desde que se montó
+        # la tabla, no sólo las últimas
+        id_widget, _ = self.widget("dataframe", clave)
+        editadas = self.ediciones.setdefault(id_widget, {})
+        for fila, celdas in filas.items():
+            editadas.setdefault(fila, {}).update(celdas)
+        cambios = {"edited_rows": editadas, "added_rows": [], "deleted_rows": []}
+        self.valores[id_widget] = WidgetState(id=id_widget, string_value=json.dumps(cambios))
+        await self.ejecutar()
+
+    async def pulsar(self, etiqueta):
+        id_widget, _ = self.widget("button", etiqueta)
+        await self.ejecutar(disparos=[id_widget])
+
+    async def esperar_plan(self, esperado, maximo):
+        # Refresca el fragmento del plan como el navegador, cada intervalo,
+        # hasta que el texto queda completo
+        if self.fragmento is None:
+            return "sin fragmento"
+        anterior = None
+        limite = time.monotonic() + maximo
+        while time.monotonic() < limite:
+            await asyncio.sleep(self.intervalo)
+            await self.ejecutar(fragmento=self.fragmento)
+            if any(AVISO_PLAN_LOCAL in texto for texto in self.textos):
+                return "plan local"
+            texto = "\n".join(self.textos)
+            if esperado and esperado in texto:
+                return "ia"
+            if not any(PLAN_EN_CAMINO in t for t in self.textos) and texto == anterior:
+                return "ia"
+            anterior = texto
+        raise asyncio.TimeoutError
+
+    async def descargar_pdf(self):
+        # El PDF se genera al pedirlo (data=callable): operación deferred_file
+        # y luego la URL del archivo. Streamlit borra el archivo generado tras
+        # dos limpiezas de huérfanos (una por re-ejecución de cualquier
+        # sesión), así que con mucha carga la descarga puede dar 404 también
+        # en el navegador
+        _, boton = self.widget("download_button", "")
+        self._operaciones += 1
+        mensaje = BackMsg()
+        pedido = mensaje.backend_operation_request
+        pedido.request_id = f"carga-{self._operaciones}"
+        pedido.session_id = self.session_id
+        pedido.deferred_file.file_id = boton.deferred_file_id
+        await self.ws.send(mensaje.SerializeToString())
+        respuesta = (await self._leer_hasta(
+            lambda f: f.WhichOneof("type") == "backend_operation_response"
+            and f.backend_operation_response.request_id == pedido.request_id
+        )).backend_operation_response
+        if respuesta.error_msg:
+            raise ErrorSesion(f"pdf: {respuesta.error_msg}")
+        url = respuesta.deferred_file.url
+        url = url if url.startswith("http") else self.url + url
+        contenido = await asyncio.to_thread(lambda: urllib.request.urlopen(url, timeout=self.timeout).read())
+        if not contenido.startswith(b"%PDF"):
+            raise ErrorSesion("pdf: la descarga no es un PDF")
+        return len(contenido)
+
+
+class Resultados:
+    def __init__(self):
+        self.tiempos = {paso: [] for paso in PASOS}
+        self.fallas = {paso: 0 for paso in PASOS}
+        self.errores = Counter()
+        self.avisos = Counter()
+        self.planes = Counter()
+        self.completas = 0
+        self.bytes_pdf = []
+
+    def registrar_errores(self, sesion):
+        for error in sesion.errores:
+            self.errores[error[:160]] += 1
+        for aviso in sesion.avisos:
+            self.avisos[aviso[:80]] += 1
+        sesion.errores = []
+        sesion.avisos = []
+
+
+async def recorrido(numero, args, resultados, esperado):
+    azar = random.Random(numero)
+    sesion = Sesion(args.url, args.timeout)
+    paso = "abrir"
+
+    async def medir(nombre, corrutina):
+        nonlocal paso
+        paso = nombre
+        inicio = time.perf_counter()
+        valor = await corrutina
+        resultados.tiempos[nombre].append(time.perf_counter() - inicio)
+        resultados.registrar_errores(sesion)
+        if args.pausa:
+            await asyncio.sleep(azar.uniform(0.5, 1.5) * args.pausa)
+        return valor
+
+    async def partidas():
+        ingresos = round(azar.uniform(2500, 15000), -2)
+        await sesion.editar("editor_libro_activos", {"0": {"Valor ($)": round(azar.uniform(50e3, 500e3), -3),
+                                                          "Deuda ($)": round(azar.uniform(0, 200e3), -3)}})
+        await sesion.editar("editor_libro_pasivos", {"0": {"Deuda ($)": round(azar.uniform(0, 30e3), -2),
+                                                          "Tasa anual (%)": 24.0, "Pago mínimo ($)": 200.0}})
+        await sesion.editar("editor_libro_ingresos", {"0": {"Monto mensual ($)": ingresos}})
+        await sesion.editar("editor_libro_gastos", {"0": {"Monto mensual ($)": round(ingresos * azar.uniform(0.4, 0.9), -2)}})
+
+    async def registro():
+        sesion.escribir("Nombre", f"Participante {numero}")
+        sesion.escribir("Email", f"participante{numero}@example.com")
+        await sesion.pulsar(BOTON_REGISTRO)
+
+    async def retiro():
+        sesion.escribir("Ingresos anuales esperados", str(round(azar.uniform(10e3, 40e3), -3)))
+        sesion.escribir("Gastos anuales esperados", str(round(azar.uniform(30e3, 60e3), -3)))
+        sesion.escribir("Ahorros actuales", str(round(azar.uniform(0, 300e3), -3)))
+        await sesion.pulsar(BOTON_RETIRO)
+
+    try:
+        await medir("abrir", sesion.abrir())
+        await medir("registro", registro())
+        await medir("partidas", partidas())
+        await medir("analizar", sesion.pulsar(BOTON_ANALIZAR))
+        resultados.planes[await medir("plan_ia", sesion.esperar_plan(esperado, args.timeout))] += 1
+        await medir("retiro", retiro())
+        resultados.bytes_pdf.append(await medir("pdf", sesion.descargar_pdf()))
+        resultados.completas += 1
+    except asyncio.TimeoutError:
+        resultados.fallas[paso] += 1
+        resultados.errores[f"tiempo agotado en {paso}"] += 1
+    except websockets.ConnectionClosed as e:
+        resultados.fallas[paso] += 1
+        resultados.errores[f"desconexión en {paso}: {e.code}"] += 1
+    except (ErrorSesion, OSError) as e:
+        resultados.fallas[paso] += 1
+        resultados.errores[f"{paso}: {e}"[:160]] += 1
+    finally:
+        resultados.registrar_errores(sesion)
+        await sesion.cerrar()
+
+
+async def ejecutar_carga(args, esperado):
+    resultados = Resultados()
+    azar = random.Random(0)
+    llegadas = sorted(azar.uniform(0, args.llegada) for _ in range(args.sesiones))
+
+    async def llegar(numero, demora):
+        await asyncio.sleep(demora)
+        await recorrido(numero, args, resultados, esperado)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(llegar(i, demora) for i, demora in enumerate(llegadas)))
+    return resultados, time.perf_counter() - inicio
+
+
+def _percentil(valores, q):
+    ordenados = sorted(valores)
+    return ordenados[min(int(q * len(ordenados)), len(ordenados) - 1)]
+
+
+def resumen(resultados, duracion, args):
+    pasos = {}
+    for paso in PASOS:
+        tiempos = resultados.tiempos[paso]
+        pasos[paso] = {"conteo": len(tiempos), "fallas": resultados.fallas[paso]}
+        if tiempos:
+            pasos[paso].update({f"p{int(q * 100)}_s": _percentil(tiempos, q) for q in (0.5, 0.95, 0.99)})
+            pasos[paso]["max_s"] = max(tiempos)
+    return {
+        "sesiones": args.sesiones,
+        "llegada_s": args.llegada,
+        "latencia_openai_s": args.latencia_openai,
+        "duracion_s": duracion,
+        "completas": resultados.completas,
+        "sesiones_por_segundo": resultados.completas / duracion if duracion else 0.0,
+        "pasos": pasos,
+        "planes": dict(resultados.planes),
+        "bytes_pdf_promedio": sum(resultados.bytes_pdf) / len(resultados.bytes_pdf) if resultados.bytes_pdf else 0,
+        "errores": dict(resultados.errores.most_common()),
+        "avisos": dict(resultados.avisos.most_common())
+    }
+
+
+def imprimir(datos):
+    print(f"\n{datos['completas']}/{datos['sesiones']} sesiones completas en {datos['duracion_s']:.1f} s "
+          f"({datos['sesiones_por_segundo']:.2f} por segundo)")
+    print(f"{'paso':<10} {'conteo':>7} {'fallas':>7} {'p50 (s)':>9} {'p95 (s)':>9} {'p99 (s)':>9} {'máx (s)':>9}")
+    for paso, fila in datos["pasos"].items():
+        if fila["conteo"]:
+            print(f"{paso:<10} {fila['conteo']:>7} {fila['fallas']:>7} {fila['p50_s']:>9.3f} "
+                  f"{fila['p95_s']:>9.3f} {fila['p99_s']:>9.3f} {fila['max_s']:>9.3f}")
+        else:
+            print(f"{paso:<10} {0:>7} {fila['fallas']:>7}")
+    if datos["planes"]:
+        print("Planes: " + ", ".join(f"{origen} {cantidad}" for origen, cantidad in datos["planes"].items()))
+    if datos["bytes_pdf_promedio"]:
+        print(f"PDF promedio: {datos['bytes_pdf_promedio'] / 1024:.1f} KiB")
+    print("Errores:" if datos["errores"] else "Sin errores")
+    for error, cantidad in datos["errores"].items():
+        print(f"  {cantidad:>5}  {error}")
+    if datos["avisos"]:
+        print("Avisos de la app (no son fallas):")
+        for aviso, cantidad in datos["avisos"].items():
+            print(f"  {cantidad:>5}  {aviso}")
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar(url, maximo=60):
+    limite = time.monotonic() + maximo
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as respuesta:
+                if respuesta.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError(f"{url} no respondió en {maximo} s")
+
+
+def levantar_app(temporal, url_openai, puerto_metricas):
+    # La app con su configuración, una clave de OpenAI ficticia y la base de
+    # datos y los gráficos en el directorio temporal
+    os.makedirs(os.path.join(temporal, ".streamlit"))
+    shutil.copy(os.path.join(RAIZ, ".streamlit", "config.toml"), os.path.join(temporal, ".streamlit"))
+    with open(os.path.join(temporal, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as archivo:
+        archivo.write('OPENAI_API_KEY = "prueba-de-carga"\n')
+    puerto = _puerto_libre()
+    entorno = dict(os.environ, CALCULADORA_DB=os.path.join(temporal, "usuarios.db"),
+                   CALCULADORA_GRAFICOS=os.path.join(temporal, "graficos"), OPENAI_BASE_URL=url_openai,
+                   CALCULADORA_METRICAS_PUERTO=str(puerto_metricas),
+                   PYTHONPATH=os.pathsep.join(filter(None, [RAIZ, os.environ.get("PYTHONPATH")])))
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true",
+         "--server.port", str(puerto), "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=temporal, env=entorno, stdout=open(os.path.join(temporal, "streamlit.log"), "w"),
+        stderr=subprocess.STDOUT
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    try:
+        _esperar(url + "/_stcore/health")
+    except RuntimeError:
+        proceso.terminate()
+        raise
+    return proceso, url
+
+
+def etapas_servidor(puerto_metricas, cantidad=8):
+    # p95 de las etapas medidas dentro de la app (calculadora.metricas)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{puerto_metricas}/metrics", timeout=5) as respuesta:
+            texto = respuesta.read().decode("utf-8")
+    except OSError:
+        return {}
+    etapas = {}
+    for linea in texto.splitlines():
+        if linea.startswith("calculadora_etapa_segundos{") and 'quantile="0.95"' in linea:
+            etapa = linea.split('etapa="', 1)[1].split('",quantile', 1)[0]
+            etapas[etapa] = float(linea.rsplit(" ", 1)[1])
+    return dict(sorted(etapas.items(), key=lambda e: e[1], reverse=True)[:cantidad])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de CODE_CAL_V7780.py por websocket")
+    parser.add_argument("--sesiones", type=int, default=20)
+    parser.add_argument("--llegada", type=float, default=10.0, help="segundos en los que llegan todas las sesiones")
+    parser.add_argument("--pausa", type=float, default=0.5, help="segundos promedio entre pasos de cada sesión")
+    parser.add_argument("--timeout", type=float, default=120.0, help="segundos máximos por paso")
+    parser.add_argument("--latencia-openai", type=float, default=1.0)
+    parser.add_argument("--intervalo-openai", type=float, default=0.05, help="segundos entre fragmentos del stream")
+    parser.add_argument("--tasa-errores-openai", type=float, default=0.0, help="fracción de respuestas 429")
+    parser.add_argument("--url", help="servidor ya levantado; si falta, se levanta uno con OpenAI simulado")
+    parser.add_argument("--json", help="guarda el resumen en este archivo")
+    args = parser.parse_args()
+
+    temporal = tempfile.mkdtemp(prefix="bench_carga_")
+    proceso = None
+    servidor = None
+    puerto_metricas = None
+    try:
+        esperado = None
+        if not args.url:
+            servidor = servidor_openai.iniciar(latencia=args.latencia_openai, intervalo=args.intervalo_openai,
+                                               tasa_errores=args.tasa_errores_openai)
+            puerto_metricas = _puerto_libre()
+            proceso, args.url = levantar_app(temporal, servidor.url, puerto_metricas)
+            esperado = servidor.texto[-40:]
+            print(f"App en {args.url}, OpenAI simulado en {servidor.url} (latencia {args.latencia_openai} s)")
+        print(f"{args.sesiones} sesiones llegando en {args.llegada:.0f} s...")
+        resultados, duracion = asyncio.run(ejecutar_carga(args, esperado))
+        datos = resumen(resultados, duracion, args)
+        if servidor is not None:
+            datos["solicitudes_openai"] = servidor.solicitudes
+            datos["errores_openai"] = servidor.errores
+        if puerto_metricas:
+            datos["etapas_servidor_p95_s"] = etapas_servidor(puerto_metricas)
+        imprimir(datos)
+        if datos.get("etapas_servidor_p95_s"):
+            print("Etapas más lentas en el servidor (p95):")
+            for etapa, segundos in datos["etapas_servidor_p95_s"].items():
+                print(f"  {etapa:<28} {segundos * 1000:9.1f} ms")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as archivo:
+                json.dump(datos, archivo, ensure_ascii=False, indent=2)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            try:
+                proceso.wait(10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+        if servidor is not None:
+            servidor.shutdown()
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
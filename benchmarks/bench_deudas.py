@@ -0,0 +1,56 @@
+# Búsqueda del orden óptimo de pago de deudas: todas las permutaciones
+# simuladas de una vez vs. el árbol de prefijos con poda
+#
+# Uso: python benchmarks/bench_deudas.py
+import itertools
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculadora import deudas  # noqa: E402
+
+MAX_FUERZA_BRUTA = 8
+
+
+def caso(n, semilla=2024):
+    rng = np.random.default_rng(semilla)
+    saldos = rng.uniform(500, 20000, n).round(2)
+    tasas = rng.uniform(5, 35, n).round(2)
+    minimos = np.maximum(saldos * 0.03, 25).round(2)
+    return saldos, tasas, minimos, float(minimos.sum()) + 1500
+
+
+def fuerza_bruta(saldos, tasas, minimos, presupuesto):
+    ordenes = np.array(list(itertools.permutations(range(len(saldos)))), dtype=np.intp)
+    intereses = []
+    for inicio in range(0, len(ordenes), deudas.TAMANO_BLOQUE):
+        intereses.append(deudas.simular(saldos, tasas, minimos, presupuesto,
+                                        ordenes[inicio:inicio + deudas.TAMANO_BLOQUE])["intereses"])
+    return float(np.concatenate(intereses).min())
+
+
+def medir(nombre, funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    print(f"{nombre:<40} {(time.perf_counter() - inicio) * 1000:10.1f} ms")
+    return resultado
+
+
+def main():
+    for n in (5, 7, 8, 10):
+        datos = caso(n)
+        print(f"{n} deudas ({math.factorial(n):,} órdenes)")
+        arbol = medir("  árbol de prefijos con poda", lambda: deudas.buscar_orden_optimo(*datos))
+        print(f"  {arbol['completos']:,} órdenes completos, {arbol['podados']:,} ramas podadas")
+        if n <= MAX_FUERZA_BRUTA:
+            bruto = medir("  todas las permutaciones", lambda: fuerza_bruta(*datos))
+            print(f"  misma respuesta: {abs(bruto - arbol['intereses']) < 1e-6 * max(bruto, 1.0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Costo de los gráficos del reporte: dibujarlos en cada render vs. la caché
+#
+# Uso: python benchmarks/bench_graficos.py
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CALCULADORA_GRAFICOS", tempfile.mkdtemp(prefix="bench_graficos_"))
+
+from calculadora import graficos, reporte, retiro  # noqa: E402
+
+USUARIO = {"nombre": "Ana Pérez", "edad": 35, "email": "ana@example.com"}
+FINANZAS = {
+    "ingresos": 7000.0, "gastos": 4200.0, "activos": 136500.0, "pasivos": 68900.0,
+    "partidas": [("activo", "Inmueble 1", 180000.0, 90000.0), ("activo", "Automóvil 1", 25000.0, 8500.0),
+                 ("activo", "Ahorros", 30000.0, 0.0), ("pasivo", "Tarjeta de crédito 1", 0.0, -4900.0),
+                 ("pasivo", "Otra deuda 1", 0.0, -64000.0)]
+}
+
+
+def analisis():
+    proyeccion = retiro.trayectoria(35, 65, 30000.0, 33600.0, 20000.0, 0.07, 0.03)
+    return {
+        "resumen": "Situación Financiera Actual: flujo de caja positivo.",
+        "perfil_inversion": {"nivel": "Alto (70-100%)", "descripcion": "Excelente perfil."},
+        "proyeccion_retiro": {"trayectoria": {
+            "edades": proyeccion["edades"].tolist(), "capital": proyeccion["capital"].tolist(), "edad_retiro": 65
+        }}
+    }
+
+
+def medir(nombre, funcion, repeticiones=20):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    print(f"{nombre:<40} {(time.perf_counter() - inicio) / repeticiones * 1000:8.2f} ms")
+
+
+def main():
+    datos = analisis()
+    cache = graficos.RUTA_CACHE
+
+    def sin_cache():
+        # Directorio vacío en cada llamada: siempre se dibuja
+        graficos.RUTA_CACHE = tempfile.mkdtemp(dir=cache)
+        return graficos.graficos_reporte(FINANZAS, datos)
+
+    medir("3 gráficos, dibujados cada vez", sin_cache)
+    graficos.RUTA_CACHE = cache
+    medir("3 gráficos, desde la caché", lambda: graficos.graficos_reporte(FINANZAS, datos), repeticiones=200)
+    medir("PDF con gráficos (sin caché de PDF)", lambda: reporte.generar_pdf(USUARIO, FINANZAS, datos))
+    print(graficos.estadisticas())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Costo de las métricas por etapa (calculadora.metricas)
+#
+# Mide cuánto agrega registrar una duración con el context manager y con el
+# decorador, frente a llamar la función sin medir, en un hilo y en varios
+# hilos a la vez (el registro comparte un lock), y cuánto tarda armar la
+# tabla de p50/p95 y el texto de Prometheus con la ventana llena.
+# Uso: python benchmarks/bench_metricas.py [--llamadas 200000] [--hilos 8]
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculadora import metricas  # noqa: E402
+
+
+def vacia():
+    return None
+
+
+def por_llamada(funcion, llamadas):
+    inicio = time.perf_counter()
+    for _ in range(llamadas):
+        funcion()
+    return (time.perf_counter() - inicio) / llamadas * 1e6
+
+
+def en_hilos(funcion, llamadas, hilos):
+    por_hilo = llamadas // hilos
+    trabajadores = [threading.Thread(target=por_llamada, args=(funcion, por_hilo)) for _ in range(hilos)]
+    inicio = time.perf_counter()
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+    return (time.perf_counter() - inicio) / (por_hilo * hilos) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de calculadora.metricas")
+    parser.add_argument("--llamadas", type=int, default=200000)
+    parser.add_argument("--hilos", type=int, default=8)
+    args = parser.parse_args()
+
+    registro = metricas.obtener_metricas()
+    medida = metricas.medido("decorador")(vacia)
+
+    def con_medir():
+        with registro.medir("context manager"):
+            return None
+
+    base = por_llamada(vacia, args.llamadas)
+    print(f"{'sin medir':<28} {base:7.3f} µs por llamada")
+    for nombre, funcion in (("context manager", con_medir), ("decorador", medida)):
+        un_hilo = por_llamada(funcion, args.llamadas)
+        varios = en_hilos(funcion, args.llamadas, args.hilos)
+        print(f"{nombre:<28} {un_hilo:7.3f} µs por llamada (+{un_hilo - base:.3f}), "
+              f"{varios:7.3f} µs con {args.hilos} hilos")
+
+    for etapa in range(30):
+        for _ in range(registro.muestras):
+            registro.observar(f"etapa {etapa}", 0.001)
+    inicio = time.perf_counter()
+    registro.etapas()
+    tabla = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    texto = registro.texto_prometheus()
+    prometheus = (time.perf_counter() - inicio) * 1000
+    print(f"\n32 etapas con {registro.muestras} muestras: tabla {tabla:.2f} ms, "
+          f"/metrics {prometheus:.2f} ms ({len(texto) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Microbenchmark del lector/formateador de montos
+#
+# Compara calculadora.moneda con la versión anterior basada en re.sub.
+# Uso: python benchmarks/bench_moneda.py
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculadora import moneda  # noqa: E402
+
+MUESTRAS = ["$80,000.00", "$0.00", "$1,500.00", "$(3,000.00)", "$30,000.00", "", "$6,500.00", "1234.5"]
+REPETICIONES = 20_000
+
+
+def parse_currency_regex(currency_str):
+    if not currency_str:
+        return 0.0
+    num_str = re.sub(r'[^\d.]', '', currency_str)
+    return float(num_str) if num_str else 0.0
+
+
+def format_currency_anterior(value):
+    return f"${value:,.2f}" if value else "$0.00"
+
+
+def medir(nombre, funcion, datos):
+    mejor = min(timeit.repeat(lambda: [funcion(d) for d in datos], number=REPETICIONES // 10, repeat=5))
+    por_llamada = mejor / (REPETICIONES // 10) / len(datos) * 1e9
+    print(f"{nombre:<32} {por_llamada:8.1f} ns/llamada")
+    return por_llamada
+
+
+def main():
+    valores = [moneda.parse_currency(m) for m in MUESTRAS]
+    anterior = medir("parse_currency (re.sub)", parse_currency_regex, MUESTRAS)
+    nuevo = medir("parse_currency (moneda)", moneda.parse_currency, MUESTRAS)
+    medir("parse_money -> Decimal", moneda.parse_money, MUESTRAS)
+    medir("format_currency (anterior)", format_currency_anterior, valores)
+    medir("format_currency (moneda)", moneda.format_currency, valores)
+    print(f"Lectura: {anterior / nuevo:.2f}x respecto a re.sub")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Latencia y memoria del reporte PDF con un plan de IA largo
+#
+# Compara el camino anterior (PDF completo + base64 en un enlace data:) con
+# pdf_en_cache, la primera vez (se dibuja) y las siguientes (caché).
+# Uso: python benchmarks/bench_reporte.py
+import base64
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculadora import reporte  # noqa: E402
+
+PARRAFO = ("Paso {n}: revisa tu flujo de caja, destina el 20% del excedente a un fondo para la "
+           "cuota inicial y compara al menos tres propiedades por zona antes de ofertar. ")
+
+USUARIO = {"nombre": "Ana Pérez", "edad": 35, "email": "ana@example.com"}
+FINANZAS = {"ingresos": 7000.0, "gastos": 4200.0, "activos": 136500.0, "pasivos": 68900.0}
+
+
+def analisis(parrafos):
+    return {
+        "resumen": "Situación Financiera Actual: flujo de caja positivo.",
+        "perfil_inversion": {"nivel": "Alto (70-100%)", "descripcion": "Excelente perfil."},
+        "plan_trabajo": "\n".join(PARRAFO.format(n=i) for i in range(parrafos))
+    }
+
+
+def medir(nombre, funcion, repeticiones=5):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    duracion = (time.perf_counter() - inicio) / repeticiones * 1000
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<38} {duracion:9.2f} ms  pico {pico / 1024:9.1f} KiB  salida {len(resultado) / 1024:8.1f} KiB")
+
+
+def main():
+    for parrafos in (20, 400):
+        datos = analisis(parrafos)
+        print(f"Plan de {len(datos['plan_trabajo']):,} caracteres")
+
+        def anterior():
+            pdf = reporte.generar_pdf(USUARIO, FINANZAS, datos)
+            b64 = base64.b64encode(pdf).decode()
+            return f'<a href="data:application/octet-stream;base64,{b64}" download="reporte.pdf">descargar</a>'
+
+        medir("  anterior (PDF + base64 data:)", anterior)
+        reporte._cache = reporte.CacheReportes()
+        medir("  pdf_en_cache, primera vez", lambda: reporte.pdf_en_cache(USUARIO, FINANZAS, datos), repeticiones=1)
+        medir("  pdf_en_cache, desde la caché", lambda: reporte.pdf_en_cache(USUARIO, FINANZAS, datos))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Memoria por sesión y costo de archivar sesiones inactivas en SQLite
+#
+# Arma una sesión típica (cuatro libros de partidas y los datos del reporte)
+# y la compara con la representación anterior: un dict de dicts por sección
+# con claves de texto y el texto del plan guardado dos veces junto al resumen.
+# Luego registra N sesiones en un RegistroSesiones con una base temporal y
+# mide cuánto ocupan en memoria, cuánto ocupan archivadas y cuánto tarda
+# archivarlas y recuperarlas.
+# Uso: python benchmarks/bench_sesiones.py [--sesiones 500]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculadora import db, perfil, plan_local, sesiones  # noqa: E402
+from calculadora.libro import CAMPOS, Libro  # noqa: E402
+
+SECCIONES = {
+    "activos": ([f"Inmueble {i}" for i in range(1, 4)] + [f"Automóvil {i}" for i in range(1, 3)]
+                + [f"Inversión {i}" for i in range(1, 9)], 1, CAMPOS),
+    "pasivos": ([f"Tarjeta de crédito {i}" for i in range(1, 4)] + [f"Otra deuda {i}" for i in range(1, 9)],
+                -1, CAMPOS + ("tasa", "pago_minimo")),
+    "ingresos": ([f"Ingresos mensuales adulto {i}" for i in range(1, 3)] + ["Otros ingresos"], 1, ("valor",)),
+    "gastos": ([f"Gasto {i}" for i in range(1, 16)], 1, ("valor",))
+}
+FINANZAS = {"ingresos": 7000.0, "gastos": 4200.0, "activos": 136500.0, "pasivos": 68900.0}
+
+
+def sesion_anterior(plan):
+    datos = {}
+    for seccion, (nombres, _, campos) in SECCIONES.items():
+        datos[f"{seccion}_values"] = {nombre: {campo: 1000.0 + i for campo in campos} for i, nombre in enumerate(nombres)}
+    resumen = perfil.resumen(*FINANZAS.values())
+    datos["reporte_data"] = {
+        "usuario": {}, "finanzas": dict(FINANZAS),
+        "analisis": {"resumen": resumen, "perfil_inversion": {"nivel": "Alto", "descripcion": "Excelente perfil."},
+                     "plan_trabajo": plan, "analisis_ia": plan}
+    }
+    datos["resumen"] = resumen
+    return datos
+
+
+def sesion_actual(plan):
+    datos = {}
+    for seccion, (nombres, signo, campos) in SECCIONES.items():
+        libro_ = Libro(nombres, signo, campos)
+        for i, nombre in enumerate(nombres):
+            for campo in campos:
+                libro_.actualizar(nombre, campo, 1000.0 + i)
+        datos[f"libro_{seccion}"] = libro_
+    datos["reporte_data"] = {"usuario": {}, "finanzas": dict(FINANZAS),
+                             "analisis": {"analizado": True, "plan_trabajo": plan}}
+    return datos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria por sesión y archivo de sesiones en SQLite")
+    parser.add_argument("--sesiones", type=int, default=500)
+    args = parser.parse_args()
+
+    plan_ia = plan_local.generar_plan(*FINANZAS.values())
+    print("Una sesión sola (incluye los nombres de partidas, que comparten todas)")
+    for nombre, plan in (("plan de IA", plan_ia), ("plan local", None)):
+        anterior = sesiones.tamano(sesion_anterior(plan_ia))
+        actual = sesiones.tamano(sesion_actual(plan))
+        print(f"  {nombre:<12} anterior {anterior / 1024:8.1f} KiB   actual {actual / 1024:8.1f} KiB")
+
+    with tempfile.TemporaryDirectory(prefix="bench_sesiones_") as temporal:
+        pool = db.PoolConexiones(os.path.join(temporal, "app.db"))
+        registro = sesiones.RegistroSesiones(pool, inactiva_tras=0)
+        ids = [f"sesion-{i}" for i in range(args.sesiones)]
+        for id_sesion in ids:
+            registro.obtener(id_sesion).update(sesion_actual(plan_ia if int(id_sesion[7:]) % 2 else None))
+        en_memoria = registro.estadisticas()
+
+        inicio = time.perf_counter()
+        registro.revisar(forzar=True)
+        archivar = time.perf_counter() - inicio
+        archivadas = registro.estadisticas()
+
+        inicio = time.perf_counter()
+        for id_sesion in ids:
+            registro.obtener(id_sesion)
+        recuperar = time.perf_counter() - inicio
+        pool.cerrar()
+
+    print(f"\n{args.sesiones} sesiones (la mitad con plan de IA; lo compartido cuenta una vez)")
+    print(f"  en memoria   {en_memoria['bytes_memoria'] / 1024:9.1f} KiB "
+          f"({en_memoria['bytes_por_sesion'] / 1024:.1f} KiB por sesión)")
+    print(f"  archivadas   {archivadas['bytes_archivadas'] / 1024:9.1f} KiB en SQLite, "
+          f"{archivar * 1000:7.1f} ms ({archivar / args.sesiones * 1e6:.0f} µs por sesión)")
+    print(f"  recuperadas  {recuperar * 1000:9.1f} ms ({recuperar / args.sesiones * 1e6:.0f} µs por sesión)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Servidor local que imita /v1/chat/completions de OpenAI
+#
+# Para medir la app y sus funciones sin red ni costo: responde con un plan de
+# texto fijo, con y sin stream (SSE, con el uso de tokens en el último
+# fragmento si se pide include_usage), tras una latencia configurable. Con
+# tasa_errores responde 429 (límite de uso) a esa fracción de las solicitudes.
+# Se usa desde la suite de benchmarks y la prueba de carga, o suelto:
+#   python benchmarks/servidor_openai.py --puerto 8765 --latencia 0.5
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run CODE_CAL_V7780.py
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PLAN = " ".join(
+    f"**{n}. Paso {n}**: revisa tu flujo de caja, separa el ahorro para la cuota inicial y compara "
+    f"al menos tres propiedades por zona antes de ofertar." for n in range(1, 8)
+)
+
+
+class ServidorOpenAI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, latencia=0.05, fragmentos=20, intervalo=0.0, tasa_errores=0.0, texto=PLAN):
+        super().__init__(direccion, _Manejador)
+        self.latencia = latencia
+        self.fragmentos = fragmentos
+        self.intervalo = intervalo
+        self.tasa_errores = tasa_errores
+        self.texto = texto
+        self.solicitudes = 0
+        self.errores = 0
+        self._lock = threading.Lock()
+        self._azar = random.Random(0)
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/v1"
+
+    def _contar(self):
+        with self._lock:
+            self.solicitudes += 1
+            fallar = self._azar.random() < self.tasa_errores
+            self.errores += fallar
+            return fallar
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sin Nagle: encabezados y cuerpo van en envíos separados y el ACK
+    # diferido agregaría ~40 ms a cada respuesta
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _json(self, estado, datos):
+        cuerpo = json.dumps(datos).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_POST(self):
+        servidor = self.server
+        pedido = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "no encontrado"}})
+            return
+        fallar = servidor._contar()
+        time.sleep(servidor.latencia)
+        if fallar:
+            self._json(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+            return
+        texto = servidor.texto
+        uso = {"prompt_tokens": 180, "completion_tokens": len(texto.split()),
+               "total_tokens": 180 + len(texto.split())}
+        base = {"id": "chatcmpl-local", "created": int(time.time()), "model": pedido.get("model", "")}
+        if not pedido.get("stream"):
+            self._json(200, {**base, "object": "chat.completion", "usage": uso, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        paso = max(len(texto) // max(servidor.fragmentos, 1), 1)
+        for inicio in range(0, len(texto), paso):
+            fragmento = {**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {"content": texto[inicio:inicio + paso]}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(fragmento)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if servidor.intervalo:
+                time.sleep(servidor.intervalo)
+        if (pedido.get("stream_options") or {}).get("include_usage"):
+            final = {**base, "object": "chat.completion.chunk", "choices": [], "usage": uso}
+            self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def iniciar(puerto=0, direccion="127.0.0.1", **opciones):
+    # Levanta el servidor en un hilo; devuelve el servidor (url, solicitudes,
+    # shutdown)
+    servidor = ServidorOpenAI((direccion, puerto), **opciones)
+    threading.Thread(target=servidor.serve_forever, name="servidor-openai", daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local compatible con /v1/chat/completions")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos antes de responder")
+    parser.add_argument("--fragmentos", type=int, default=20, help="fragmentos de la respuesta con stream")
+    parser.add_argument("--intervalo", type=float, default=0.0, help="segundos entre fragmentos")
+    parser.add_argument("--tasa-errores", type=float, default=0.0, help="fracción de solicitudes con 429")
+    args = parser.parse_args()
+    servidor = ServidorOpenAI(("127.0.0.1", args.puerto), args.latencia, args.fragmentos,
+                              args.intervalo, args.tasa_errores)
+    print(f"Escuchando en {servidor.url}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Agregación de los libros de partidas (calculadora.libro) con 20, 200 y 2000 partidas
+import pytest
+
+from calculadora.libro import CAMPOS, Libro
+
+PARTIDAS = (20, 200, 2000)
+
+
+def _llenar(cantidad):
+    nombres = [f"Partida {i}" for i in range(cantidad)]
+    libro_ = Libro(nombres, signo=-1, campos=CAMPOS + ("tasa", "pago_minimo"))
+    for i, nombre in enumerate(nombres):
+        libro_.actualizar(nombre, "valor", 1000.0 + i)
+        libro_.actualizar(nombre, "deuda", 250.5 + i)
+        libro_.actualizar(nombre, "tasa", 18.9)
+    return libro_
+
+
+@pytest.mark.parametrize("cantidad", PARTIDAS)
+def bench_libro_completo(benchmark, cantidad):
+    # Lo que hace una sesión nueva: crear el libro, cargar todas las partidas y totalizar
+    def agregar():
+        libro_ = _llenar(cantidad)
+        return libro_.totales(), libro_.partidas()
+
+    totales, partidas = benchmark(agregar)
+    assert len(partidas) == cantidad and totales["valor"] > 0
+
+
+@pytest.mark.parametrize("cantidad", PARTIDAS)
+def bench_libro_edicion(benchmark, cantidad):
+    # Lo que hace cada edición en la tabla: cambiar una partida y leer los totales
+    libro_ = _llenar(cantidad)
+    nombre = f"Partida {cantidad // 2}"
+    montos = iter(range(10**9))
+
+    def editar():
+        libro_.actualizar(nombre, "valor", float(next(montos)))
+        return libro_.totales()
+
+    assert benchmark(editar)["neto"] != 0
@@ -0,0 +1,20 @@
+# Lectura y formato de montos (calculadora.moneda), por lotes de 1000
+import random
+
+from calculadora.moneda import format_currency, parse_currency
+
+_azar = random.Random(2024)
+VALORES = [round(_azar.uniform(-50_000, 500_000), 2) for _ in range(1000)]
+TEXTOS = [format_currency(v) for v in VALORES] + ["", "1234.5", "$(3,000.00)", "abc"]
+
+
+def bench_parse_currency(benchmark):
+    benchmark.extra_info["montos_por_ronda"] = len(TEXTOS)
+    resultado = benchmark(lambda: [parse_currency(texto) for texto in TEXTOS])
+    assert len(resultado) == len(TEXTOS)
+
+
+def bench_format_currency(benchmark):
+    benchmark.extra_info["montos_por_ronda"] = len(VALORES)
+    resultado = benchmark(lambda: [format_currency(valor) for valor in VALORES])
+    assert resultado[0].startswith("$") or resultado[0].startswith("-$")
@@ -0,0 +1,44 @@
+# Plan de trabajo con OpenAI contra el servidor local (benchmarks/servidor_openai.py)
+#
+# Mide lo que agrega la app sobre la latencia del servidor (--latencia-openai):
+# la llamada completa, el primer fragmento con stream y la respuesta en caché.
+import time
+
+from calculadora import ia
+
+
+class SinCache(ia.CacheRespuestas):
+    def obtener(self, clave):
+        return None
+
+    def guardar(self, clave, respuesta):
+        pass
+
+
+def bench_plan_openai(benchmark, cliente_openai, servidor):
+    benchmark.extra_info["latencia_servidor"] = servidor.latencia
+    plan = benchmark.pedantic(ia.generar_plan, args=(cliente_openai, 7000, 4200, 136500, 68900),
+                              kwargs={"cache": SinCache()}, rounds=10, iterations=1, warmup_rounds=1)
+    assert plan
+
+
+def bench_plan_openai_stream(benchmark, cliente_openai, servidor):
+    primeros = []
+
+    def recibir():
+        inicio = time.perf_counter()
+        fragmentos = ia.generar_plan_stream(cliente_openai, 7000, 4200, 136500, 68900, cache=SinCache())
+        next(fragmentos)
+        primeros.append(time.perf_counter() - inicio)
+        return [*fragmentos]
+
+    benchmark.pedantic(recibir, rounds=10, iterations=1, warmup_rounds=1)
+    primeros.sort()
+    benchmark.extra_info["latencia_servidor"] = servidor.latencia
+    benchmark.extra_info["primer_fragmento_mediana"] = primeros[len(primeros) // 2]
+
+
+def bench_plan_en_cache(benchmark, cliente_openai):
+    # Perfil repetido: la respuesta sale de la tabla cache_ia sin llamar a la API
+    ia.generar_plan(cliente_openai, 5200, 3100, 90000, 12000)
+    assert benchmark(ia.generar_plan, cliente_openai, 5200, 3100, 90000, 12000)
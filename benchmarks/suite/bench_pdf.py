@@ -0,0 +1,24 @@
+# Latencia y tamaño del reporte PDF con un plan corto y uno largo (calculadora.reporte)
+import pytest
+
+from calculadora import reporte
+
+PARRAFO = ("Paso {n}: revisa tu flujo de caja, destina el 20% del excedente a un fondo para la "
+           "cuota inicial y compara al menos tres propiedades por zona antes de ofertar. ")
+USUARIO = {"nombre": "Ana Pérez", "edad": 35, "email": "ana@example.com"}
+FINANZAS = {"ingresos": 7000.0, "gastos": 4200.0, "activos": 136500.0, "pasivos": 68900.0,
+            "partidas": [("activo", "Inmueble 1", 120000.0, 60000.0), ("activo", "Efectivo cuenta 1", 16500.0, 0.0),
+                         ("pasivo", "Tarjeta de crédito 1", 0.0, 8900.0), ("ingreso", "Ingresos mensuales adulto 1", 7000.0, 0.0),
+                         ("gasto", "Vivienda", 2500.0, 0.0), ("gasto", "Alimentación", 1700.0, 0.0)]}
+PLANES = {"corto": 20, "largo": 400}
+
+
+@pytest.mark.parametrize("plan", PLANES)
+def bench_generar_pdf(benchmark, plan):
+    analisis = {"analizado": True, "plan_trabajo": "\n".join(PARRAFO.format(n=i) for i in range(PLANES[plan]))}
+    # La ronda de calentamiento dibuja los gráficos; las medidas los toman de la caché
+    pdf = benchmark.pedantic(reporte.generar_pdf, args=(USUARIO, FINANZAS, analisis),
+                             rounds=5, iterations=1, warmup_rounds=1)
+    benchmark.extra_info["bytes"] = len(pdf)
+    benchmark.extra_info["caracteres_plan"] = len(analisis["plan_trabajo"])
+    assert pdf.startswith(b"%PDF")
@@ -0,0 +1,39 @@
+# Proyección de retiro por lotes de escenarios (calculadora.retiro)
+import random
+
+import numpy as np
+import pytest
+
+from calculadora import retiro
+
+LOTES = (100, 1000)
+
+
+def _escenarios(cantidad):
+    azar = random.Random(cantidad)
+    escenarios = []
+    for _ in range(cantidad):
+        edad = azar.randint(20, 60)
+        ingresos = azar.uniform(2000, 12000)
+        escenarios.append((edad, azar.randint(edad + 1, 75), ingresos, ingresos * azar.uniform(0.3, 0.9),
+                           azar.uniform(0, 500_000), azar.uniform(-50_000, 2_000_000), azar.uniform(-1000, 6000)))
+    return escenarios
+
+
+@pytest.mark.parametrize("cantidad", LOTES)
+def bench_analizar_proyeccion(benchmark, cantidad):
+    # El cálculo del botón "Calcular proyección", escenario por escenario
+    escenarios = _escenarios(cantidad)
+    benchmark.extra_info["escenarios"] = cantidad
+    resultados = benchmark(lambda: [retiro.analizar_proyeccion(*escenario) for escenario in escenarios])
+    assert len(resultados) == cantidad
+
+
+@pytest.mark.parametrize("cantidad", LOTES)
+def bench_proyectar_rejilla(benchmark, cantidad):
+    # La misma cantidad de escenarios con rendimiento e inflación, vectorizada
+    edades = np.linspace(50, 75, 10)
+    aportes = np.linspace(0, 50_000, cantidad // 10)
+    benchmark.extra_info["escenarios"] = len(edades) * len(aportes)
+    resultado = benchmark(retiro.proyectar_rejilla, 35, 20_000, 36_000, edades, aportes, [0.07], [0.03])
+    assert resultado["capital"].shape == (len(edades), len(aportes), 1, 1)
@@ -0,0 +1,19 @@
+# Inserciones en SQLite (calculadora.db): registro de usuarios y guardado de finanzas
+import itertools
+
+from calculadora import db
+
+PARTIDAS = [("activo", f"Inmueble {i}", 100000.0 + i, 50000.0) for i in range(5)] + \
+           [("gasto", f"Gasto {i}", 300.0 + i, 0.0) for i in range(15)]
+
+
+def bench_registrar_usuario(benchmark):
+    # Una transacción por usuario, como el botón "Guardar información personal"
+    contador = itertools.count()
+    usuario_id = benchmark(lambda: db.insertar_usuario(f"Usuario {next(contador)}", 35, "ana@example.com", "3000000000"))
+    assert usuario_id > 0
+
+
+def bench_guardar_finanzas(benchmark):
+    usuarios = itertools.cycle([db.insertar_usuario(f"Usuario {i}", 35, "ana@example.com", "") for i in range(50)])
+    benchmark(lambda: db.guardar_finanzas(next(usuarios), 7000.0, 4200.0, 136500.0, 68900.0, PARTIDAS))
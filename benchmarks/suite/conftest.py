@@ -0,0 +1,67 @@
+# Suite de benchmarks de las rutas calientes de la calculadora
+#
+# Usa pytest-benchmark (pip install -r requirements-dev.txt). Cada ejecución
+# guarda sus resultados en JSON en benchmarks/resultados/<máquina>/NNNN_<commit>.json
+# (fuera de git, ver .gitignore), y --benchmark-compare
+# los compara con la anterior para ver regresiones entre versiones:
+#   python -m pytest benchmarks/suite
+#   python -m pytest benchmarks/suite --benchmark-compare --benchmark-compare-fail=median:15%
+#   python -m pytest benchmarks/suite -k pdf --latencia-openai 0.2
+# La base de datos y los gráficos van a un directorio temporal, y OpenAI se
+# reemplaza por benchmarks/servidor_openai.py con latencia configurable.
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+SUITE = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = os.path.dirname(SUITE)
+RAIZ = os.path.dirname(BENCHMARKS)
+RESULTADOS = os.path.join(BENCHMARKS, "resultados")
+ALMACEN_POR_DEFECTO = "file://./.benchmarks"
+
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, BENCHMARKS)
+
+# Antes de importar calculadora: db y graficos leen sus rutas al importarse
+_TEMPORAL = tempfile.mkdtemp(prefix="bench_suite_")
+os.environ["CALCULADORA_DB"] = os.path.join(_TEMPORAL, "usuarios.db")
+os.environ["CALCULADORA_GRAFICOS"] = os.path.join(_TEMPORAL, "graficos")
+
+import servidor_openai  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption("--latencia-openai", type=float,
+                     default=float(os.environ.get("CALCULADORA_BENCH_LATENCIA", 0.05)),
+                     help="segundos que tarda el servidor local de OpenAI en responder")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Los resultados van a benchmarks/resultados sin importar desde dónde se ejecute
+    if config.getoption("benchmark_storage") == ALMACEN_POR_DEFECTO:
+        config.option.benchmark_storage = f"file://{RESULTADOS}"
+
+
+def pytest_unconfigure(config):
+    from calculadora import db
+
+    db.cerrar_pool()
+    shutil.rmtree(_TEMPORAL, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def servidor(request):
+    servidor_ = servidor_openai.iniciar(latencia=request.config.getoption("latencia_openai"))
+    yield servidor_
+    servidor_.shutdown()
+
+
+@pytest.fixture(scope="session")
+def cliente_openai(servidor):
+    from openai import OpenAI
+
+    return OpenAI(api_key="benchmark", base_url=servidor.url, max_retries=0)
@@ -0,0 +1,3 @@
+# Núcleo de la Calculadora Financiera del Taller de Bienes Raíces.
+# Los módulos de este paquete no dependen de Streamlit, de modo que pueden
+# usarse desde la app (CODE_CAL_V7780.py), desde la línea de comandos y en lotes.
@@ -0,0 +1,129 @@
+# Línea de comandos: python -m calculadora <comando>
+import argparse
+import os
+import sys
+import time
+
+
+def comando_score(args):
+    from calculadora import lote, moneda
+
+    salida = args.salida or f"{os.path.splitext(args.entrada)[0]}_perfil.csv"
+    inicio = time.perf_counter()
+    try:
+        resultado = lote.calificar_csv(args.entrada, salida, moneda.FORMATOS.get(args.formato))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    duracion = time.perf_counter() - inicio
+    conteo = resultado["perfil"].value_counts(sort=False)
+    print(f"{len(resultado)} filas calificadas en {duracion:.2f} s -> {salida}")
+    for nivel, cantidad in conteo.items():
+        print(f"  {nivel}: {cantidad}")
+    return 0
+
+
+def comando_inmuebles(args):
+    from calculadora import inmuebles, moneda
+
+    salida = args.salida or f"{os.path.splitext(args.entrada)[0]}_ranking.csv"
+    supuestos = {campo: valor for campo, valor in (("tasa", args.tasa), ("plazo", args.plazo),
+                                                   ("cuota_inicial", args.cuota_inicial)) if valor is not None}
+    inicio = time.perf_counter()
+    try:
+        resultado = inmuebles.analizar_csv(args.entrada, salida, supuestos, moneda.FORMATOS.get(args.formato))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    duracion = time.perf_counter() - inicio
+    print(f"{len(resultado)} propiedades analizadas en {duracion:.2f} s -> {salida}")
+    print(f"  {int(resultado['viable'].sum())} cubren la deuda (DSCR >= {inmuebles.DSCR_MINIMO}) con flujo positivo")
+    for fila in resultado.head(args.mostrar).itertuples():
+        print(f"  {fila.puesto}. {fila.nombre}: cash on cash {fila.cash_on_cash:.1%}, "
+              f"cap rate {fila.cap_rate:.1%}, DSCR {fila.dscr:.2f}")
+    return 0
+
+
+def comando_reportes(args):
+    import sqlite3
+    import zipfile
+
+    from calculadora import reportes_lote
+
+    inicio = time.perf_counter()
+    try:
+        if args.salida.endswith(".zip"):
+            destino = reportes_lote.DestinoZip(args.salida)
+        else:
+            destino = reportes_lote.DestinoDirectorio(args.salida)
+        resultado = reportes_lote.generar_reportes(destino, ruta_db=args.db, procesos=args.procesos)
+    except (OSError, sqlite3.Error, zipfile.BadZipFile) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    duracion = time.perf_counter() - inicio
+    print(f"{resultado['generados']} reportes generados en {duracion:.1f} s "
+          f"({resultado['omitidos']} ya existían) -> {args.salida}")
+    for usuario_id, error in resultado["errores"]:
+        print(f"  usuario {usuario_id}: {error}", file=sys.stderr)
+    return 1 if resultado["errores"] else 0
+
+
+def comando_reglas(args):
+    from calculadora import reglas
+
+    ruta = args.archivo or reglas.RUTA_REGLAS
+    try:
+        regla = reglas.cargar(ruta)
+    except (OSError, ValueError) as e:
+        print(f"Error en {ruta}: {e}", file=sys.stderr)
+        return 1
+    print(f"{ruta}: {len(regla.niveles)} niveles")
+    for nivel, patrimonio_min, flujo_min in regla.umbrales:
+        print(f"  {nivel}: patrimonio neto > {patrimonio_min:,.0f} y flujo de caja > {flujo_min:,.0f}")
+    print(f"  {regla.nivel_base}: el resto")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m calculadora",
+        description="Herramientas de línea de comandos de la Calculadora Financiera"
+    )
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    score = comandos.add_parser("score", help="Califica el perfil de inversión de cada fila de un CSV")
+    score.add_argument("entrada", help="CSV con columnas ingresos, gastos, activos y pasivos")
+    score.add_argument("-o", "--salida", help="CSV de resultados (por defecto <entrada>_perfil.csv)")
+    score.add_argument("--formato", choices=["us", "eu"],
+                       help="Formato de los montos: us (1,234.56) o eu (1.234,56); por defecto se detecta")
+    score.set_defaults(funcion=comando_score)
+
+    propiedades = comandos.add_parser("inmuebles", help="Analiza y ordena propiedades candidatas de un CSV")
+    propiedades.add_argument("entrada", help="CSV con columnas precio y arriendo (opcionales: nombre, gastos, "
+                                             "cuota_inicial, tasa, plazo, vacancia, cierre)")
+    propiedades.add_argument("-o", "--salida", help="CSV de resultados (por defecto <entrada>_ranking.csv)")
+    propiedades.add_argument("--tasa", type=float, help="Tasa anual del crédito en %% si el CSV no la trae")
+    propiedades.add_argument("--plazo", type=float, help="Plazo del crédito en años si el CSV no lo trae")
+    propiedades.add_argument("--cuota-inicial", type=float, help="Cuota inicial en %% del precio si el CSV no la trae")
+    propiedades.add_argument("--formato", choices=["us", "eu"],
+                             help="Formato de los montos: us (1,234.56) o eu (1.234,56); por defecto se detecta")
+    propiedades.add_argument("--mostrar", type=int, default=5, help="Propiedades del ranking a mostrar (por defecto 5)")
+    propiedades.set_defaults(funcion=comando_inmuebles)
+
+    reportes = comandos.add_parser("reportes", help="Genera el reporte PDF de cada usuario registrado")
+    reportes.add_argument("salida", help="Directorio de destino, o archivo .zip")
+    reportes.add_argument("--db", default=os.environ.get("CALCULADORA_DB", "usuarios.db"),
+                          help="Base de datos SQLite (por defecto usuarios.db)")
+    reportes.add_argument("-p", "--procesos", type=int, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    reportes.set_defaults(funcion=comando_reportes)
+
+    validar = comandos.add_parser("reglas", help="Valida un archivo de reglas de perfil y muestra sus niveles")
+    validar.add_argument("archivo", nargs="?", help="Archivo .toml o .json (por defecto, las reglas en uso)")
+    validar.set_defaults(funcion=comando_reglas)
+
+    args = parser.parse_args(argv)
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+# Capa de acceso a datos (SQLite)
+#
+# Un único pool de conexiones por proceso: Streamlit re-ejecuta el script en
+# cada interacción, pero este módulo se importa una sola vez, así que el pool,
+# el modo WAL y la migración del esquema se configuran una sola vez. Las
+# conexiones se abren de forma perezosa en la primera escritura; una
+# re-ejecución que no guarda nada no toca la base de datos.
+import os
+import queue
+import sqlite3
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+
+from calculadora import metricas
+
+RUTA_DB = os.environ.get("CALCULADORA_DB", "usuarios.db")
+TAMANO_POOL = int(os.environ.get("CALCULADORA_DB_POOL", "4"))
+TIMEOUT_DB = 10.0
+
+# Cada migración se aplica una sola vez; su posición + 1 es la versión que se
+# guarda en PRAGMA user_version.
+MIGRACIONES = [
+    """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        edad INTEGER,
+        email TEXT,
+        telefono TEXT
+    );
+    CREATE TABLE IF NOT EXISTS finanzas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        ingresos_mensuales REAL,
+        gastos_mensuales REAL,
+        activos_totales REAL,
+        pasivos_totales REAL,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partidas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER NOT NULL,
+        categoria TEXT NOT NULL,
+        nombre TEXT NOT NULL,
+        valor REAL NOT NULL DEFAULT 0,
+        deuda REAL NOT NULL DEFAULT 0,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_partidas_usuario ON partidas(usuario_id);
+    CREATE INDEX IF NOT EXISTS idx_finanzas_usuario ON finanzas(usuario_id);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cache_ia (
+        clave TEXT PRIMARY KEY,
+        respuesta TEXT NOT NULL,
+        creado REAL NOT NULL,
+        usado REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_ia_usado ON cache_ia(usado);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sesiones (
+        id TEXT PRIMARY KEY,
+        datos BLOB NOT NULL,
+        archivada REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_sesiones_archivada ON sesiones(archivada);
+    """,
+]
+
+# Sentencias constantes: sqlite3 las prepara una vez por conexión y las
+# reutiliza desde su caché de sentencias.
+SQL_INSERTAR_USUARIO = """
+    INSERT INTO usuarios (nombre, edad, email, telefono)
+    VALUES (?, ?, ?, ?)
+"""
+SQL_BORRAR_FINANZAS = "DELETE FROM finanzas WHERE usuario_id = ?"
+SQL_INSERTAR_FINANZAS = """
+    INSERT INTO finanzas (usuario_id, ingresos_mensuales, gastos_mensuales, activos_totales, pasivos_totales)
+    VALUES (?, ?, ?, ?, ?)
+"""
+SQL_BORRAR_PARTIDAS = "DELETE FROM partidas WHERE usuario_id = ?"
+SQL_INSERTAR_PARTIDA = """
+    INSERT INTO partidas (usuario_id, categoria, nombre, valor, deuda)
+    VALUES (?, ?, ?, ?, ?)
+"""
+SQL_USUARIOS_FINANZAS = """
+    SELECT u.id, u.nombre, u.edad, u.email, u.telefono,
+           f.ingresos_mensuales, f.gastos_mensuales, f.activos_totales, f.pasivos_totales
+    FROM usuarios u
+    LEFT JOIN finanzas f ON f.usuario_id = u.id
+    ORDER BY u.id
+"""
+SQL_PARTIDAS = "SELECT usuario_id, categoria, nombre, valor, deuda FROM partidas ORDER BY usuario_id, id"
+SQL_LEER_CACHE = "SELECT respuesta, creado FROM cache_ia WHERE clave = ?"
+SQL_TOCAR_CACHE = "UPDATE cache_ia SET usado = ? WHERE clave = ?"
+SQL_BORRAR_CACHE = "DELETE FROM cache_ia WHERE clave = ?"
+SQL_ARCHIVAR_SESION = "INSERT OR REPLACE INTO sesiones (id, datos, archivada) VALUES (?, ?, ?)"
+SQL_LEER_SESION = "SELECT datos FROM sesiones WHERE id = ?"
+SQL_BORRAR_SESION = "DELETE FROM sesiones WHERE id = ?"
+SQL_PURGAR_SESIONES = "DELETE FROM sesiones WHERE archivada < ?"
+SQL_CONTAR_SESIONES = "SELECT COUNT(*), COALESCE(SUM(LENGTH(datos)), 0) FROM sesiones"
+SQL_GUARDAR_CACHE = """
+    INSERT OR REPLACE INTO cache_ia (clave, respuesta, creado, usado)
+    VALUES (?, ?, ?, ?)
+"""
+SQL_DESALOJAR_CACHE = """
+    DELETE FROM cache_ia WHERE clave IN (
+        SELECT clave FROM cache_ia ORDER BY usado DESC LIMIT -1 OFFSET ?
+    )
+"""
+
+
+class PoolConexiones:
+    # solo_lectura: abre un archivo existente sin crearlo ni migrarlo (para
+    # las herramientas de línea de comandos que sólo leen)
+    def __init__(self, ruta=RUTA_DB, tamano=TAMANO_POOL, solo_lectura=False):
+        self.ruta = ruta
+        self.tamano = tamano
+        self.solo_lectura = solo_lectura
+        self._libres = queue.LifoQueue()
+        self._todas = []
+        self._lock = threading.Lock()
+        self._migrado = False
+
+    def _abrir(self):
+        if self.solo_lectura:
+            uri = f"file:{urllib.parse.quote(os.path.abspath(self.ruta))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=TIMEOUT_DB, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout={int(TIMEOUT_DB * 1000)}")
+            return conn
+        conn = sqlite3.connect(self.ruta, timeout=TIMEOUT_DB, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(TIMEOUT_DB * 1000)}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        if not self._migrado:
+            migrar(conn)
+            self._migrado = True
+        return conn
+
+    def _tomar(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._todas) < self.tamano:
+                conn = self._abrir()
+                self._todas.append(conn)
+                return conn
+        try:
+            return self._libres.get(timeout=TIMEOUT_DB)
+        except queue.Empty:
+            # El mismo tipo de error que un "database is locked": quien llama ya lo maneja
+            raise sqlite3.OperationalError(
+                f"No se liberó ninguna de las {self.tamano} conexiones del pool en {TIMEOUT_DB:.0f} s"
+            ) from None
+
+    @contextmanager
+    def conexion(self):
+        # Se miden por separado la espera por una conexión libre y el tiempo
+        # que se usa (calculadora.metricas)
+        inicio = time.perf_counter()
+        conn = self._tomar()
+        tomada = time.perf_counter()
+        metricas.observar("Base de datos: espera", tomada - inicio)
+        error = False
+        try:
+            yield conn
+        except BaseException:
+            error = True
+            raise
+        finally:
+            metricas.observar("Base de datos", time.perf_counter() - tomada, error)
+            self._libres.put(conn)
+
+    def cerrar(self):
+        with self._lock:
+            for conn in self._todas:
+                conn.close()
+            self._todas.clear()
+            self._libres = queue.LifoQueue()
+
+
+def _sentencias(script):
+    actual = ""
+    for linea in script.splitlines(keepends=True):
+        actual += linea
+        if sqlite3.complete_statement(actual):
+            yield actual
+            actual = ""
+
+
+def migrar(conn):
+    # BEGIN IMMEDIATE toma el lock de escritura antes de volver a leer la
+    # versión: si dos procesos arrancan a la vez, el segundo espera y ya ve la
+    # versión nueva en vez de aplicar otra vez la misma migración.
+    # (executescript haría COMMIT antes de empezar, por eso se ejecuta
+    # sentencia por sentencia.)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRACIONES):
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for numero, script in enumerate(MIGRACIONES[version:], start=version + 1):
+            for sentencia in _sentencias(script):
+                conn.execute(sentencia)
+            conn.execute(f"PRAGMA user_version={numero}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexiones()
+    return _pool
+
+
+def cerrar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.cerrar()
+            _pool = None
+
+
+def insertar_usuario(nombre, edad, email, telefono):
+    with obtener_pool().conexion() as conn:
+        with conn:
+            cursor = conn.execute(SQL_INSERTAR_USUARIO, (nombre, edad, email, telefono))
+        return cursor.lastrowid
+
+
+def guardar_finanzas(usuario_id, ingresos, gastos, activos, pasivos, partidas):
+    # Reemplaza el resumen y las partidas del usuario en una sola transacción.
+    # partidas: iterable de (categoria, nombre, valor, deuda).
+    filas = [(usuario_id, categoria, nombre, valor, deuda) for categoria, nombre, valor, deuda in partidas]
+    with obtener_pool().conexion() as conn:
+        with conn:
+            conn.execute(SQL_BORRAR_FINANZAS, (usuario_id,))
+            conn.execute(SQL_INSERTAR_FINANZAS, (usuario_id, ingresos, gastos, activos, pasivos))
+            conn.execute(SQL_BORRAR_PARTIDAS, (usuario_id,))
+            conn.executemany(SQL_INSERTAR_PARTIDA, filas)
+    return len(filas)
+
+
+def usuarios_con_finanzas(pool=None):
+    # Usuarios y su último resumen financiero (None si aún no lo guardaron)
+    with (pool or obtener_pool()).conexion() as conn:
+        return conn.execute(SQL_USUARIOS_FINANZAS).fetchall()
+
+
+def partidas_por_usuario(pool=None):
+    # {usuario_id: [(categoria, nombre, valor, deuda), ...]}
+    partidas = {}
+    with (pool or obtener_pool()).conexion() as conn:
+        for usuario_id, categoria, nombre, valor, deuda in conn.execute(SQL_PARTIDAS):
+            partidas.setdefault(usuario_id, []).append((categoria, nombre, valor, deuda))
+    return partidas
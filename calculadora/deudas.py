@@ -0,0 +1,249 @@
+# Plan de pago de deudas
+#
+# Simula mes a mes el pago de los pasivos con un presupuesto mensual fijo: se
+# cubre el pago mínimo de cada deuda y el resto (incluidos los mínimos de las
+# deudas ya saldadas) va a la primera deuda pendiente según un orden de
+# prioridad. Compara avalancha (mayor tasa primero), bola de nieve (menor
+# saldo primero) y un orden elegido por el usuario, y busca el orden que paga
+# menos intereses entre todos los posibles.
+#
+# simular evalúa muchos órdenes a la vez (una fila por orden). La búsqueda
+# exhaustiva no simula las n! permutaciones por separado: los órdenes que
+# comparten prefijo se comportan igual hasta saldar ese prefijo, así que se
+# recorre el árbol de prefijos por bloques de nodos vectorizados y cada tramo
+# se simula una sola vez. Las deudas que se saldan solas con su pago mínimo
+# no abren ramas, y las ramas que ya pagan más intereses que el mejor orden
+# conocido se podan. Dos deudas con la misma tasa seguidas en el orden dan el
+# mismo resultado en cualquiera de los dos sentidos (su saldo conjunto recibe
+# lo mismo cada mes), así que sólo se recorre uno.
+import math
+
+import numpy as np
+
+MAX_DEUDAS = 10
+MAX_MESES = 600
+TAMANO_BLOQUE = 20000
+EPSILON = 0.005
+
+ESTRATEGIAS = {
+    "avalancha": "Avalancha (mayor tasa primero)",
+    "bola_nieve": "Bola de nieve (menor saldo primero)",
+    "personalizado": "Tu orden",
+    "optimo": "Orden óptimo (menos intereses)"
+}
+
+
+def _arreglos(saldos, tasas, minimos):
+    saldos = np.asarray(saldos, dtype=np.float64)
+    mensual = np.asarray(tasas, dtype=np.float64) / 1200.0
+    minimos = np.asarray(minimos, dtype=np.float64)
+    return saldos, mensual, minimos
+
+
+def orden_avalancha(saldos, tasas):
+    # Mayor tasa primero; a igual tasa, menor saldo
+    return np.lexsort((np.asarray(saldos), -np.asarray(tasas, dtype=np.float64))).tolist()
+
+
+def orden_bola_nieve(saldos, tasas):
+    # Menor saldo primero; a igual saldo, mayor tasa
+    return np.lexsort((-np.asarray(tasas, dtype=np.float64), np.asarray(saldos))).tolist()
+
+
+def simular(saldos, tasas, minimos, presupuesto, ordenes, historial=False, max_meses=MAX_MESES):
+    # ordenes: (k, n) con índices de deuda por prioridad. Devuelve intereses y
+    # meses hasta quedar sin deudas por orden (meses = -1 si no se logra en
+    # max_meses) y, si se pide, el saldo total al final de cada mes.
+    saldos, mensual, minimos = _arreglos(saldos, tasas, minimos)
+    presupuesto = max(float(presupuesto), float(minimos.sum()))
+    ordenes = np.atleast_2d(np.asarray(ordenes, dtype=np.intp))
+    saldo = np.repeat(saldos[None, :], len(ordenes), axis=0)
+    intereses = np.zeros(len(ordenes))
+    meses = np.full(len(ordenes), -1, dtype=np.int32)
+    totales = [saldo.sum(axis=1)]
+    activas = np.nonzero(saldo.sum(axis=1) > EPSILON)[0]
+    meses[saldo.sum(axis=1) <= EPSILON] = 0
+
+    for mes in range(1, max_meses + 1):
+        if not len(activas):
+            break
+        s = saldo[activas]
+        interes = s * mensual
+        s += interes
+        intereses[activas] += interes.sum(axis=1)
+        pago_minimo = np.minimum(s, minimos)
+        s -= pago_minimo
+        resto = presupuesto - pago_minimo.sum(axis=1)
+        # El resto se reparte en orden de prioridad: cada deuda recibe lo que
+        # no se llevaron las anteriores, hasta su saldo
+        orden = ordenes[activas]
+        por_prioridad = np.take_along_axis(s, orden, axis=1)
+        antes = np.cumsum(por_prioridad, axis=1) - por_prioridad
+        por_prioridad -= np.clip(resto[:, None] - antes, 0.0, por_prioridad)
+        por_prioridad[por_prioridad <= EPSILON] = 0.0
+        np.put_along_axis(s, orden, por_prioridad, axis=1)
+        saldo[activas] = s
+        if historial:
+            totales.append(saldo.sum(axis=1))
+        saldadas = s.sum(axis=1) <= EPSILON
+        meses[activas[saldadas]] = mes
+        activas = activas[~saldadas]
+
+    resultado = {"intereses": intereses, "meses": meses, "presupuesto": presupuesto}
+    if historial:
+        resultado["historial"] = np.stack(totales, axis=1)
+    return resultado
+
+
+def _simular_tramo(nodos, mensual, minimos, presupuesto, max_meses):
+    # Avanza cada nodo hasta saldar su deuda objetivo. Lo que sobra del
+    # presupuesto ese mes queda en "sobrante" para el objetivo siguiente.
+    saldo, objetivo = nodos["saldo"], nodos["objetivo"]
+    filas = np.arange(len(objetivo))
+    pago = np.minimum(saldo[filas, objetivo], nodos["sobrante"])
+    saldo[filas, objetivo] -= pago
+    nodos["sobrante"] -= pago
+    pagada = saldo[filas, objetivo] <= EPSILON
+    saldo[filas[pagada], objetivo[pagada]] = 0.0
+    activas = np.nonzero(~pagada)[0]
+
+    while len(activas):
+        s = saldo[activas]
+        interes = s * mensual
+        s += interes
+        nodos["intereses"][activas] += interes.sum(axis=1)
+        pago_minimo = np.minimum(s, minimos)
+        s -= pago_minimo
+        resto = presupuesto - pago_minimo.sum(axis=1)
+        locales = np.arange(len(activas))
+        objetivos = objetivo[activas]
+        pago = np.minimum(s[locales, objetivos], resto)
+        s[locales, objetivos] -= pago
+        resto -= pago
+        s[s <= EPSILON] = 0.0
+        saldo[activas] = s
+        nodos["mes"][activas] += 1
+        saldada = s[locales, objetivos] == 0.0
+        nodos["sobrante"][activas[saldada]] = resto[saldada]
+        agotado = ~saldada & (nodos["mes"][activas] >= max_meses)
+        nodos["intereses"][activas[agotado]] = np.inf
+        activas = activas[~saldada & ~agotado]
+    saldo[saldo <= EPSILON] = 0.0
+
+
+def _hijos(nodos, filas, mensual):
+    # Un hijo por cada deuda pendiente de cada nodo: el siguiente objetivo. A
+    # continuación de una deuda sólo van las de su misma tasa con índice mayor
+    padres, deudas = np.nonzero(nodos["saldo"][filas] > 0.0)
+    padres = filas[padres]
+    anterior = nodos["objetivo"][padres]
+    canonico = (nodos["profundidad"][padres] == 0) | (mensual[deudas] != mensual[anterior]) | (deudas > anterior)
+    padres, deudas = padres[canonico], deudas[canonico]
+    hijos = {clave: valor[padres].copy() for clave, valor in nodos.items()}
+    hijos["objetivo"] = deudas
+    hijos["ruta"][np.arange(len(padres)), hijos["profundidad"]] = deudas
+    hijos["profundidad"] += 1
+    return hijos
+
+
+def _partir(nodos, tamano):
+    return [{clave: valor[i:i + tamano] for clave, valor in nodos.items()}
+            for i in range(0, len(nodos["objetivo"]), tamano)]
+
+
+def buscar_orden_optimo(saldos, tasas, minimos, presupuesto, max_meses=MAX_MESES, tamano_bloque=TAMANO_BLOQUE):
+    # Recorre el árbol de prefijos con poda: los intereses sólo crecen, así que
+    # un prefijo que ya pagó más intereses que el mejor orden conocido (al
+    # inicio, avalancha) no puede llevar a uno mejor y se descarta entero.
+    saldos, mensual, minimos = _arreglos(saldos, tasas, minimos)
+    n = len(saldos)
+    if n > MAX_DEUDAS:
+        raise ValueError(f"La búsqueda exhaustiva admite hasta {MAX_DEUDAS} deudas")
+    presupuesto = max(float(presupuesto), float(minimos.sum()))
+    resultado = {"ordenes": math.factorial(n), "completos": 0, "podados": 0}
+    if not (saldos > EPSILON).any():
+        return {**resultado, "orden": list(range(n)), "intereses": 0.0, "meses": 0}
+
+    avalancha = orden_avalancha(saldos, tasas)
+    inicial = simular(saldos, tasas, minimos, presupuesto, [avalancha], max_meses=max_meses)
+    mejor = {"intereses": math.inf, "meses": -1, "ruta": avalancha}
+    if inicial["meses"][0] >= 0:
+        mejor.update(intereses=float(inicial["intereses"][0]), meses=int(inicial["meses"][0]))
+    # Con la misma tasa en todas (incluida la tasa por defecto, 0) el saldo
+    # total evoluciona igual con cualquier orden: todos pagan los mismos
+    # intereses, ninguna rama se podaría y el árbol entero no cambia nada
+    if (mensual == mensual[0]).all():
+        return {**resultado, "orden": avalancha, "intereses": mejor["intereses"], "meses": mejor["meses"]}
+
+    raiz = {
+        "saldo": saldos[None, :].copy(),
+        "intereses": np.zeros(1),
+        "mes": np.zeros(1, dtype=np.int32),
+        "sobrante": np.zeros(1),
+        "objetivo": np.zeros(1, dtype=np.intp),
+        "ruta": np.full((1, n), -1, dtype=np.int8),
+        "profundidad": np.zeros(1, dtype=np.intp)
+    }
+    # Pila de bloques (profundidad primero): llega pronto a órdenes completos,
+    # lo que ajusta la cota, y acota la memoria
+    pila = _partir(_hijos(raiz, np.arange(1), mensual), tamano_bloque)
+    while pila:
+        nodos = pila.pop()
+        _simular_tramo(nodos, mensual, minimos, presupuesto, max_meses)
+        intereses = nodos["intereses"]
+        hoja = (nodos["saldo"].max(axis=1) == 0.0) & np.isfinite(intereses)
+        if hoja.any():
+            resultado["completos"] += int(hoja.sum())
+            filas = np.nonzero(hoja)[0]
+            i = filas[np.lexsort((nodos["mes"][filas], intereses[filas]))[0]]
+            if (intereses[i], nodos["mes"][i]) < (mejor["intereses"], mejor["meses"]) or mejor["meses"] < 0:
+                ruta = nodos["ruta"][i]
+                mejor = {"intereses": float(intereses[i]), "meses": int(nodos["mes"][i]),
+                         "ruta": [int(d) for d in ruta[ruta >= 0]]}
+        cota = mejor["intereses"] * (1 + 1e-12)
+        # Un nodo con intereses infinitos no saldó su objetivo en max_meses
+        sigue = ~hoja & np.isfinite(intereses) & (intereses <= cota)
+        resultado["podados"] += int((~hoja & ~sigue).sum())
+        if sigue.any():
+            pila.extend(_partir(_hijos(nodos, np.nonzero(sigue)[0], mensual), tamano_bloque))
+
+    # Las deudas que se saldaron solas con su mínimo van al final del orden
+    orden = mejor["ruta"] + [d for d in range(n) if d not in mejor["ruta"]]
+    return {**resultado, "orden": orden, "intereses": mejor["intereses"], "meses": mejor["meses"]}
+
+
+def comparar_estrategias(deudas, presupuesto, personalizado=None):
+    # deudas: [(nombre, saldo, tasa anual %, pago mínimo)] con saldo > 0;
+    # personalizado: nombres en el orden que prefiere el usuario
+    nombres = [d[0] for d in deudas]
+    saldos = [d[1] for d in deudas]
+    tasas = [d[2] for d in deudas]
+    minimos = [d[3] for d in deudas]
+    ordenes = {
+        "avalancha": orden_avalancha(saldos, tasas),
+        "bola_nieve": orden_bola_nieve(saldos, tasas)
+    }
+    if personalizado:
+        elegidos = [nombres.index(nombre) for nombre in personalizado if nombre in nombres]
+        ordenes["personalizado"] = elegidos + [i for i in range(len(nombres)) if i not in elegidos]
+    if len(deudas) <= MAX_DEUDAS:
+        ordenes["optimo"] = buscar_orden_optimo(saldos, tasas, minimos, presupuesto)["orden"]
+
+    claves = list(ordenes)
+    simulacion = simular(saldos, tasas, minimos, presupuesto, [ordenes[c] for c in claves], historial=True)
+    estrategias = {}
+    for fila, clave in enumerate(claves):
+        meses = int(simulacion["meses"][fila])
+        estrategias[clave] = {
+            "nombre": ESTRATEGIAS[clave],
+            "orden": [nombres[i] for i in ordenes[clave]],
+            "meses": meses if meses >= 0 else None,
+            "intereses": round(float(simulacion["intereses"][fila]), 2),
+            "saldo_mensual": [round(float(v), 2) for v in simulacion["historial"][fila]]
+        }
+    return {
+        "presupuesto": simulacion["presupuesto"],
+        "total_deuda": round(float(sum(saldos)), 2),
+        "estrategias": estrategias,
+        "ordenes_posibles": math.factorial(len(deudas))
+    }
@@ -0,0 +1,291 @@
+# Gráficos del reporte
+#
+# Cada gráfico se dibuja una sola vez con Pillow a una resolución fija y se
+# guarda como PNG en un directorio de caché, con la huella (SHA-256) de sus
+# datos como nombre. La página de Streamlit y el PDF usan el mismo archivo, y
+# el mismo reporte pedido otra vez (o por otro proceso del lote) no se
+# vuelve a dibujar. Pillow se importa sólo al dibujar un gráfico nuevo. El
+# directorio no pasa de MAX_GRAFICOS archivos más los dibujados desde la
+# última revisión: cada acierto renueva la fecha del PNG y cada REVISAR_CADA
+# gráficos nuevos se borran los menos usados (LRU).
+import functools
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import unicodedata
+
+RUTA_CACHE = os.environ.get("CALCULADORA_GRAFICOS", os.path.join(tempfile.gettempdir(), "calculadora_graficos"))
+FUENTE = os.environ.get("CALCULADORA_FUENTE", "DejaVuSans.ttf")
+MAX_GRAFICOS = int(os.environ.get("CALCULADORA_GRAFICOS_MAX", 500))
+# Cada cuántos gráficos nuevos se revisa el tamaño del directorio
+REVISAR_CADA = 20
+VERSION = 2
+
+DPI = 150
+ANCHO_MM = 170
+ALTO_MM = 70
+
+FONDO = (255, 255, 255)
+TEXTO = (49, 51, 63)
+REJILLA = (228, 230, 235)
+VERDE = (46, 160, 67)
+ROJO = (214, 69, 65)
+AZUL = (31, 119, 180)
+GRIS = (140, 140, 140)
+
+
+def _px(mm):
+    return round(mm / 25.4 * DPI)
+
+
+@functools.lru_cache(maxsize=None)
+def _fuente(puntos):
+    # (fuente, sólo_ascii): si FUENTE no está instalada se usa la de Pillow,
+    # que no trae tildes ni eñes
+    from PIL import ImageFont
+
+    tamano = round(puntos * DPI / 72)
+    try:
+        return ImageFont.truetype(FUENTE, tamano), False
+    except OSError:
+        return ImageFont.load_default(size=tamano), True
+
+
+def _ajustar(texto, solo_ascii):
+    if not solo_ascii:
+        return texto
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def _escribir(dibujo, posicion, texto, puntos=8, anchor="la"):
+    fuente, solo_ascii = _fuente(puntos)
+    dibujo.text(posicion, _ajustar(texto, solo_ascii), fill=TEXTO, font=fuente, anchor=anchor)
+
+
+def _largo(dibujo, texto, puntos=8):
+    fuente, solo_ascii = _fuente(puntos)
+    return dibujo.textlength(_ajustar(texto, solo_ascii), font=fuente)
+
+
+def _abreviar(valor):
+    signo = "-" if valor < 0 else ""
+    valor = abs(valor)
+    for divisor, sufijo in ((1e6, "M"), (1e3, "k")):
+        if valor >= divisor:
+            return f"{signo}${valor / divisor:,.1f}{sufijo}".replace(".0" + sufijo, sufijo)
+    return f"{signo}${valor:,.0f}"
+
+
+def _marcas(minimo, maximo, cantidad=5):
+    # Marcas "redondas" (1, 2, 5 × 10^n) que cubren [minimo, maximo]
+    minimo, maximo = min(minimo, 0.0), max(maximo, 0.0)
+    if maximo - minimo < 1e-9:
+        maximo = minimo + 1.0
+    bruto = (maximo - minimo) / cantidad
+    potencia = 10 ** math.floor(math.log10(bruto))
+    paso = next(m * potencia for m in (1, 2, 5, 10) if m * potencia >= bruto)
+    inicio = math.floor(minimo / paso) * paso
+    fin = math.ceil(maximo / paso) * paso
+    return [inicio + i * paso for i in range(round((fin - inicio) / paso) + 1)]
+
+
+def _lienzo(titulo):
+    from PIL import Image, ImageDraw
+
+    imagen = Image.new("RGB", (_px(ANCHO_MM), _px(ALTO_MM)), FONDO)
+    dibujo = ImageDraw.Draw(imagen)
+    _escribir(dibujo, (_px(4), _px(2)), titulo, 11)
+    return imagen, dibujo
+
+
+def _dibujar_barras_horizontales(datos):
+    # Barras con signo desde el eje en cero: los montos negativos van a la
+    # izquierda, con su valor a la izquierda de la barra
+    imagen, dibujo = _lienzo(datos["titulo"])
+    filas = datos["filas"]
+    etiquetas = _px(4) + max(_largo(dibujo, f[0]) for f in filas) + _px(3)
+    minimo = min(min(f[1] for f in filas), 0.0)
+    maximo = max(max(f[1] for f in filas), 0.0)
+    izquierda = etiquetas + (_px(20) if minimo < 0 else 0)
+    derecha = imagen.width - (_px(22) if maximo > 0 else _px(4))
+    arriba, abajo = _px(11), imagen.height - _px(3)
+    escala = (derecha - izquierda) / ((maximo - minimo) or 1.0)
+    cero = izquierda - minimo * escala
+    alto_fila = (abajo - arriba) / len(filas)
+    if minimo < 0:
+        dibujo.line((cero, arriba, cero, abajo), fill=GRIS, width=2)
+    for i, (etiqueta, monto, color) in enumerate(filas):
+        centro = arriba + alto_fila * (i + 0.5)
+        fin = cero + monto * escala
+        grosor = min(alto_fila * 0.35, _px(3))
+        _escribir(dibujo, (etiquetas - _px(2), centro), etiqueta, anchor="rm")
+        dibujo.rectangle((min(cero, fin), centro - grosor, max(max(cero, fin), min(cero, fin) + 1), centro + grosor),
+                         fill=tuple(color))
+        if monto < 0:
+            _escribir(dibujo, (fin - _px(1.5), centro), _abreviar(monto), anchor="rm")
+        else:
+            _escribir(dibujo, (fin + _px(1.5), centro), _abreviar(monto), anchor="lm")
+    return imagen
+
+
+def _dibujar_barras(datos):
+    imagen, dibujo = _lienzo(datos["titulo"])
+    barras = datos["barras"]
+    marcas = _marcas(min(b[1] for b in barras), max(b[1] for b in barras))
+    izquierda, derecha = _px(20), imagen.width - _px(6)
+    arriba, abajo = _px(12), imagen.height - _px(9)
+
+    def y(valor):
+        return abajo - (valor - marcas[0]) / (marcas[-1] - marcas[0]) * (abajo - arriba)
+
+    for marca in marcas:
+        dibujo.line((izquierda, y(marca), derecha, y(marca)), fill=REJILLA if marca else GRIS, width=2)
+        _escribir(dibujo, (izquierda - _px(1.5), y(marca)), _abreviar(marca), anchor="rm")
+    ancho = (derecha - izquierda) / len(barras)
+    for i, (etiqueta, monto, color) in enumerate(barras):
+        x0 = izquierda + ancho * (i + 0.25)
+        x1 = izquierda + ancho * (i + 0.75)
+        dibujo.rectangle((x0, min(y(0), y(monto)), x1, max(y(0), y(monto))), fill=tuple(color))
+        _escribir(dibujo, ((x0 + x1) / 2, abajo + _px(2)), etiqueta, anchor="mt")
+    return imagen
+
+
+def _dibujar_curva(datos):
+    imagen, dibujo = _lienzo(datos["titulo"])
+    edades, capital = datos["edades"], datos["capital"]
+    marcas = _marcas(min(capital), max(capital))
+    izquierda, derecha = _px(20), imagen.width - _px(6)
+    arriba, abajo = _px(12), imagen.height - _px(9)
+
+    def x(edad):
+        return izquierda + (edad - edades[0]) / max(edades[-1] - edades[0], 1) * (derecha - izquierda)
+
+    def y(valor):
+        return abajo - (valor - marcas[0]) / (marcas[-1] - marcas[0]) * (abajo - arriba)
+
+    for marca in marcas:
+        dibujo.line((izquierda, y(marca), derecha, y(marca)), fill=REJILLA if marca else GRIS, width=2)
+        _escribir(dibujo, (izquierda - _px(1.5), y(marca)), _abreviar(marca), anchor="rm")
+    for edad in range(edades[0] - edades[0] % 10 + 10, edades[-1] + 1, 10):
+        _escribir(dibujo, (x(edad), abajo + _px(2)), str(edad), anchor="mt")
+
+    retiro = datos["edad_retiro"]
+    dibujo.line((x(retiro), arriba, x(retiro), abajo), fill=GRIS, width=2)
+    _escribir(dibujo, (x(retiro) + _px(1), arriba), f"Retiro: {retiro}", anchor="lt")
+    puntos = [(x(e), y(c)) for e, c in zip(edades, capital)]
+    dibujo.line(puntos, fill=AZUL, width=_px(0.6), joint="curve")
+    return imagen
+
+
+_DIBUJOS = {
+    "barras_horizontales": _dibujar_barras_horizontales,
+    "barras": _dibujar_barras,
+    "curva": _dibujar_curva
+}
+
+_lock = threading.Lock()
+_estadisticas = {"hits": 0, "misses": 0, "borrados": 0}
+
+
+def _podar(maximo=MAX_GRAFICOS):
+    # Deja los `maximo` PNG usados más recientemente; otro proceso puede
+    # estar borrando o escribiendo a la vez
+    archivos = []
+    try:
+        with os.scandir(RUTA_CACHE) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(".png"):
+                    try:
+                        archivos.append((entrada.stat().st_mtime, entrada.path))
+                    except FileNotFoundError:
+                        pass
+    except FileNotFoundError:
+        return 0
+    borrados = 0
+    for _, ruta in sorted(archivos)[:max(len(archivos) - maximo, 0)]:
+        try:
+            os.remove(ruta)
+            borrados += 1
+        except FileNotFoundError:
+            pass
+    with _lock:
+        _estadisticas["borrados"] += borrados
+    return borrados
+
+
+def _imagen(tipo, datos):
+    contenido = json.dumps([VERSION, FUENTE, DPI, ANCHO_MM, ALTO_MM, tipo, datos], sort_keys=True, ensure_ascii=False)
+    clave = hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:32]
+    ruta = os.path.join(RUTA_CACHE, f"{tipo}_{clave}.png")
+    try:
+        # La fecha del archivo es la de su último uso, para el LRU de _podar
+        os.utime(ruta)
+        with _lock:
+            _estadisticas["hits"] += 1
+        return ruta
+    except FileNotFoundError:
+        pass
+    with _lock:
+        _estadisticas["misses"] += 1
+        podar = _estadisticas["misses"] % REVISAR_CADA == 1
+    os.makedirs(RUTA_CACHE, exist_ok=True)
+    # Archivo temporal + rename: otro hilo o proceso nunca ve un PNG a medias
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    _DIBUJOS[tipo](datos).save(temporal, "PNG", dpi=(DPI, DPI))
+    os.replace(temporal, ruta)
+    if podar:
+        _podar()
+    return ruta
+
+
+def estadisticas():
+    with _lock:
+        return dict(_estadisticas)
+
+
+def grafico_balance(activos, pasivos, partidas=None):
+    # partidas: tuplas (categoria, nombre, valor, deuda) como las guarda db.guardar_finanzas.
+    # Cada partida con su signo: un auto que vale menos que su crédito resta
+    montos = [(nombre, round(valor - deuda, 2)) for categoria, nombre, valor, deuda in partidas or ()
+              if categoria in ("activo", "pasivo") and valor != deuda]
+    if not montos:
+        montos = [("Activos", round(activos, 2)), ("Pasivos", -round(pasivos, 2))]
+    filas = [(nombre, monto, VERDE if monto >= 0 else ROJO) for nombre, monto in montos]
+    return _imagen("barras_horizontales", {"titulo": "Activos y pasivos (neto de deuda)", "filas": filas})
+
+
+def grafico_flujo_caja(ingresos, gastos):
+    saldo = ingresos - gastos
+    barras = [
+        ("Ingresos", round(ingresos, 2), VERDE),
+        ("Gastos", round(gastos, 2), ROJO),
+        ("Saldo", round(saldo, 2), AZUL if saldo >= 0 else ROJO)
+    ]
+    return _imagen("barras", {"titulo": "Flujo de caja mensual", "barras": barras})
+
+
+def grafico_retiro(edades, capital, edad_retiro):
+    datos = {
+        "titulo": "Proyección de tus ahorros (en dinero de hoy)",
+        "edades": [int(e) for e in edades],
+        "capital": [round(float(c), 2) for c in capital],
+        "edad_retiro": int(edad_retiro)
+    }
+    return _imagen("curva", datos)
+
+
+def graficos_reporte(finanzas_data, analisis_data):
+    # [(sección, ruta del PNG)] con los gráficos que permiten los datos del reporte
+    graficos = []
+    if finanzas_data.get("ingresos") is not None:
+        graficos.append(("finanzas", grafico_balance(
+            finanzas_data["activos"], finanzas_data["pasivos"], finanzas_data.get("partidas"))))
+        graficos.append(("finanzas", grafico_flujo_caja(finanzas_data["ingresos"], finanzas_data["gastos"])))
+    trayectoria = analisis_data.get("proyeccion_retiro", {}).get("trayectoria")
+    if trayectoria:
+        graficos.append(("retiro", grafico_retiro(
+            trayectoria["edades"], trayectoria["capital"], trayectoria["edad_retiro"])))
+    return graficos
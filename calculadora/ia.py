@@ -0,0 +1,242 @@
+# Generación del plan de trabajo con OpenAI
+#
+# Las respuestas se guardan en una caché persistente (tabla cache_ia de la
+# base de datos) con vencimiento (TTL) y desalojo LRU. La clave se arma con
+# los montos redondeados en bandas (y el signo del flujo de caja y del
+# patrimonio), así perfiles casi idénticos comparten la misma respuesta; al
+# modelo le llegan las cifras reales, con la indicación de citarlas
+# redondeadas para que la respuesta sirva a todo el perfil.
+#
+# Cada llamada a la API registra su latencia, los tokens usados y los errores
+# por tipo en calculadora.metricas.
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from calculadora import db, metricas
+from calculadora.moneda import format_currency
+
+MODELO = "gpt-3.5-turbo"
+TEMPERATURA = 0.7
+MENSAJE_SISTEMA = "Eres un asesor experto en inversión en bienes raíces. Responde en español con enfoque práctico."
+
+TTL_CACHE = float(os.environ.get("CALCULADORA_CACHE_TTL", 7 * 24 * 3600))
+MAX_ENTRADAS_CACHE = int(os.environ.get("CALCULADORA_CACHE_MAX", 5000))
+CIFRAS_BANDA = 2
+
+
+def banda(valor, cifras=CIFRAS_BANDA):
+    # Redondea a `cifras` dígitos significativos: 5234 -> 5200, 123456 -> 120000
+    if not valor:
+        return 0.0
+    paso = 10 ** (math.floor(math.log10(abs(valor))) - cifras + 1)
+    return float(round(valor / paso) * paso)
+
+
+def construir_prompt(ingresos, gastos, activos, pasivos):
+    return f"""
+    Como experto en bienes raíces y finanzas personales, analiza esta situación:
+    - Ingresos: {format_currency(ingresos)}/mes
+    - Gastos: {format_currency(gastos)}/mes
+    - Activos: {format_currency(activos)}
+    - Pasivos: {format_currency(pasivos)}
+    
+    Crea un plan detallado para inversión en bienes raíces que incluya:
+    1. Diagnóstico de la situación actual
+    2. Estrategias para mejorar flujo de caja
+    3. Plan de reducción de deudas
+    4. Recomendaciones de inversión personalizadas
+    5. Metas a corto, mediano y largo plazo
+    6. Ejercicios prácticos
+    7. Recomendaciones de cursos
+    
+    Usa lenguaje claro y motivador, con ejemplos concretos.
+    Cuando cites estas cifras, usa montos redondeados (por ejemplo, "unos $5,000").
+    Respuesta en español.
+    """
+
+
+def construir_mensajes(ingresos, gastos, activos, pasivos):
+    return [
+        {"role": "system", "content": MENSAJE_SISTEMA},
+        {"role": "user", "content": construir_prompt(ingresos, gastos, activos, pasivos)}
+    ]
+
+
+def _signo(valor):
+    return (valor > 0) - (valor < 0)
+
+
+def clave_cache(ingresos, gastos, activos, pasivos):
+    # Los mensajes con los montos en bandas (así un cambio en el prompt cambia
+    # la clave) y el signo del flujo de caja y del patrimonio, que las bandas
+    # pueden llevar a 0: un flujo de -$20 no comparte respuesta con uno de $0
+    mensajes = construir_mensajes(banda(ingresos), banda(gastos), banda(activos), banda(pasivos))
+    signos = [_signo(ingresos - gastos), _signo(activos - pasivos)]
+    return CacheRespuestas.clave(MODELO, TEMPERATURA, mensajes + [signos])
+
+
+class CacheRespuestas:
+    def __init__(self, pool=None, ttl=TTL_CACHE, max_entradas=MAX_ENTRADAS_CACHE):
+        self._pool = pool
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        return self._pool or db.obtener_pool()
+
+    @staticmethod
+    def clave(modelo, temperatura, mensajes):
+        contenido = json.dumps([modelo, temperatura, mensajes], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def _contar(self, hit):
+        metricas.contar("ia_cache", resultado="acierto" if hit else "fallo")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def obtener(self, clave):
+        ahora = time.time()
+        try:
+            with self.pool.conexion() as conn:
+                fila = conn.execute(db.SQL_LEER_CACHE, (clave,)).fetchone()
+                if fila is not None and ahora - fila[1] > self.ttl:
+                    with conn:
+                        conn.execute(db.SQL_BORRAR_CACHE, (clave,))
+                    fila = None
+                if fila is not None:
+                    with conn:
+                        conn.execute(db.SQL_TOCAR_CACHE, (ahora, clave))
+        except sqlite3.Error:
+            fila = None
+        self._contar(fila is not None)
+        return fila[0] if fila is not None else None
+
+    def guardar(self, clave, respuesta):
+        ahora = time.time()
+        try:
+            with self.pool.conexion() as conn:
+                with conn:
+                    conn.execute(db.SQL_GUARDAR_CACHE, (clave, respuesta, ahora, ahora))
+                    conn.execute(db.SQL_DESALOJAR_CACHE, (self.max_entradas,))
+        except sqlite3.Error:
+            pass
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tasa_aciertos": self.hits / total if total else 0.0
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheRespuestas()
+    return _cache
+
+
+def _registrar_uso(uso):
+    if uso is not None:
+        metricas.contar("openai_tokens", uso.prompt_tokens, tipo="prompt")
+        metricas.contar("openai_tokens", uso.completion_tokens, tipo="completion")
+
+
+class RespuestaVacia(RuntimeError):
+    # La API respondió sin texto (por ejemplo, filtrada por contenido); no se
+    # guarda en la caché y la app muestra el plan local
+    pass
+
+
+def _registrar_error(error):
+    # RateLimitError, APITimeoutError, APIConnectionError...
+    metricas.contar("openai_errores", tipo=type(error).__name__)
+
+
+def generar_plan(client, ingresos, gastos, activos, pasivos, cache=None):
+    cache = cache or obtener_cache()
+    mensajes = construir_mensajes(ingresos, gastos, activos, pasivos)
+    clave = clave_cache(ingresos, gastos, activos, pasivos)
+    plan = cache.obtener(clave)
+    if not plan:
+        try:
+            with metricas.medir("OpenAI"):
+                response = client.chat.completions.create(
+                    model=MODELO,
+                    messages=mensajes,
+                    temperature=TEMPERATURA
+                )
+        except Exception as e:
+            _registrar_error(e)
+            raise
+        _registrar_uso(response.usage)
+        plan = response.choices[0].message.content
+        if not plan:
+            _registrar_error(RespuestaVacia())
+            raise RespuestaVacia("la respuesta de OpenAI llegó vacía")
+        cache.guardar(clave, plan)
+    return plan
+
+
+def generar_plan_stream(client, ingresos, gastos, activos, pasivos, cache=None):
+    # Igual que generar_plan, pero entrega el texto por fragmentos a medida que
+    # llegan de la API (stream=True). Una respuesta en caché se entrega completa.
+    cache = cache or obtener_cache()
+    mensajes = construir_mensajes(ingresos, gastos, activos, pasivos)
+    clave = clave_cache(ingresos, gastos, activos, pasivos)
+    plan = cache.obtener(clave)
+    if plan:
+        yield plan
+        return
+    # El uso (tokens) llega en un último fragmento sin choices
+    inicio = time.perf_counter()
+    partes = []
+    uso = None
+    try:
+        stream = client.chat.completions.create(
+            model=MODELO,
+            messages=mensajes,
+            temperature=TEMPERATURA,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            uso = getattr(chunk, "usage", None) or uso
+            if not chunk.choices:
+                continue
+            texto = chunk.choices[0].delta.content
+            if texto:
+                if not partes:
+                    metricas.observar("OpenAI: primer fragmento", time.perf_counter() - inicio)
+                partes.append(texto)
+                yield texto
+    except Exception as e:
+        metricas.observar("OpenAI (stream)", time.perf_counter() - inicio, error=True)
+        _registrar_error(e)
+        raise
+    metricas.observar("OpenAI (stream)", time.perf_counter() - inicio)
+    _registrar_uso(uso)
+    if not partes:
+        _registrar_error(RespuestaVacia())
+        raise RespuestaVacia("la respuesta de OpenAI llegó vacía")
+    cache.guardar(clave, "".join(partes))
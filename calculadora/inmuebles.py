@@ -0,0 +1,187 @@
+# Análisis de propiedades en arriendo
+#
+# Calcula para una lista de propiedades candidatas (una fila por propiedad)
+# la cuota del crédito hipotecario, el ingreso operativo neto, la tasa de
+# capitalización (cap rate), el retorno sobre el efectivo invertido (cash on
+# cash), la cobertura de la deuda (DSCR) y la ocupación mínima para no perder
+# dinero. Todo se calcula por columnas con NumPy, así que cientos o miles de
+# avisos pegados desde una hoja de cálculo se analizan y ordenan de una vez.
+# Los porcentajes de entrada van en puntos (20 = 20%), como la tasa de los
+# pasivos; los de salida son fracciones. Los montos en texto se leen con
+# calculadora.moneda, como en lote.
+import io
+
+import numpy as np
+import pandas as pd
+
+from calculadora import moneda
+
+COLUMNAS = ["precio", "arriendo"]
+
+# Valores que se usan cuando el archivo no trae la columna o la celda está vacía
+SUPUESTOS = {
+    "cuota_inicial": 20.0,   # % del precio
+    "tasa": 11.0,            # % anual del crédito
+    "plazo": 20,             # años
+    "vacancia": 5.0,         # % del año sin arrendatario
+    "gastos": 30.0,          # % del arriendo (administración, impuestos, seguros, mantenimiento)
+    "cierre": 3.0            # % del precio en gastos de escrituración
+}
+
+# Cobertura mínima que suelen exigir los bancos para créditos de renta
+DSCR_MINIMO = 1.25
+# Cuota máxima recomendada frente a los ingresos mensuales del hogar
+CUOTA_MAXIMA_INGRESOS = 0.30
+
+
+def cuota_mensual(prestamo, tasa_anual, plazo_anios):
+    # Cuota fija (sistema francés); tasa_anual en puntos. Acepta arreglos.
+    prestamo, tasa, meses = np.broadcast_arrays(
+        np.asarray(prestamo, dtype=np.float64),
+        np.asarray(tasa_anual, dtype=np.float64) / 1200.0,
+        np.round(np.asarray(plazo_anios, dtype=np.float64) * 12)
+    )
+    casi_cero = np.abs(tasa) < 1e-12
+    segura = np.where(casi_cero, 1.0, tasa)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cuota = np.where(casi_cero, prestamo / meses, prestamo * segura / -np.expm1(-meses * np.log1p(segura)))
+    return np.where((meses > 0) & (prestamo > 0), cuota, 0.0)
+
+
+def amortizacion(prestamo, tasa_anual, plazo_anios):
+    # Tabla mes a mes: saldo_k = P(1+r)^k - c((1+r)^k - 1)/r, sin recorrer los meses
+    meses = int(round(plazo_anios * 12))
+    cuota = float(cuota_mensual(prestamo, tasa_anual, plazo_anios))
+    tasa = tasa_anual / 1200.0
+    k = np.arange(meses + 1, dtype=np.float64)
+    if abs(tasa) < 1e-12:
+        saldo = prestamo - cuota * k
+    else:
+        crecimiento = np.exp(k * np.log1p(tasa))
+        saldo = prestamo * crecimiento - cuota * np.expm1(k * np.log1p(tasa)) / tasa
+    saldo = np.maximum(saldo, 0.0)
+    saldo[-1] = 0.0
+    intereses = saldo[:-1] * tasa
+    return pd.DataFrame({
+        "mes": np.arange(1, meses + 1),
+        "cuota": np.full(meses, cuota),
+        "interes": intereses,
+        "abono_capital": saldo[:-1] - saldo[1:],
+        "saldo": saldo[1:]
+    })
+
+
+def _sin_porcentaje(valor):
+    return valor.strip().rstrip("%") if isinstance(valor, str) else valor
+
+
+def _leer_numeros(df, formato=None):
+    # {columna: arreglo float} de las columnas numéricas presentes ("$250,000",
+    # "20%"), con NaN en las celdas vacías; ValueError si alguna celda no es
+    # un número, en vez de leerla como 0
+    presentes = [c for c in COLUMNAS + list(SUPUESTOS) if c in df.columns]
+    textos = pd.DataFrame({c: df[c].map(_sin_porcentaje) for c in presentes})
+    numeros = {c: serie.to_numpy() for c, serie in moneda.leer_columnas(textos, presentes, formato).items()}
+    vacias = [f"fila {fila + 2} sin {c}" for c in COLUMNAS for fila in np.flatnonzero(np.isnan(numeros[c]))]
+    if vacias:
+        resto = len(vacias) - moneda.CELDAS_EN_ERROR
+        raise ValueError(", ".join(vacias[:moneda.CELDAS_EN_ERROR]) + (f" y {resto} más" if resto > 0 else ""))
+    return numeros
+
+
+def _columna(numeros, nombre, defecto):
+    if nombre not in numeros:
+        return np.full(len(numeros["precio"]), float(defecto))
+    return np.where(np.isnan(numeros[nombre]), defecto, numeros[nombre])
+
+
+def analizar(df, supuestos=None, ingresos_mensuales=None, formato=None):
+    # Devuelve una copia de df con las métricas de cada propiedad, ordenada:
+    # primero las que cubren la deuda con holgura (DSCR >= DSCR_MINIMO y flujo
+    # positivo), y dentro de cada grupo por retorno sobre el efectivo
+    faltantes = [c for c in COLUMNAS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+    supuestos = {**SUPUESTOS, **(supuestos or {})}
+    numeros = _leer_numeros(df, formato)
+    precio = numeros["precio"]
+    arriendo = numeros["arriendo"]
+    cuota_inicial = _columna(numeros, "cuota_inicial", supuestos["cuota_inicial"]) / 100
+    tasa = _columna(numeros, "tasa", supuestos["tasa"])
+    plazo = _columna(numeros, "plazo", supuestos["plazo"])
+    vacancia = _columna(numeros, "vacancia", supuestos["vacancia"]) / 100
+    cierre = _columna(numeros, "cierre", supuestos["cierre"]) / 100
+    # "gastos" en el archivo es un monto mensual; el supuesto, un % del arriendo
+    gastos = _columna(numeros, "gastos", np.nan)
+    gastos = np.where(np.isnan(gastos), arriendo * supuestos["gastos"] / 100, gastos)
+
+    renta_bruta = arriendo * 12
+    ingreso_neto = renta_bruta * (1 - vacancia) - gastos * 12
+    prestamo = precio * (1 - cuota_inicial)
+    cuota = cuota_mensual(prestamo, tasa, plazo)
+    servicio_deuda = cuota * 12
+    flujo_anual = ingreso_neto - servicio_deuda
+    inversion = precio * (cuota_inicial + cierre)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cap_rate = np.where(precio > 0, ingreso_neto / precio, np.nan)
+        cash_on_cash = np.where(inversion > 0, flujo_anual / inversion, np.nan)
+        dscr = np.where(servicio_deuda > 0, ingreso_neto / servicio_deuda, np.inf)
+        ocupacion_equilibrio = np.where(renta_bruta > 0, (gastos * 12 + servicio_deuda) / renta_bruta, np.inf)
+
+    resultado = df.copy()
+    if "nombre" not in resultado.columns:
+        resultado.insert(0, "nombre", [f"Propiedad {i}" for i in range(1, len(df) + 1)])
+    # Los montos ya leídos y los supuestos aplicados a cada fila
+    resultado["precio"] = precio
+    resultado["arriendo"] = arriendo
+    resultado["prestamo"] = np.round(prestamo, 2)
+    resultado["tasa"] = tasa
+    resultado["plazo"] = plazo
+    resultado["cuota_mensual"] = np.round(cuota, 2)
+    resultado["ingreso_neto_anual"] = np.round(ingreso_neto, 2)
+    resultado["flujo_mensual"] = np.round(flujo_anual / 12, 2)
+    resultado["inversion_inicial"] = np.round(inversion, 2)
+    resultado["cap_rate"] = cap_rate
+    resultado["cash_on_cash"] = cash_on_cash
+    resultado["dscr"] = dscr
+    resultado["ocupacion_equilibrio"] = ocupacion_equilibrio
+    resultado["viable"] = (dscr >= DSCR_MINIMO) & (flujo_anual >= 0)
+    if ingresos_mensuales:
+        resultado["cuota_ingresos"] = cuota / ingresos_mensuales
+        resultado["alcanzable"] = cuota <= ingresos_mensuales * CUOTA_MAXIMA_INGRESOS
+
+    # Orden estable con lexsort: la última llave es la principal
+    orden = np.lexsort((-np.nan_to_num(cash_on_cash, nan=-np.inf), ~resultado["viable"].to_numpy()))
+    resultado = resultado.iloc[orden].reset_index(drop=True)
+    resultado.insert(0, "puesto", np.arange(1, len(resultado) + 1))
+    return resultado
+
+
+def leer_texto(texto):
+    # Tabla pegada desde una hoja de cálculo (tabuladores) o un CSV (comas o
+    # punto y coma). Todo como texto: el formato de los montos lo decide moneda
+    df = pd.read_csv(io.StringIO(texto.strip()), sep=None, engine="python", dtype=str)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    return df
+
+
+def resumen(resultado, cantidad=5):
+    # Las primeras propiedades del ranking, para el reporte
+    columnas = ["puesto", "nombre", "precio", "arriendo", "flujo_mensual", "cap_rate",
+                "cash_on_cash", "dscr", "ocupacion_equilibrio", "viable"]
+    filas = resultado[columnas].head(cantidad)
+    return {
+        "analizadas": len(resultado),
+        "viables": int(resultado["viable"].sum()),
+        "mejores": [{c: (v.item() if hasattr(v, "item") else v) for c, v in fila.items()}
+                    for fila in filas.to_dict("records")]
+    }
+
+
+def analizar_csv(entrada, salida, supuestos=None, formato=None):
+    df = pd.read_csv(entrada, dtype=str)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    resultado = analizar(df, supuestos, formato=formato)
+    resultado.to_csv(salida, index=False)
+    return resultado
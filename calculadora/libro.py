@@ -0,0 +1,105 @@
+# Libro de partidas con totales acumulados
+#
+# Guarda los montos de una sección (activos, pasivos, ingresos o gastos) y
+# mantiene sus totales al día: cambiar una partida sólo ajusta el total con la
+# diferencia, sin volver a sumar todas las demás. Los montos se guardan en
+# centavos enteros para que los totales acumulados no arrastren errores de
+# redondeo. Cada libro puede llevar columnas adicionales a valor y deuda (por
+# ejemplo, tasa de interés y pago mínimo de los pasivos).
+#
+# Hay un libro por sección y por sesión, así que la representación es
+# compacta: los montos van en un solo array de enteros (una fila por partida,
+# una columna por campo) y el índice nombre -> fila se comparte entre todos
+# los libros con las mismas partidas.
+import functools
+from array import array
+
+CAMPOS = ("valor", "deuda")
+
+
+def _a_centavos(monto):
+    return int(round(monto * 100))
+
+
+@functools.lru_cache(maxsize=64)
+def _indices(nombres):
+    # Compartido entre libros: no se modifica, se reemplaza
+    return {nombre: fila for fila, nombre in enumerate(nombres)}
+
+
+class Libro:
+    __slots__ = ("signo", "campos", "_nombres", "_indices", "_montos", "_totales")
+
+    def __init__(self, nombres=(), signo=1, campos=CAMPOS):
+        # signo=-1 para pasivos: su neto resta del patrimonio
+        self.signo = signo
+        self.campos = tuple(campos)
+        self._nombres = tuple(dict.fromkeys(nombres))
+        self._indices = _indices(self._nombres)
+        self._montos = array("q", bytes(8 * len(self._nombres) * len(self.campos)))
+        self._totales = array("q", bytes(8 * len(self.campos)))
+
+    def __getstate__(self):
+        return self.signo, self.campos, self._nombres, self._montos, self._totales
+
+    def __setstate__(self, estado):
+        self.signo, self.campos, self._nombres, self._montos, self._totales = estado
+        self._indices = _indices(self._nombres)
+
+    def __contains__(self, nombre):
+        return nombre in self._indices
+
+    def __len__(self):
+        return len(self._nombres)
+
+    def _posicion(self, nombre, campo):
+        return self._indices[nombre] * len(self.campos) + self.campos.index(campo)
+
+    def _fila(self, nombre):
+        inicio = self._indices[nombre] * len(self.campos)
+        return self._montos[inicio:inicio + len(self.campos)]
+
+    def nombres(self):
+        return list(self._nombres)
+
+    def monto(self, nombre, campo="valor"):
+        return self._montos[self._posicion(nombre, campo)] / 100
+
+    def actualizar(self, nombre, campo, monto):
+        if nombre not in self._indices:
+            self._nombres += (nombre,)
+            self._indices = _indices(self._nombres)
+            self._montos.extend([0] * len(self.campos))
+        posicion = self._posicion(nombre, campo)
+        centavos = _a_centavos(monto)
+        self._totales[self.campos.index(campo)] += centavos - self._montos[posicion]
+        self._montos[posicion] = centavos
+
+    def quitar(self, nombre):
+        fila = self._indices[nombre]
+        ancho = len(self.campos)
+        for indice, centavos in enumerate(self._fila(nombre)):
+            self._totales[indice] -= centavos
+        del self._montos[fila * ancho:(fila + 1) * ancho]
+        self._nombres = self._nombres[:fila] + self._nombres[fila + 1:]
+        self._indices = _indices(self._nombres)
+
+    def neto(self, nombre=None):
+        valor, deuda = (self._totales if nombre is None else self._fila(nombre))[:2]
+        return self.signo * (valor - deuda) / 100
+
+    def total(self, campo="valor"):
+        return self._totales[self.campos.index(campo)] / 100
+
+    def totales(self):
+        return {"valor": self.total("valor"), "deuda": self.total("deuda"), "neto": self.neto()}
+
+    def partidas(self):
+        # (nombre, valor, deuda) en el orden en que se agregaron
+        ancho = len(self.campos)
+        return [(nombre, self._montos[fila * ancho] / 100, self._montos[fila * ancho + 1] / 100)
+                for fila, nombre in enumerate(self._nombres)]
+
+    def columna(self, campo):
+        ancho = len(self.campos)
+        return [centavos / 100 for centavos in self._montos[self.campos.index(campo)::ancho]]
@@ -0,0 +1,53 @@
+# Calificación por lotes (CSV de asistentes a los talleres)
+#
+# Versión vectorizada de calculadora.perfil: clasifica todas las filas en una
+# sola pasada con NumPy (searchsorted sobre los cortes de las reglas), sin
+# recorrerlas una a una. Los montos en texto se leen con calculadora.moneda,
+# igual que en la app.
+import numpy as np
+import pandas as pd
+
+from calculadora import moneda, reglas
+
+COLUMNAS = ["ingresos", "gastos", "activos", "pasivos"]
+
+
+def clasificar_lote(patrimonio_neto, flujo_caja, regla=None):
+    # Devuelve el índice de cada fila en regla.niveles (0 = el nivel más alto)
+    return (regla or reglas.obtener_reglas()).clasificar_lote(patrimonio_neto, flujo_caja)
+
+
+def calificar_dataframe(df, formato=None):
+    # Las hojas de cálculo suelen traer montos como texto ("$5,000.00",
+    # "$(3,000.00)", "1.234,56"); las celdas vacías cuentan como 0
+    faltantes = [c for c in COLUMNAS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+    valores = {c: serie.fillna(0.0).to_numpy() for c, serie in moneda.leer_columnas(df, COLUMNAS, formato).items()}
+    flujo_caja = valores["ingresos"] - valores["gastos"]
+    patrimonio_neto = valores["activos"] - valores["pasivos"]
+    regla = reglas.obtener_reglas()
+    codigos = clasificar_lote(patrimonio_neto, flujo_caja, regla)
+    resultado = df.copy()
+    resultado["flujo_caja"] = np.round(flujo_caja, 2)
+    resultado["patrimonio_neto"] = np.round(patrimonio_neto, 2)
+    resultado["perfil"] = pd.Categorical.from_codes(codigos, categories=regla.niveles)
+    return resultado
+
+
+def calificar_csv(entrada, salida, formato=None):
+    # Primero como números, que es lo más rápido; las columnas con montos en
+    # texto ("$5,000.00") quedan como texto. Si el formato es europeo, las
+    # que pandas leyó como números se vuelven a leer como texto: "180.000"
+    # son 180000, no 180.0.
+    df = pd.read_csv(entrada)
+    presentes = [c for c in COLUMNAS if c in df.columns]
+    numericas = [c for c in presentes if df[c].dtype.kind in "iufb"]
+    if numericas and (formato is moneda.FORMATO_EU or formato is None and len(numericas) < len(presentes)
+                      and moneda.elegir_formato(df, presentes) is moneda.FORMATO_EU):
+        if hasattr(entrada, "seek"):
+            entrada.seek(0)
+        df[numericas] = pd.read_csv(entrada, usecols=numericas, dtype=str)
+    resultado = calificar_dataframe(df, formato)
+    resultado.to_csv(salida, index=False)
+    return resultado
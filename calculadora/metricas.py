@@ -0,0 +1,208 @@
+# Métricas del proceso: tiempos por etapa y contadores
+#
+# Cada etapa (una re-ejecución de la página, una consulta a la base de datos,
+# una llamada a OpenAI, un PDF...) guarda su conteo, su suma y las últimas
+# MUESTRAS duraciones, de las que salen p50 y p95 al consultarlas. Registrar
+# una duración cuesta un perf_counter y un append bajo un lock, así que las
+# métricas quedan siempre activas. Se leen como tabla en la app (con
+# CALCULADORA_TIEMPOS) o en formato de texto de Prometheus en /metrics, con
+# un servidor HTTP que se levanta si se define CALCULADORA_METRICAS_PUERTO.
+import functools
+import math
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MUESTRAS = int(os.environ.get("CALCULADORA_METRICAS_MUESTRAS", 1024))
+PUERTO = os.environ.get("CALCULADORA_METRICAS_PUERTO")
+CUANTILES = (0.5, 0.95)
+PREFIJO = "calculadora"
+
+
+class _Etapa:
+    __slots__ = ("muestras", "conteo", "suma", "errores")
+
+    def __init__(self, muestras):
+        self.muestras = deque(maxlen=muestras)
+        self.conteo = 0
+        self.suma = 0.0
+        self.errores = 0
+
+
+class Cronometro:
+    # Context manager de una etapa; una excepción cuenta como error de la
+    # etapa y se deja pasar
+    __slots__ = ("_metricas", "_etapa", "_inicio")
+
+    def __init__(self, metricas, etapa):
+        self._metricas = metricas
+        self._etapa = etapa
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self._metricas.observar(self._etapa, time.perf_counter() - self._inicio, error=tipo is not None)
+        return False
+
+
+def _cuantil(ordenadas, q):
+    # Rango más cercano: el menor valor con al menos q de las muestras debajo
+    return ordenadas[max(math.ceil(q * len(ordenadas)) - 1, 0)]
+
+
+def _etiquetas(etiquetas):
+    return ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metricas:
+    def __init__(self, muestras=MUESTRAS):
+        self.muestras = muestras
+        self._etapas = {}
+        # (nombre, ((etiqueta, valor), ...)) -> total
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def observar(self, etapa, segundos, error=False):
+        with self._lock:
+            datos = self._etapas.get(etapa)
+            if datos is None:
+                datos = self._etapas[etapa] = _Etapa(self.muestras)
+            datos.muestras.append(segundos)
+            datos.conteo += 1
+            datos.suma += segundos
+            if error:
+                datos.errores += 1
+
+    def medir(self, etapa):
+        return Cronometro(self, etapa)
+
+    def contar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def etapas(self):
+        # [{etapa, conteo, errores, p50_ms, p95_ms, max_ms, total_s}] de las
+        # últimas muestras de cada etapa, la más lenta (p95) primero
+        with self._lock:
+            copia = [(etapa, sorted(datos.muestras), datos.conteo, datos.errores, datos.suma)
+                     for etapa, datos in self._etapas.items()]
+        filas = [{
+            "etapa": etapa,
+            "conteo": conteo,
+            "errores": errores,
+            "p50_ms": _cuantil(muestras, 0.5) * 1000,
+            "p95_ms": _cuantil(muestras, 0.95) * 1000,
+            "max_ms": muestras[-1] * 1000,
+            "total_s": suma
+        } for etapa, muestras, conteo, errores, suma in copia]
+        return sorted(filas, key=lambda fila: fila["p95_ms"], reverse=True)
+
+    def contadores(self):
+        # [{nombre, etiquetas, total}]
+        with self._lock:
+            return [{"nombre": nombre, "etiquetas": dict(etiquetas), "total": total}
+                    for (nombre, etiquetas), total in sorted(self._contadores.items())]
+
+    def texto_prometheus(self):
+        lineas = [
+            f"# HELP {PREFIJO}_etapa_segundos Duración de cada etapa (cuantiles de las últimas {self.muestras} muestras)",
+            f"# TYPE {PREFIJO}_etapa_segundos summary"
+        ]
+        with self._lock:
+            copia = [(etapa, sorted(datos.muestras), datos.conteo, datos.errores, datos.suma)
+                     for etapa, datos in sorted(self._etapas.items())]
+            contadores = sorted(self._contadores.items())
+        for etapa, muestras, conteo, _, suma in copia:
+            etiqueta = f'etapa="{_escapar(etapa)}"'
+            for q in CUANTILES:
+                lineas.append(f'{PREFIJO}_etapa_segundos{{{etiqueta},quantile="{q}"}} {_cuantil(muestras, q):.6f}')
+            lineas.append(f"{PREFIJO}_etapa_segundos_sum{{{etiqueta}}} {suma:.6f}")
+            lineas.append(f"{PREFIJO}_etapa_segundos_count{{{etiqueta}}} {conteo}")
+        lineas.append(f"# HELP {PREFIJO}_etapa_errores_total Ejecuciones de cada etapa que terminaron en excepción")
+        lineas.append(f"# TYPE {PREFIJO}_etapa_errores_total counter")
+        for etapa, _, _, errores, _ in copia:
+            lineas.append(f'{PREFIJO}_etapa_errores_total{{etapa="{_escapar(etapa)}"}} {errores}')
+        tipos = set()
+        for (nombre, etiquetas), total in contadores:
+            if nombre not in tipos:
+                tipos.add(nombre)
+                lineas.append(f"# TYPE {PREFIJO}_{nombre}_total counter")
+            etiqueta = f"{{{_etiquetas(etiquetas)}}}" if etiquetas else ""
+            lineas.append(f"{PREFIJO}_{nombre}_total{etiqueta} {total}")
+        return "\n".join(lineas) + "\n"
+
+    def reiniciar(self):
+        with self._lock:
+            self._etapas.clear()
+            self._contadores.clear()
+
+
+_metricas = None
+_metricas_lock = threading.Lock()
+
+
+def obtener_metricas():
+    global _metricas
+    if _metricas is None:
+        with _metricas_lock:
+            if _metricas is None:
+                _metricas = Metricas()
+    return _metricas
+
+
+def medir(etapa):
+    # with metricas.medir("Reporte PDF"): ...
+    return obtener_metricas().medir(etapa)
+
+
+def medido(etapa):
+    # Decorador: mide cada llamada a la función como la etapa dada
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with obtener_metricas().medir(etapa):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def observar(etapa, segundos, error=False):
+    obtener_metricas().observar(etapa, segundos, error)
+
+
+def contar(nombre, valor=1, **etiquetas):
+    obtener_metricas().contar(nombre, valor, **etiquetas)
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = obtener_metricas().texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def servir(puerto, direccion="0.0.0.0"):
+    # Servidor de /metrics en un hilo aparte; devuelve el servidor para poder
+    # apagarlo (shutdown)
+    servidor = ThreadingHTTPServer((direccion, int(puerto)), _ManejadorMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+    return servidor
@@ -0,0 +1,192 @@
+# Formato y lectura de valores monetarios
+#
+# El lector hace una sola pasada con str.translate (tabla precompilada por
+# formato) y deja que float()/Decimal() validen el resultado. Entiende
+# negativos con signo menos o entre paréntesis, como "$(3,000.00)" en la
+# tabla de ejemplo, y separadores configurables ("1.234,56"). Si el texto
+# no se puede interpretar, se descarta todo lo que no sea dígito o punto,
+# como hacía la versión anterior. Para archivos (lote, inmuebles) está la
+# lectura estricta, que además revisa la agrupación de miles y rechaza lo que
+# no sea un monto en el formato: "1.234,56" no se lee como 1.23456 en
+# FORMATO_US, y leer_columnas elige el formato que lee todas las celdas.
+# leer_columnas trabaja por columnas con pandas (validar con str.fullmatch,
+# limpiar con str.replace y convertir con astype), sin recorrer celdas.
+import math
+import re
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+_NO_NUMERICO = re.compile(r'[^\d.]')
+
+
+class FormatoMoneda:
+    def __init__(self, separador_miles=",", separador_decimal=".", simbolo="$"):
+        if separador_miles == separador_decimal:
+            raise ValueError("Los separadores de miles y de decimales deben ser distintos")
+        self.separador_miles = separador_miles
+        self.separador_decimal = separador_decimal
+        self.simbolo = simbolo
+        tabla = {ord(c): None for c in f"  \t){separador_miles}{simbolo}"}
+        tabla[ord("(")] = "-"
+        tabla[ord(separador_decimal)] = "."
+        self._lectura = tabla
+        self._escritura = str.maketrans({",": separador_miles, ".": separador_decimal})
+        self._estandar = (separador_miles, separador_decimal) == (",", ".")
+        miles, decimal, signo = (re.escape(c) for c in (separador_miles, separador_decimal, simbolo))
+        # Un monto con a lo más un signo: "1,234.50", "-$1,234.50", "$-1,234.50",
+        # "$(1,234.50)". Sólo dígitos ASCII y clases que entienden tanto re
+        # como el motor de pandas/pyarrow.
+        espacio = "[ \t\u00a0]*"
+        monto = rf"(?:[0-9]+|[0-9]{{1,3}}(?:{miles}[0-9]{{3}})+)(?:{decimal}[0-9]*)?|{decimal}[0-9]+"
+        nucleo = (rf"(?:(?:[-+]{espacio})?(?:{signo}{espacio})?|{signo}{espacio}[-+]{espacio})(?:{monto})"
+                  rf"|(?:[-+]{espacio})?(?:{monto}){espacio}{signo}"
+                  rf"|(?:{signo}{espacio})?\({espacio}(?:{signo}{espacio})?(?:{monto}){espacio}\)")
+        self._estricto = re.compile(rf"{espacio}(?:{nucleo}){espacio}")
+        # Lo mismo, pero también acepta celdas vacías o sólo con espacios
+        self._celda = rf"{espacio}(?:{nucleo})?{espacio}"
+        # Lo que se quita antes de convertir un monto ya validado
+        self._sobrante = f"[{miles}{signo} \t\u00a0)]"
+
+    def limpiar(self, texto):
+        # "$(1,234.50)" -> "-1234.50"; no valida el resultado
+        return texto.translate(self._lectura)
+
+    def leer(self, texto):
+        # Devuelve Decimal; texto vacío -> Decimal(0)
+        if not texto:
+            return Decimal(0)
+        try:
+            valor = Decimal(self.limpiar(texto))
+        except InvalidOperation:
+            return _leer_permisivo(texto, self)
+        # Decimal acepta "NaN" e "Infinity"; no son montos
+        return valor if valor.is_finite() else _leer_permisivo(texto, self)
+
+    def leer_float(self, texto):
+        if not texto:
+            return 0.0
+        try:
+            valor = float(self.limpiar(texto))
+        except ValueError:
+            return float(_leer_permisivo(texto, self))
+        return valor if math.isfinite(valor) else float(_leer_permisivo(texto, self))
+
+    def leer_estricto(self, texto):
+        # Como leer_float, sin la lectura permisiva: ValueError si el texto
+        # no es un monto en este formato
+        if not self._estricto.fullmatch(texto):
+            raise ValueError(f"'{texto}' no es un monto válido")
+        valor = float(self.limpiar(texto))
+        if not math.isfinite(valor):
+            raise ValueError(f"'{texto}' no es un monto válido")
+        return valor
+
+    def escribir(self, valor, parentesis=False):
+        if not valor:
+            return f"{self.simbolo}0.00".translate(self._escritura)
+        if parentesis and valor < 0:
+            texto = f"{self.simbolo}({-valor:,.2f})"
+        else:
+            texto = f"{self.simbolo}{valor:,.2f}"
+        return texto if self._estandar else texto.translate(self._escritura)
+
+
+def _leer_permisivo(texto, formato):
+    texto = texto.replace(formato.separador_miles, "").replace(formato.separador_decimal, ".")
+    numero = _NO_NUMERICO.sub("", texto)
+    try:
+        valor = Decimal(numero) if numero else Decimal(0)
+    except InvalidOperation:
+        return Decimal(0)
+    return -valor if "(" in texto or "-" in texto else valor
+
+
+FORMATO_US = FormatoMoneda(",", ".")
+FORMATO_EU = FormatoMoneda(".", ",")
+FORMATOS = {"us": FORMATO_US, "eu": FORMATO_EU}
+# Máximo de celdas que se muestran en el error de leer_columnas
+CELDAS_EN_ERROR = 5
+
+
+def _textos(df, columnas):
+    # {columna: Serie de texto} de las columnas que no son ya numéricas
+    return {c: df[c].astype("str") for c in columnas if df[c].dtype.kind not in "iufb"}
+
+
+def _invalidas(textos, formato):
+    # {columna: máscara de las celdas que no son montos en formato}; las
+    # vacías son válidas
+    return {c: ~(texto.str.fullmatch(formato._celda) | texto.isna()) for c, texto in textos.items()}
+
+
+def _convertir(texto, formato):
+    # Serie de montos ya validados -> float, con NaN en las celdas vacías
+    limpio = texto.str.replace(formato._sobrante, "", regex=True).str.replace("(", "-", regex=False)
+    if formato.separador_decimal != ".":
+        limpio = limpio.str.replace(formato.separador_decimal, ".", regex=False)
+    return limpio.where(limpio != "").astype("float64")
+
+
+def _error(invalidas, textos):
+    celdas = [(c, fila, textos[c][fila]) for c, mascara in invalidas.items()
+              for fila in mascara.index[mascara.to_numpy()]]
+    detalle = ", ".join(f"fila {fila + 2} de '{c}' ({celda!r})" for c, fila, celda in celdas[:CELDAS_EN_ERROR])
+    resto = len(celdas) - CELDAS_EN_ERROR
+    return ValueError(f"{len(celdas)} celda(s) no son montos válidos: {detalle}"
+                      + (f" y {resto} más" if resto > 0 else ""))
+
+
+def elegir_formato(df, columnas):
+    # FORMATO_US, o FORMATO_EU si sólo con él todas las celdas de texto de
+    # las columnas son montos; ValueError con las celdas que no lo son en el
+    # formato que menos falla
+    textos = _textos(df, columnas)
+    menos = None
+    for formato in (FORMATO_US, FORMATO_EU):
+        invalidas = _invalidas(textos, formato)
+        cuantas = sum(int(mascara.sum()) for mascara in invalidas.values())
+        if not cuantas:
+            return formato
+        if menos is None or cuantas < menos[0]:
+            menos = (cuantas, invalidas)
+    raise _error(menos[1], textos)
+
+
+def leer_columnas(df, columnas, formato=None):
+    # {columna: Serie float} de las columnas de montos de df (texto o
+    # números), con NaN en las celdas vacías. Sin formato se usa FORMATO_US,
+    # o FORMATO_EU si sólo con él se leen todas las celdas; el formato se
+    # decide con las máscaras de validación, sin convertir dos veces. Las
+    # celdas que no son montos dan ValueError con su fila (la fila 1 del
+    # archivo son los encabezados) en vez de leerse como 0.
+    textos = _textos(df, columnas)
+    if formato is None:
+        formato = elegir_formato(df, list(textos))
+    else:
+        invalidas = _invalidas(textos, formato)
+        if any(mascara.any() for mascara in invalidas.values()):
+            raise _error(invalidas, textos)
+    leidas = {}
+    for c in columnas:
+        serie = _convertir(textos[c], formato) if c in textos else df[c].astype("float64")
+        # Con cientos de dígitos un monto válido desborda a infinito
+        infinitas = np.isinf(serie.to_numpy())
+        if c in textos and infinitas.any():
+            raise _error({c: pd.Series(infinitas, index=serie.index)}, textos)
+        leidas[c] = serie
+    return leidas
+
+
+def format_currency(value):
+    # Formato por defecto (FORMATO_US); para otros formatos usar formato.escribir()
+    return f"${value:,.2f}" if value else "$0.00"
+
+
+def parse_currency(currency_str, formato=FORMATO_US):
+    return formato.leer_float(currency_str)
+
+
+def parse_money(currency_str, formato=FORMATO_US):
+    return formato.leer(currency_str)
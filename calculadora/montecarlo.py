@@ -0,0 +1,118 @@
+# Simulación Monte Carlo del retiro
+#
+# Simula miles de trayectorias de rendimiento, inflación y ocupación de los
+# inmuebles en arriendo, año por año y todas a la vez con NumPy. Las
+# trayectorias se reparten en bloques de tamaño fijo, cada uno con su propia
+# semilla derivada de la semilla principal, así el resultado es el mismo se
+# ejecute en un solo proceso o repartido en un pool de procesos.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from calculadora.retiro import EDAD_FINAL
+
+TAMANO_BLOQUE = 25_000
+# Por debajo de este número de trayectorias no compensa repartir entre procesos
+UMBRAL_PROCESOS = 200_000
+PERCENTILES = (10, 50, 90)
+
+SUPUESTOS = {
+    "rendimiento": 0.07,
+    "volatilidad": 0.12,
+    "inflacion": 0.03,
+    "volatilidad_inflacion": 0.015,
+    "ocupacion": 0.92,
+    "volatilidad_ocupacion": 0.08
+}
+
+
+def _simular_bloque(semilla, rutas, edad_actual, edad_retiro, edad_final,
+                    ahorros_actuales, aporte_anual, gasto_anual, renta_anual, supuestos):
+    rng = np.random.default_rng(semilla)
+    años = edad_final - edad_actual
+    saldo = np.full(rutas, float(ahorros_actuales))
+    agotado = np.zeros(rutas, dtype=bool)
+    agotados_por_año = np.zeros(años, dtype=np.int64)
+    suma_saldos = np.zeros(años)
+    saldo_retiro = saldo.copy()
+
+    for año in range(años):
+        edad = edad_actual + año
+        rendimiento = rng.normal(supuestos["rendimiento"], supuestos["volatilidad"], rutas)
+        inflacion = rng.normal(supuestos["inflacion"], supuestos["volatilidad_inflacion"], rutas)
+        ocupacion = np.clip(rng.normal(supuestos["ocupacion"], supuestos["volatilidad_ocupacion"], rutas), 0.0, 1.0)
+        real = (1.0 + rendimiento) / (1.0 + inflacion) - 1.0
+
+        flujo = renta_anual * ocupacion
+        if edad < edad_retiro:
+            flujo += aporte_anual
+        else:
+            flujo -= gasto_anual
+        saldo = saldo * (1.0 + real) + flujo
+
+        agotado |= saldo < 0
+        saldo[agotado] = 0.0
+        agotados_por_año[año] = agotado.sum()
+        suma_saldos[año] = saldo.sum()
+        if edad + 1 == edad_retiro:
+            saldo_retiro = saldo.copy()
+
+    return agotados_por_año, suma_saldos, saldo_retiro, saldo
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool(procesos):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: el servidor de Streamlit tiene hilos y fork no es seguro ahí
+            _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def simular_retiro(edad_actual, edad_retiro, ahorros_actuales, aporte_anual, gasto_anual,
+                   renta_anual=0.0, rutas=100_000, semilla=None, procesos=None,
+                   edad_final=EDAD_FINAL, **supuestos):
+    # Montos anuales en dinero de hoy. procesos=1 fuerza la ejecución en línea.
+    parametros = {**SUPUESTOS, **supuestos}
+    edad_actual, edad_retiro, edad_final = int(edad_actual), int(edad_retiro), int(edad_final)
+    if edad_final <= edad_actual:
+        raise ValueError("La edad final debe ser mayor que la edad actual")
+
+    bloques = [min(TAMANO_BLOQUE, rutas - inicio) for inicio in range(0, rutas, TAMANO_BLOQUE)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(bloques))
+    argumentos = [
+        (s, n, edad_actual, edad_retiro, edad_final, ahorros_actuales,
+         aporte_anual, gasto_anual, renta_anual, parametros)
+        for s, n in zip(semillas, bloques)
+    ]
+
+    procesos = procesos or os.cpu_count() or 1
+    if procesos > 1 and rutas >= UMBRAL_PROCESOS and len(bloques) > 1:
+        pool = _obtener_pool(procesos)
+        resultados = list(pool.map(_simular_bloque, *zip(*argumentos)))
+    else:
+        resultados = [_simular_bloque(*a) for a in argumentos]
+
+    agotados = sum(r[0] for r in resultados)
+    suma_saldos = sum(r[1] for r in resultados)
+    saldo_retiro = np.concatenate([r[2] for r in resultados])
+    saldo_final = np.concatenate([r[3] for r in resultados])
+
+    prob_agotado = agotados / rutas
+    return {
+        "edades": np.arange(edad_actual + 1, edad_final + 1),
+        "prob_agotado": prob_agotado,
+        "probabilidad_exito": 1.0 - prob_agotado[-1],
+        "saldo_medio": suma_saldos / rutas,
+        "saldo_retiro": dict(zip(PERCENTILES, np.percentile(saldo_retiro, PERCENTILES))),
+        "saldo_final": dict(zip(PERCENTILES, np.percentile(saldo_final, PERCENTILES))),
+        "rutas": rutas,
+        "semilla": semilla
+    }
@@ -0,0 +1,58 @@
+# Perfil de inversión en bienes raíces
+#
+# Núcleo de clasificación sin dependencias de la interfaz: lo usan la app,
+# el reporte PDF y la calificación por lotes (calculadora.lote). Los niveles,
+# sus umbrales y sus textos vienen de las reglas (calculadora.reglas).
+from calculadora import reglas
+from calculadora.moneda import format_currency
+
+
+def clasificar(patrimonio_neto, flujo_caja):
+    return reglas.obtener_reglas().clasificar(patrimonio_neto, flujo_caja)
+
+
+def calificar(ingresos, gastos, activos, pasivos):
+    flujo_caja = ingresos - gastos
+    patrimonio_neto = activos - pasivos
+    regla = reglas.obtener_reglas()
+    nivel = regla.clasificar(patrimonio_neto, flujo_caja)
+    return {
+        "flujo_caja": flujo_caja,
+        "patrimonio": patrimonio_neto,
+        "nivel": nivel,
+        **regla.perfiles[nivel]
+    }
+
+
+def perfil_retiro(patrimonio_neto, flujo_caja):
+    # Nivel y recomendaciones de la proyección de retiro
+    regla = reglas.obtener_reglas()
+    nivel = regla.clasificar(patrimonio_neto, flujo_caja)
+    return {"nivel": nivel, **regla.perfiles[nivel]["retiro"]}
+
+
+def resumen(ingresos, gastos, activos, pasivos):
+    calificacion = calificar(ingresos, gastos, activos, pasivos)
+    flujo_caja = calificacion["flujo_caja"]
+    patrimonio_neto = calificacion["patrimonio"]
+    return f"""
+        Situación Financiera Actual:
+        - Ingresos Mensuales: {format_currency(ingresos)}
+        - Gastos Mensuales: {format_currency(gastos)}
+        - Flujo de Caja: {format_currency(flujo_caja)} ({'Positivo' if flujo_caja > 0 else 'Negativo'})
+        - Activos Totales: {format_currency(activos)}
+        - Pasivos Totales: {format_currency(pasivos)}
+        - Patrimonio Neto: {format_currency(patrimonio_neto)} ({'Positivo' if patrimonio_neto > 0 else 'Negativo'})
+        
+        Perfil de Inversión en Bienes Raíces: {calificacion["perfil"]}
+        {calificacion["descripcion"]}
+        """
+
+
+def analisis_reporte(ingresos, gastos, activos, pasivos):
+    # La parte del análisis que va al reporte PDF
+    calificacion = calificar(ingresos, gastos, activos, pasivos)
+    return {
+        "perfil_inversion": {"nivel": calificacion["perfil"], "descripcion": calificacion["descripcion"]},
+        "resumen": resumen(ingresos, gastos, activos, pasivos)
+    }
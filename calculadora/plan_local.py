@@ -0,0 +1,216 @@
+# Plan de trabajo sin conexión
+#
+# Arma las siete secciones que se le piden a la IA (ver ia.construir_prompt) a
+# partir de plantillas y de los indicadores del usuario: tasa de ahorro,
+# endeudamiento, meses de gastos cubiertos por el patrimonio y nivel del
+# perfil. No usa la red y tarda menos de un milisegundo, así que sirve como
+# primera respuesta mientras llega el plan de la IA y como respaldo cuando la
+# IA no está configurada, falla o rechaza la solicitud por límite de uso.
+from calculadora import metricas, reglas
+from calculadora.moneda import format_currency
+
+# Fracción del flujo de caja positivo que el plan propone ahorrar para invertir
+FRACCION_AHORRO = 0.5
+# Fracción del flujo de caja que se destina a pagar deudas
+FRACCION_DEUDAS = 0.3
+PORCENTAJE_CUOTA_INICIAL = 0.2
+
+SECCIONES = [
+    "Diagnóstico de la situación actual",
+    "Estrategias para mejorar flujo de caja",
+    "Plan de reducción de deudas",
+    "Recomendaciones de inversión personalizadas",
+    "Metas a corto, mediano y largo plazo",
+    "Ejercicios prácticos",
+    "Recomendaciones de cursos"
+]
+
+# (tasa de ahorro mínima, texto): se usa el primer tramo que se cumple
+TRAMOS_AHORRO = [
+    (0.20, "Ahorras {tasa_ahorro} de tus ingresos: es una base sólida para invertir."),
+    (0.10, "Ahorras {tasa_ahorro} de tus ingresos: vas bien, pero conviene llegar al 20%."),
+    (0.0, "Ahorras apenas {tasa_ahorro} de tus ingresos: el margen para invertir es estrecho."),
+    (float("-inf"), "Gastas más de lo que ganas: cada mes te faltan {deficit}.")
+]
+# (endeudamiento máximo, texto)
+TRAMOS_DEUDA = [
+    (0.0, "No tienes deudas registradas."),
+    (0.30, "Tus deudas equivalen al {endeudamiento} de tus activos: un nivel manejable."),
+    (0.60, "Tus deudas equivalen al {endeudamiento} de tus activos: conviene bajarlas antes de endeudarte más."),
+    (float("inf"), "Tus deudas equivalen al {endeudamiento} de tus activos: reducirlas es la prioridad.")
+]
+
+ESTRATEGIAS_FLUJO = {
+    "deficit": [
+        "Registra todos tus gastos durante 30 días y elimina los que no sean esenciales.",
+        "Recorta gastos o suma ingresos por al menos {deficit} al mes para volver a un flujo positivo.",
+        "Busca un ingreso adicional (horas extra, servicios independientes, arriendo de una habitación)."
+    ],
+    "ajustado": [
+        "Fija un presupuesto mensual y separa el ahorro apenas recibes tus ingresos.",
+        "Un recorte del 10% en tus gastos liberaría {recorte} al mes para ahorrar.",
+        "Renegocia servicios fijos (telefonía, seguros, suscripciones) una vez al año."
+    ],
+    "holgado": [
+        "Automatiza una transferencia de {ahorro_mensual} al mes a una cuenta exclusiva para inversión.",
+        "Mantén tus gastos estables aunque aumenten tus ingresos: el excedente va a inversión.",
+        "Evalúa convertir parte de tus activos en inmuebles que generen renta mensual."
+    ]
+}
+
+INVERSION = {
+    "alto": [
+        "Tu perfil permite buscar propiedades generadoras de renta (apartamentos en arriendo o locales comerciales).",
+        "Usa tu patrimonio como respaldo para financiar con crédito hipotecario, manteniendo la cuota por debajo del 30% de tus ingresos.",
+        "Diversifica: combina renta residencial con una propiedad comercial o de renta vacacional."
+    ],
+    "medio": [
+        "Comienza con una propiedad pequeña o con una co-inversión para compartir el capital y el riesgo.",
+        "Revisa remates bancarios y ventas de dueño directo para comprar por debajo del valor de mercado.",
+        "Antes de comprar, verifica que el arriendo esperado cubra la cuota, la administración y los impuestos."
+    ],
+    "bajo": [
+        "Todavía no es momento de comprar: primero fortalece tu flujo de caja y tu fondo de emergencia.",
+        "Aprende a analizar inversiones con ejemplos reales (arriendo, gastos, rentabilidad) sin arriesgar dinero.",
+        "Considera alternativas de bajo capital, como el arriendo de una habitación o la compra con opción de compra."
+    ]
+}
+
+EJERCICIOS = [
+    "Haz una lista de tus gastos del último mes y clasifícalos en esenciales y prescindibles.",
+    "Calcula la rentabilidad de una propiedad de tu zona: (arriendo anual - gastos anuales) / precio.",
+    "Visita o revisa en línea tres propiedades por semana y anota su precio por metro cuadrado.",
+    "Escribe tu meta de inversión a 5 años con un monto y una fecha concretos."
+]
+
+
+def texto_plan(analisis, finanzas):
+    # El análisis de la sesión guarda el texto de la IA o None cuando el plan
+    # es el local: no se guarda y se vuelve a armar con las cifras
+    if "plan_trabajo" not in analisis:
+        return None
+    plan = analisis["plan_trabajo"]
+    if plan is None:
+        plan = generar_plan(finanzas["ingresos"], finanzas["gastos"], finanzas["activos"], finanzas["pasivos"])
+    return plan
+
+
+def indicadores(ingresos, gastos, activos, pasivos):
+    flujo_caja = ingresos - gastos
+    patrimonio = activos - pasivos
+    return {
+        "flujo_caja": flujo_caja,
+        "patrimonio": patrimonio,
+        "tasa_ahorro": flujo_caja / ingresos if ingresos > 0 else (0.0 if flujo_caja >= 0 else float("-inf")),
+        "endeudamiento": pasivos / activos if activos > 0 else (float("inf") if pasivos > 0 else 0.0),
+        "meses_cubiertos": patrimonio / gastos if gastos > 0 else 0.0,
+        "ahorro_mensual": max(flujo_caja, 0.0) * FRACCION_AHORRO,
+        "pago_deudas": max(flujo_caja, 0.0) * FRACCION_DEUDAS
+    }
+
+
+def _tramo(tramos, valor, minimo=True):
+    for limite, texto in tramos:
+        if (valor >= limite) if minimo else (valor <= limite):
+            return texto
+    return tramos[-1][1]
+
+
+def _porcentaje(valor):
+    return "más del 999%" if valor == float("inf") else f"{valor:.0%}"
+
+
+def _categoria_nivel(regla, nivel):
+    # Las reglas pueden renombrar o agregar niveles; se usa la posición
+    posicion = regla.niveles.index(nivel)
+    if nivel == regla.nivel_base:
+        return "bajo"
+    return "alto" if posicion == 0 else "medio"
+
+
+def _seccion(numero, titulo, lineas):
+    return f"**{numero}. {titulo}**\n\n" + "\n".join(f"- {linea}" for linea in lineas)
+
+
+@metricas.medido("Plan local")
+def generar_plan(ingresos, gastos, activos, pasivos):
+    datos = indicadores(ingresos, gastos, activos, pasivos)
+    regla = reglas.obtener_reglas()
+    nivel = regla.clasificar(datos["patrimonio"], datos["flujo_caja"])
+    perfil = regla.perfiles[nivel]
+    flujo_caja = datos["flujo_caja"]
+    valores = {
+        "tasa_ahorro": _porcentaje(max(datos["tasa_ahorro"], 0.0)),
+        "deficit": format_currency(max(-flujo_caja, 0.0)),
+        "endeudamiento": _porcentaje(datos["endeudamiento"]),
+        "recorte": format_currency(gastos * 0.1),
+        "ahorro_mensual": format_currency(datos["ahorro_mensual"])
+    }
+
+    diagnostico = [
+        f"Ingresos de {format_currency(ingresos)} y gastos de {format_currency(gastos)} al mes: "
+        f"flujo de caja de {format_currency(flujo_caja)}.",
+        _tramo(TRAMOS_AHORRO, datos["tasa_ahorro"]).format(**valores),
+        _tramo(TRAMOS_DEUDA, datos["endeudamiento"], minimo=False).format(**valores),
+        f"Patrimonio neto de {format_currency(datos['patrimonio'])}"
+        + (f", equivalente a {datos['meses_cubiertos']:.1f} meses de gastos." if datos["meses_cubiertos"] > 0 else "."),
+        f"Perfil de inversión: {perfil['perfil']}."
+    ]
+
+    if flujo_caja < 0:
+        estrategias = ESTRATEGIAS_FLUJO["deficit"]
+    elif datos["tasa_ahorro"] < 0.2:
+        estrategias = ESTRATEGIAS_FLUJO["ajustado"]
+    else:
+        estrategias = ESTRATEGIAS_FLUJO["holgado"]
+    estrategias = [texto.format(**valores) for texto in estrategias]
+
+    if pasivos <= 0:
+        deudas = ["No tienes deudas: evita las de consumo y reserva el crédito para comprar activos que generen renta."]
+    elif datos["pago_deudas"] > 0:
+        meses = pasivos / datos["pago_deudas"]
+        deudas = [
+            f"Destina {format_currency(datos['pago_deudas'])} al mes ({FRACCION_DEUDAS:.0%} de tu flujo de caja) a tus deudas: "
+            f"saldarías {format_currency(pasivos)} en unos {meses:.0f} meses, sin contar intereses.",
+            "Paga primero la deuda con la tasa de interés más alta y el mínimo en las demás (método avalancha).",
+            "No abras nuevas tarjetas ni créditos de consumo mientras reduces el saldo."
+        ]
+    else:
+        deudas = [
+            f"Con un flujo de caja negativo no es posible reducir los {format_currency(pasivos)} que debes: "
+            "primero equilibra ingresos y gastos.",
+            "Pide a tus acreedores refinanciar a una tasa menor o a un plazo mayor para bajar las cuotas.",
+            "Paga al menos el mínimo de cada deuda para evitar intereses de mora."
+        ]
+
+    metas = []
+    if datos["ahorro_mensual"] > 0:
+        for plazo, meses in (("Corto plazo (1 año)", 12), ("Mediano plazo (3 años)", 36), ("Largo plazo (5 años)", 60)):
+            acumulado = datos["ahorro_mensual"] * meses
+            metas.append(
+                f"{plazo}: ahorrando {valores['ahorro_mensual']} al mes reúnes {format_currency(acumulado)}, "
+                f"la cuota inicial ({PORCENTAJE_CUOTA_INICIAL:.0%}) de una propiedad de "
+                f"{format_currency(acumulado / PORCENTAJE_CUOTA_INICIAL)}."
+            )
+    else:
+        metas = [
+            "Corto plazo (1 año): lograr un flujo de caja positivo y un fondo de emergencia de 3 meses de gastos.",
+            "Mediano plazo (3 años): ahorrar de forma constante para la cuota inicial de tu primera propiedad.",
+            "Largo plazo (5 años): tener una propiedad que genere renta mensual."
+        ]
+
+    recomendacion = perfil["recomendacion"]
+    cursos = [f"{recomendacion['curso']}: {recomendacion['enlace']}"]
+    cursos += [f"{curso}." for curso in perfil["retiro"]["cursos"]]
+
+    contenido = [
+        diagnostico,
+        estrategias,
+        deudas,
+        INVERSION[_categoria_nivel(regla, nivel)],
+        metas,
+        EJERCICIOS,
+        cursos
+    ]
+    return "\n\n".join(_seccion(n, titulo, lineas)
+                       for n, (titulo, lineas) in enumerate(zip(SECCIONES, contenido), start=1))
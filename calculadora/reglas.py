@@ -0,0 +1,156 @@
+# Reglas del perfil de inversión
+#
+# Los niveles y sus textos viven en un archivo de datos (reglas.toml, o el que
+# indique CALCULADORA_REGLAS) que se carga una vez y se compila en un índice
+# de umbrales ordenados: clasificar es una búsqueda binaria por eje más una
+# consulta a una tabla precalculada, igual para un usuario (la app y el PDF)
+# que para un arreglo completo (calculadora.lote). Si el archivo cambia
+# (mtime), se recarga en la siguiente consulta sin reiniciar la app.
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import toml as tomllib
+
+RUTA_REGLAS = os.environ.get("CALCULADORA_REGLAS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas.toml"))
+REVISAR_CADA = float(os.environ.get("CALCULADORA_REGLAS_REVISAR", 2.0))
+
+CAMPOS_NIVEL = ("nombre", "perfil", "descripcion", "recomendacion", "retiro")
+CAMPOS_RECOMENDACION = ("titulo", "curso", "enlace", "tips")
+CAMPOS_RETIRO = ("recomendaciones", "cursos")
+# La app muestra los tres primeros tips de cada recomendación
+TIPS_MINIMOS = 3
+
+
+class ReglasPerfil:
+    def __init__(self, niveles, origen=None):
+        _validar(niveles)
+        self.origen = origen
+        self.niveles = [n["nombre"] for n in niveles]
+        self.nivel_base = self.niveles[-1]
+        self.perfiles = {
+            n["nombre"]: {"perfil": n["perfil"], "descripcion": n["descripcion"],
+                          "recomendacion": n["recomendacion"], "retiro": n["retiro"]}
+            for n in niveles
+        }
+        self.umbrales = [(n["nombre"], float(n["patrimonio_min"]), float(n["flujo_min"])) for n in niveles[:-1]]
+
+        # Cortes ordenados por eje; un valor "supera" los cortes < valor, así
+        # que bisect_left da en qué tramo cae
+        self.cortes_patrimonio = sorted({p for _, p, _ in self.umbrales})
+        self.cortes_flujo = sorted({f for _, _, f in self.umbrales})
+        tabla = np.full((len(self.cortes_patrimonio) + 1, len(self.cortes_flujo) + 1),
+                        len(self.niveles) - 1, dtype=np.int8)
+        # De menor a mayor prioridad: el nivel más alto que aplica queda encima
+        for indice in range(len(self.umbrales) - 1, -1, -1):
+            _, patrimonio_min, flujo_min = self.umbrales[indice]
+            fila = bisect.bisect_right(self.cortes_patrimonio, patrimonio_min)
+            columna = bisect.bisect_right(self.cortes_flujo, flujo_min)
+            tabla[fila:, columna:] = indice
+        self.tabla = tabla
+        self._tabla = [[self.niveles[i] for i in fila] for fila in tabla]
+
+    def clasificar(self, patrimonio_neto, flujo_caja):
+        fila = bisect.bisect_left(self.cortes_patrimonio, patrimonio_neto)
+        columna = bisect.bisect_left(self.cortes_flujo, flujo_caja)
+        return self._tabla[fila][columna]
+
+    def clasificar_lote(self, patrimonio_neto, flujo_caja):
+        # Índice de cada fila en self.niveles (0 = el nivel más alto)
+        filas = np.searchsorted(self.cortes_patrimonio, np.asarray(patrimonio_neto, dtype=np.float64), side="left")
+        columnas = np.searchsorted(self.cortes_flujo, np.asarray(flujo_caja, dtype=np.float64), side="left")
+        return self.tabla[filas, columnas]
+
+
+def _lista_de_textos(valor, minimo=0):
+    return isinstance(valor, list) and len(valor) >= minimo and all(isinstance(v, str) for v in valor)
+
+
+def _validar(niveles):
+    if not isinstance(niveles, list) or not niveles:
+        raise ValueError("Las reglas no definen ningún nivel")
+    nombres = set()
+    for posicion, nivel in enumerate(niveles, start=1):
+        if not isinstance(nivel, dict):
+            raise ValueError(f"El nivel #{posicion} no es una tabla de campos")
+        etiqueta = nivel.get("nombre", f"#{posicion}")
+        if not isinstance(etiqueta, str):
+            raise ValueError(f"El nombre del nivel #{posicion} debe ser un texto")
+        for seccion in ("recomendacion", "retiro"):
+            if not isinstance(nivel.get(seccion, {}), dict):
+                raise ValueError(f"En el nivel {etiqueta}, {seccion} no es una tabla de campos")
+        faltantes = [c for c in CAMPOS_NIVEL if c not in nivel]
+        faltantes += [f"recomendacion.{c}" for c in CAMPOS_RECOMENDACION if c not in nivel.get("recomendacion", {})]
+        faltantes += [f"retiro.{c}" for c in CAMPOS_RETIRO if c not in nivel.get("retiro", {})]
+        if faltantes:
+            raise ValueError(f"Al nivel {etiqueta} le faltan campos: {', '.join(faltantes)}")
+        if not _lista_de_textos(nivel["recomendacion"]["tips"], TIPS_MINIMOS):
+            raise ValueError(f"El nivel {etiqueta} necesita al menos {TIPS_MINIMOS} textos en recomendacion.tips")
+        for campo in CAMPOS_RETIRO:
+            if not _lista_de_textos(nivel["retiro"][campo]):
+                raise ValueError(f"En el nivel {etiqueta}, retiro.{campo} debe ser una lista de textos")
+        if etiqueta in nombres:
+            raise ValueError(f"El nivel {etiqueta} está repetido")
+        nombres.add(etiqueta)
+        base = posicion == len(niveles)
+        tiene_minimos = "patrimonio_min" in nivel or "flujo_min" in nivel
+        if base and tiene_minimos:
+            raise ValueError(f"El último nivel ({etiqueta}) es el nivel base y no lleva mínimos")
+        if not base:
+            for campo in ("patrimonio_min", "flujo_min"):
+                if not isinstance(nivel.get(campo), (int, float)) or isinstance(nivel.get(campo), bool):
+                    raise ValueError(f"El nivel {etiqueta} necesita un {campo} numérico")
+
+
+def cargar(ruta):
+    if ruta.endswith(".json"):
+        with open(ruta, encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+    else:
+        with open(ruta, "rb") as archivo:
+            contenido = archivo.read()
+        datos = tomllib.loads(contenido.decode("utf-8"))
+    if not isinstance(datos, dict):
+        raise ValueError("El archivo de reglas debe ser un objeto con la lista 'nivel'")
+    return ReglasPerfil(datos.get("nivel", []), origen=ruta)
+
+
+_lock = threading.Lock()
+_estado = {"reglas": None, "firma": None, "revisado": 0.0}
+
+
+def _firma(ruta):
+    info = os.stat(ruta)
+    return info.st_mtime_ns, info.st_size
+
+
+def obtener_reglas():
+    # Revisa el mtime del archivo como mucho cada REVISAR_CADA segundos. Si la
+    # versión nueva tiene errores se sigue usando la anterior.
+    reglas = _estado["reglas"]
+    if reglas is not None and time.monotonic() - _estado["revisado"] < REVISAR_CADA:
+        return reglas
+    with _lock:
+        if _estado["reglas"] is not None and time.monotonic() - _estado["revisado"] < REVISAR_CADA:
+            return _estado["reglas"]
+        firma = None
+        try:
+            firma = _firma(RUTA_REGLAS)
+            if firma != _estado["firma"]:
+                _estado["reglas"] = cargar(RUTA_REGLAS)
+        except (OSError, ValueError) as e:
+            if _estado["reglas"] is None:
+                raise
+            print(f"No se pudieron recargar las reglas de {RUTA_REGLAS}: {e}", file=sys.stderr)
+        # Una versión con errores no se vuelve a intentar hasta que el archivo cambie
+        _estado["firma"] = firma or _estado["firma"]
+        _estado["revisado"] = time.monotonic()
+        return _estado["reglas"]
@@ -0,0 +1,191 @@
+# Reporte PDF
+#
+# Los PDF ya generados se guardan en una caché LRU del proceso indexada por la
+# huella (SHA-256) de los datos del reporte: volver a pedir el mismo reporte
+# no lo vuelve a dibujar. Los gráficos vienen de calculadora.graficos, que los
+# dibuja una sola vez y los comparte con la página. El perfil, el resumen y el
+# plan local no se guardan en la sesión: se derivan de las cifras aquí.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from calculadora import graficos, metricas, perfil, plan_local
+from calculadora.moneda import format_currency
+
+MAX_REPORTES_CACHE = 128
+
+# Las fuentes básicas de FPDF sólo cubren latin-1; el texto de la IA suele
+# traer comillas tipográficas, guiones largos y viñetas
+_EQUIVALENTES = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-", "\u2022": "-", "\u2026": "...", "\u00a0": " "
+})
+
+
+def _texto(texto):
+    return str(texto).translate(_EQUIVALENTES).encode("latin-1", "replace").decode("latin-1")
+
+
+def _insertar_graficos(pdf, rutas):
+    for ruta in rutas:
+        pdf.image(ruta, w=graficos.ANCHO_MM)
+        pdf.ln(3)
+
+
+@metricas.medido("Reporte PDF")
+def generar_pdf(usuario_data, finanzas_data, analisis_data):
+    # fpdf se importa al pedir el primer PDF, no al abrir la app
+    from fpdf import FPDF
+
+    if analisis_data.get('analizado') and finanzas_data.get('ingresos') is not None:
+        analisis_data = {**perfil.analisis_reporte(finanzas_data['ingresos'], finanzas_data['gastos'],
+                                                   finanzas_data['activos'], finanzas_data['pasivos']),
+                         **analisis_data}
+    plan_trabajo = plan_local.texto_plan(analisis_data, finanzas_data)
+    imagenes = graficos.graficos_reporte(finanzas_data, analisis_data)
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    # Encabezado
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(200, 10, txt="Informe Financiero - Taller de Bienes Raíces", ln=1, align='C')
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="Análisis de Inversión en Bienes Raíces", ln=1, align='C')
+    pdf.ln(10)
+
+    # Datos personales
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(200, 10, txt="Datos Personales:", ln=1)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=_texto(f"Nombre: {usuario_data.get('nombre', '')}"), ln=1)
+    pdf.cell(200, 10, txt=_texto(f"Edad: {usuario_data.get('edad', '')}"), ln=1)
+    pdf.cell(200, 10, txt=_texto(f"Email: {usuario_data.get('email', '')}"), ln=1)
+    pdf.ln(5)
+
+    # Datos financieros
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(200, 10, txt="Situación Financiera:", ln=1)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=_texto(f"Ingresos Mensuales: {format_currency(finanzas_data.get('ingresos', 0))}"), ln=1)
+    pdf.cell(200, 10, txt=_texto(f"Gastos Mensuales: {format_currency(finanzas_data.get('gastos', 0))}"), ln=1)
+    pdf.cell(200, 10, txt=_texto(f"Activos Totales: {format_currency(finanzas_data.get('activos', 0))}"), ln=1)
+    pdf.cell(200, 10, txt=_texto(f"Pasivos Totales: {format_currency(finanzas_data.get('pasivos', 0))}"), ln=1)
+    pdf.ln(5)
+    _insertar_graficos(pdf, [ruta for seccion, ruta in imagenes if seccion == "finanzas"])
+
+    # Perfil de inversión
+    if 'perfil_inversion' in analisis_data:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(200, 10, txt=_texto(f"Perfil de Inversión en Bienes Raíces: {analisis_data['perfil_inversion']['nivel']}"), ln=1)
+        pdf.set_font("Arial", size=12)
+        pdf.multi_cell(0, 10, txt=_texto(analisis_data['perfil_inversion']['descripcion']))
+        pdf.ln(5)
+
+    # Análisis
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(200, 10, txt="Análisis y Recomendaciones:", ln=1)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 10, txt=_texto(analisis_data.get('resumen', '')))
+    pdf.ln(5)
+
+    # Plan de pago de deudas
+    if analisis_data.get('deudas'):
+        deudas = analisis_data['deudas']
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(200, 10, txt="Plan de Reducción de Deudas:", ln=1)
+        pdf.set_font("Arial", size=12)
+        pdf.multi_cell(0, 10, txt=_texto(
+            f"Deuda total: {format_currency(deudas['total_deuda'])}, "
+            f"pagando {format_currency(deudas['presupuesto'])} al mes."
+        ))
+        for estrategia in deudas['estrategias'].values():
+            meses = f"{estrategia['meses']} meses" if estrategia['meses'] is not None else "no se salda"
+            pdf.multi_cell(0, 10, txt=_texto(
+                f"- {estrategia['nombre']}: {meses}, intereses de {format_currency(estrategia['intereses'])}. "
+                f"Orden: {', '.join(estrategia['orden'])}."
+            ))
+        pdf.ln(5)
+
+    # Propiedades candidatas
+    if analisis_data.get('inmuebles'):
+        propiedades = analisis_data['inmuebles']
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(200, 10, txt="Propiedades Analizadas:", ln=1)
+        pdf.set_font("Arial", size=12)
+        pdf.multi_cell(0, 10, txt=_texto(
+            f"{propiedades['analizadas']} propiedades analizadas; {propiedades['viables']} cubren la deuda "
+            f"con flujo positivo. Las mejores:"
+        ))
+        for fila in propiedades['mejores']:
+            pdf.multi_cell(0, 10, txt=_texto(
+                f"{fila['puesto']}. {fila['nombre']} ({format_currency(fila['precio'])}): "
+                f"flujo de {format_currency(fila['flujo_mensual'])} al mes, cap rate {fila['cap_rate']:.1%}, "
+                f"cash on cash {fila['cash_on_cash']:.1%}, DSCR {fila['dscr']:.2f}, "
+                f"ocupación de equilibrio {fila['ocupacion_equilibrio']:.0%}."
+            ))
+        pdf.ln(5)
+
+    # Proyección de retiro
+    retiro = [ruta for seccion, ruta in imagenes if seccion == "retiro"]
+    if retiro:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(200, 10, txt="Proyección de Retiro:", ln=1)
+        _insertar_graficos(pdf, retiro)
+        pdf.ln(2)
+
+    # Plan de trabajo
+    if plan_trabajo is not None:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(200, 10, txt="Plan de Trabajo Personalizado:", ln=1)
+        pdf.set_font("Arial", size=12)
+        pdf.multi_cell(0, 10, txt=_texto(plan_trabajo))
+
+    # fpdf (1.7) devuelve str latin-1 y fpdf2 un bytearray
+    salida = pdf.output(dest='S')
+    return salida.encode('latin-1') if isinstance(salida, str) else bytes(salida)
+
+
+def huella(usuario_data, finanzas_data, analisis_data):
+    contenido = json.dumps([usuario_data, finanzas_data, analisis_data],
+                           sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class CacheReportes:
+    def __init__(self, max_entradas=MAX_REPORTES_CACHE):
+        self.max_entradas = max_entradas
+        self._reportes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            pdf = self._reportes.get(clave)
+            if pdf is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._reportes.move_to_end(clave)
+            return pdf
+
+    def guardar(self, clave, pdf):
+        with self._lock:
+            self._reportes[clave] = pdf
+            self._reportes.move_to_end(clave)
+            while len(self._reportes) > self.max_entradas:
+                self._reportes.popitem(last=False)
+
+
+_cache = CacheReportes()
+
+
+def pdf_en_cache(usuario_data, finanzas_data, analisis_data):
+    clave = huella(usuario_data, finanzas_data, analisis_data)
+    pdf = _cache.obtener(clave)
+    if pdf is None:
+        pdf = generar_pdf(usuario_data, finanzas_data, analisis_data)
+        _cache.guardar(clave, pdf)
+    return pdf
@@ -0,0 +1,148 @@
+# Generación masiva de reportes PDF
+#
+# Lee usuarios y finanzas de la base de datos (sólo lectura), dibuja los PDF
+# en un pool de procesos y los escribe en un directorio o en un .zip. Es
+# reanudable: los reportes que ya existen en el destino se omiten, y cada
+# archivo se escribe completo con archivo temporal + rename. El .zip se arma
+# al final desde un directorio de trabajo, así que un proceso interrumpido
+# nunca deja un zip a medias.
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import zipfile
+
+from calculadora import db, reporte
+
+TAMANO_TANDA = 32
+
+
+def nombre_reporte(usuario_id):
+    return f"reporte_{usuario_id:07d}.pdf"
+
+
+def _datos_reporte(fila, partidas):
+    usuario_id, nombre, edad, email, telefono, ingresos, gastos, activos, pasivos = fila
+    usuario = {"nombre": nombre, "edad": edad, "email": email, "telefono": telefono}
+    if ingresos is None:
+        return usuario, {}, {}
+    finanzas = {"ingresos": ingresos, "gastos": gastos, "activos": activos, "pasivos": pasivos,
+                "partidas": partidas}
+    # El perfil y el resumen los deriva reporte.generar_pdf de las cifras
+    return usuario, finanzas, {"analizado": True}
+
+
+def _dibujar(tarea):
+    fila, partidas = tarea
+    try:
+        return fila[0], reporte.generar_pdf(*_datos_reporte(fila, partidas)), None
+    except Exception as e:
+        return fila[0], None, f"{type(e).__name__}: {e}"
+
+
+class DestinoDirectorio:
+    # El directorio se crea con el primer reporte
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def existentes(self):
+        if not os.path.isdir(self.ruta):
+            return set()
+        return {n for n in os.listdir(self.ruta) if n.endswith(".pdf")}
+
+    def escribir(self, nombre, pdf):
+        os.makedirs(self.ruta, exist_ok=True)
+        final = os.path.join(self.ruta, nombre)
+        temporal = final + ".tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(pdf)
+        os.replace(temporal, final)
+
+    def cerrar(self):
+        pass
+
+
+class DestinoZip:
+    # Los PDF van primero a <ruta>.parcial/; al cerrar se agregan a una copia
+    # del zip que reemplaza al original con un rename. Si el proceso muere, el
+    # zip queda como estaba y lo ya dibujado sigue en el directorio de trabajo
+    # para la próxima ejecución.
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._parcial = DestinoDirectorio(ruta + ".parcial")
+        self._en_zip = set()
+        if os.path.exists(ruta):
+            with zipfile.ZipFile(ruta) as archivo:
+                self._en_zip = set(archivo.namelist())
+
+    def existentes(self):
+        return self._en_zip | self._parcial.existentes()
+
+    def escribir(self, nombre, pdf):
+        self._parcial.escribir(nombre, pdf)
+
+    def cerrar(self):
+        nuevos = sorted(self._parcial.existentes() - self._en_zip)
+        if nuevos:
+            temporal = self.ruta + ".tmp"
+            modo = "w"
+            if os.path.exists(self.ruta):
+                shutil.copyfile(self.ruta, temporal)
+                modo = "a"
+            with zipfile.ZipFile(temporal, modo, compression=zipfile.ZIP_DEFLATED) as archivo:
+                for nombre in nuevos:
+                    archivo.write(os.path.join(self._parcial.ruta, nombre), nombre)
+            os.replace(temporal, self.ruta)
+            self._en_zip.update(nuevos)
+        shutil.rmtree(self._parcial.ruta, ignore_errors=True)
+
+
+def _progreso(hechos, total, errores, inicio, salida):
+    duracion = time.perf_counter() - inicio
+    ritmo = hechos / duracion if duracion else 0.0
+    restante = (total - hechos) / ritmo if ritmo else 0.0
+    salida.write(f"\r{hechos}/{total} reportes ({hechos / total:.0%}) · {ritmo:.0f}/s · "
+                 f"faltan ~{restante:.0f} s · errores: {errores}")
+    salida.flush()
+
+
+def generar_reportes(destino, ruta_db=db.RUTA_DB, procesos=None, salida=sys.stderr):
+    # Una ruta equivocada no debe crear una base vacía y reportar "0 usuarios"
+    if not os.path.isfile(ruta_db):
+        raise FileNotFoundError(f"No existe la base de datos {ruta_db}")
+    pool_db = db.PoolConexiones(ruta_db, tamano=1, solo_lectura=True)
+    try:
+        filas = db.usuarios_con_finanzas(pool_db)
+        partidas = db.partidas_por_usuario(pool_db)
+    finally:
+        pool_db.cerrar()
+
+    hechos_antes = destino.existentes()
+    pendientes = [(f, partidas.get(f[0], [])) for f in filas if nombre_reporte(f[0]) not in hechos_antes]
+    salida.write(f"{len(filas)} usuarios, {len(filas) - len(pendientes)} reportes ya generados, "
+                 f"{len(pendientes)} pendientes\n")
+    if not pendientes:
+        # Puede quedar trabajo de una ejecución interrumpida por juntar en el zip
+        destino.cerrar()
+        return {"generados": 0, "omitidos": len(filas), "errores": []}
+
+    errores = []
+    hechos = 0
+    inicio = time.perf_counter()
+    procesos = procesos or os.cpu_count() or 1
+    try:
+        with multiprocessing.get_context("spawn").Pool(procesos) as pool:
+            for usuario_id, pdf, error in pool.imap_unordered(_dibujar, pendientes, chunksize=TAMANO_TANDA):
+                if error is None:
+                    destino.escribir(nombre_reporte(usuario_id), pdf)
+                else:
+                    errores.append((usuario_id, error))
+                hechos += 1
+                if hechos % TAMANO_TANDA == 0 or hechos == len(pendientes):
+                    _progreso(hechos, len(pendientes), len(errores), inicio, salida)
+    finally:
+        destino.cerrar()
+        salida.write("\n")
+
+    return {"generados": hechos - len(errores), "omitidos": len(filas) - len(pendientes), "errores": errores}
@@ -0,0 +1,137 @@
+# Proyección de retiro vectorizada
+#
+# Evalúa rejillas completas de edad de retiro × ahorro anual × rendimiento ×
+# inflación en una sola llamada con broadcasting de NumPy. Todos los montos se
+# expresan en dinero de hoy (se descuenta con el rendimiento real).
+#
+# analizar_proyeccion es el cálculo simple del botón "Calcular proyección"
+# (sin rendimiento ni inflación) con su texto y recomendaciones. Todas las
+# vistas del retiro usan el mismo retiro anual (necesidad_anual).
+import numpy as np
+
+from calculadora import perfil
+from calculadora.moneda import format_currency
+
+EDAD_FINAL = 100
+
+
+def necesidad_anual(ingresos_retiro, gastos_retiro):
+    # Lo que se retira de los ahorros cada año desde la edad de retiro (en
+    # dinero de hoy): los ingresos esperados menos los gastos, como en la
+    # necesidad total de analizar_proyeccion
+    return ingresos_retiro - gastos_retiro
+
+
+def _valor_futuro_anualidad(tasa, periodos):
+    # ((1 + t)^n - 1) / t, con límite n cuando t -> 0
+    tasa, periodos = np.broadcast_arrays(tasa, periodos)
+    casi_cero = np.abs(tasa) < 1e-12
+    segura = np.where(casi_cero, 1.0, tasa)
+    return np.where(casi_cero, periodos, np.expm1(periodos * np.log1p(segura)) / segura)
+
+
+def _valor_presente_anualidad(tasa, periodos):
+    # (1 - (1 + t)^-n) / t, con límite n cuando t -> 0
+    tasa, periodos = np.broadcast_arrays(tasa, periodos)
+    casi_cero = np.abs(tasa) < 1e-12
+    segura = np.where(casi_cero, 1.0, tasa)
+    return np.where(casi_cero, periodos, -np.expm1(-periodos * np.log1p(segura)) / segura)
+
+
+def proyectar_rejilla(edad_actual, ahorros_actuales, necesidad_anual,
+                      edades_retiro, ahorros_anuales, rendimientos, inflaciones,
+                      edad_final=EDAD_FINAL):
+    # Cada resultado tiene forma (edades, ahorros anuales, rendimientos, inflaciones);
+    # los que no dependen del ahorro anual tienen 1 en ese eje.
+    edades = np.asarray(edades_retiro, dtype=np.float64).reshape(-1, 1, 1, 1)
+    aportes = np.asarray(ahorros_anuales, dtype=np.float64).reshape(1, -1, 1, 1)
+    rendimiento = np.asarray(rendimientos, dtype=np.float64).reshape(1, 1, -1, 1)
+    inflacion = np.asarray(inflaciones, dtype=np.float64).reshape(1, 1, 1, -1)
+
+    real = (1.0 + rendimiento) / (1.0 + inflacion) - 1.0
+    años_ahorro = np.maximum(edades - edad_actual, 0.0)
+    años_retiro = np.maximum(edad_final - edades, 0.0)
+
+    crecimiento = np.exp(años_ahorro * np.log1p(real))
+    factor_aportes = _valor_futuro_anualidad(real, años_ahorro)
+    capital_inicial = ahorros_actuales * crecimiento
+    necesidad = necesidad_anual * _valor_presente_anualidad(real, años_retiro)
+    capital = capital_inicial + aportes * factor_aportes
+
+    faltante = np.maximum(necesidad - capital_inicial, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ahorro_necesario = np.where(factor_aportes > 0, faltante / factor_aportes,
+                                    np.where(faltante > 0, np.inf, 0.0))
+
+    return {
+        "capital": capital,
+        "necesidad": necesidad,
+        "brecha": capital - necesidad,
+        "ahorro_necesario_anual": ahorro_necesario,
+        "rendimiento_real": real
+    }
+
+
+def tabla_sensibilidad(edad_actual, ahorros_actuales, necesidad_anual,
+                       edades_retiro, rendimientos, inflacion):
+    # Ahorro anual necesario por edad de retiro (filas) y rendimiento (columnas).
+    # pandas se importa aquí: la app carga este módulo antes de necesitarlo
+    import pandas as pd
+
+    proyeccion = proyectar_rejilla(
+        edad_actual, ahorros_actuales, necesidad_anual,
+        edades_retiro, [0.0], rendimientos, [inflacion]
+    )
+    valores = proyeccion["ahorro_necesario_anual"][:, 0, :, 0]
+    return pd.DataFrame(
+        valores,
+        index=pd.Index(np.asarray(edades_retiro, dtype=int), name="Edad de retiro"),
+        columns=pd.Index([f"{r:.0%}" for r in rendimientos], name="Rendimiento anual")
+    )
+
+
+def trayectoria(edad_actual, edad_retiro, ahorros_actuales, ahorro_anual, necesidad_anual,
+                rendimiento, inflacion, edad_final=EDAD_FINAL):
+    # Capital al inicio de cada edad (en dinero de hoy): se aporta ahorro_anual
+    # hasta la edad de retiro y desde ahí se retira necesidad_anual
+    edades = np.arange(edad_actual, edad_final + 1)
+    real = (1.0 + rendimiento) / (1.0 + inflacion) - 1.0
+    flujos = np.where(edades[:-1] < edad_retiro, ahorro_anual, -necesidad_anual)
+    # c[k+1] = c[k] * (1 + r) + f[k]  ->  c[k] = (1 + r)^k * (c0 + sum(f[j] / (1 + r)^(j+1)))
+    factores = np.power(1.0 + real, np.arange(len(edades), dtype=np.float64))
+    acumulado = np.concatenate(([0.0], np.cumsum(flujos / factores[1:])))
+    capital = factores * (ahorros_actuales + acumulado)
+    return {"edades": edades, "capital": capital}
+
+
+def analizar_proyeccion(edad_actual, edad_retiro, ingresos_retiro, gastos_retiro, ahorros_retiro, patrimonio_neto, flujo_caja):
+    años_ahorro = edad_retiro - edad_actual
+    necesidad_total = necesidad_anual(ingresos_retiro, gastos_retiro) * (100 - edad_retiro)
+    ahorro_necesario_anual = (necesidad_total - ahorros_retiro) / años_ahorro if años_ahorro > 0 else 0
+
+    perfil_retiro = perfil.perfil_retiro(patrimonio_neto, flujo_caja)
+    nivel = perfil_retiro['nivel']
+    recomendaciones = "\n".join(perfil_retiro['recomendaciones'])
+    cursos_recomendados = "\n".join(perfil_retiro['cursos'])
+
+    return {
+        "años_ahorro": años_ahorro,
+        "necesidad_total": necesidad_total,
+        "ahorro_necesario_anual": ahorro_necesario_anual,
+        "nivel_inversion": nivel,
+        "analisis": f"""
+        Proyección de Retiro con Enfoque en Bienes Raíces:
+        - Años hasta el retiro: {años_ahorro}
+        - Necesidad total estimada: {format_currency(necesidad_total)}
+        - Ahorros actuales: {format_currency(ahorros_retiro)}
+        - Necesitas ahorrar aproximadamente {format_currency(ahorro_necesario_anual)} anuales para alcanzar tu meta.
+        
+        Perfil de Inversión: {nivel}
+        
+        Recomendaciones Específicas:
+        {recomendaciones}
+        
+        Cursos Recomendados:
+        {cursos_recomendados}
+        """
+    }
@@ -0,0 +1,196 @@
+# Estado de las sesiones de la app
+#
+# Los datos pesados de cada sesión (libros de partidas y datos del reporte)
+# viven en este registro del proceso y no en st.session_state, que sólo
+# guarda el identificador de la sesión. Así el registro puede medir cuánto
+# ocupa cada sesión y, cuando una lleva INACTIVA_TRAS segundos sin usarse,
+# guardarla comprimida en SQLite y soltarla de la memoria. La siguiente vez
+# que la sesión pide sus datos se recuperan de SQLite sin que el usuario lo
+# note. Las sesiones archivadas que no vuelven en RETENER segundos (la
+# pestaña se cerró) se borran.
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+from calculadora import db
+
+INACTIVA_TRAS = float(os.environ.get("CALCULADORA_SESION_INACTIVA", 15 * 60))
+RETENER = float(os.environ.get("CALCULADORA_SESION_RETENER", 24 * 3600))
+REVISAR_CADA = 60.0
+
+
+def tamano(objeto, vistos=None):
+    # Bytes aproximados de objeto y de todo lo que contiene. Cada objeto se
+    # cuenta una vez por conjunto "vistos": compartirlo entre llamadas evita
+    # contar dos veces lo que comparten varias sesiones.
+    vistos = set() if vistos is None else vistos
+    pendientes = [objeto]
+    total = 0
+    while pendientes:
+        actual = pendientes.pop()
+        if id(actual) in vistos:
+            continue
+        vistos.add(id(actual))
+        total += sys.getsizeof(actual)
+        if isinstance(actual, dict):
+            pendientes.extend(actual.keys())
+            pendientes.extend(actual.values())
+        elif isinstance(actual, (list, tuple, set, frozenset)):
+            pendientes.extend(actual)
+        else:
+            for atributo in getattr(type(actual), "__slots__", ()):
+                if hasattr(actual, atributo):
+                    pendientes.append(getattr(actual, atributo))
+            if hasattr(actual, "__dict__"):
+                pendientes.append(actual.__dict__)
+    return total
+
+
+class RegistroSesiones:
+    def __init__(self, pool=None, inactiva_tras=INACTIVA_TRAS, retener=RETENER, revisar_cada=REVISAR_CADA):
+        self._pool = pool
+        self.inactiva_tras = inactiva_tras
+        self.retener = retener
+        self.revisar_cada = revisar_cada
+        # id -> [datos, último uso (monotonic)]
+        self._sesiones = {}
+        self._lock = threading.Lock()
+        self._revisado = time.monotonic()
+        self.archivadas = 0
+        self.recuperadas = 0
+
+    @property
+    def pool(self):
+        return self._pool or db.obtener_pool()
+
+    def obtener(self, id_sesion):
+        # Datos de la sesión (un dict que la app modifica en su lugar); cada
+        # llamada cuenta como uso. SQLite se lee fuera del lock para no
+        # bloquear a las demás sesiones.
+        self.revisar()
+        with self._lock:
+            entrada = self._sesiones.get(id_sesion)
+            if entrada is not None:
+                entrada[1] = time.monotonic()
+                return entrada[0]
+        datos = self._recuperar(id_sesion)
+        with self._lock:
+            entrada = self._sesiones.get(id_sesion)
+            if entrada is None:
+                entrada = self._sesiones[id_sesion] = [datos, 0.0]
+            else:
+                # Otra llamada de la misma sesión llegó primero (y no encontró
+                # la fila): se conserva su dict y se completa con lo recuperado
+                for clave, valor in datos.items():
+                    entrada[0].setdefault(clave, valor)
+            entrada[1] = time.monotonic()
+            return entrada[0]
+
+    def _recuperar(self, id_sesion):
+        try:
+            with self.pool.conexion() as conn:
+                fila = conn.execute(db.SQL_LEER_SESION, (id_sesion,)).fetchone()
+                if fila is None:
+                    return {}
+                try:
+                    datos = pickle.loads(zlib.decompress(fila[0]))
+                except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError,
+                        ImportError, IndexError, TypeError, ValueError) as e:
+                    # Fila dañada o de otra versión del código: se borra igual
+                    # y la sesión empieza de cero
+                    print(f"La sesión archivada {id_sesion} no se puede leer: {e}", file=sys.stderr)
+                    datos = None
+                with conn:
+                    conn.execute(db.SQL_BORRAR_SESION, (id_sesion,))
+        except sqlite3.Error as e:
+            print(f"No se pudo recuperar la sesión {id_sesion}: {e}", file=sys.stderr)
+            return {}
+        if not isinstance(datos, dict):
+            return {}
+        self.recuperadas += 1
+        return datos
+
+    def revisar(self, forzar=False):
+        # Archiva las sesiones inactivas y purga las archivadas viejas; como
+        # mucho una vez cada revisar_cada segundos
+        ahora = time.monotonic()
+        if not forzar and ahora - self._revisado < self.revisar_cada:
+            return 0
+        with self._lock:
+            if not forzar and ahora - self._revisado < self.revisar_cada:
+                return 0
+            self._revisado = ahora
+            # id -> (datos, último uso) de las inactivas; las vacías se sueltan ya
+            inactivas = {}
+            for id_sesion, (datos, uso) in list(self._sesiones.items()):
+                if ahora - uso >= self.inactiva_tras:
+                    if datos:
+                        inactivas[id_sesion] = (datos, uso)
+                    else:
+                        del self._sesiones[id_sesion]
+        # Serializar y escribir en SQLite sin el lock: las demás sesiones
+        # siguen atendiéndose mientras tanto
+        filas = []
+        for id_sesion, (datos, _) in inactivas.items():
+            try:
+                filas.append((id_sesion, zlib.compress(pickle.dumps(datos, pickle.HIGHEST_PROTOCOL)), time.time()))
+            except (pickle.PicklingError, TypeError, AttributeError, RuntimeError) as e:
+                print(f"La sesión {id_sesion} no se puede archivar: {e}", file=sys.stderr)
+        try:
+            with self.pool.conexion() as conn:
+                with conn:
+                    conn.executemany(db.SQL_ARCHIVAR_SESION, filas)
+                    conn.execute(db.SQL_PURGAR_SESIONES, (time.time() - self.retener,))
+        except sqlite3.Error as e:
+            # Sin base de datos las sesiones se quedan en memoria
+            print(f"No se pudieron archivar las sesiones inactivas: {e}", file=sys.stderr)
+            return 0
+        # Sólo se sueltan las que nadie usó mientras se archivaban; la copia
+        # archivada de las demás ya no sirve
+        usadas = []
+        with self._lock:
+            for id_sesion, _, _ in filas:
+                entrada = self._sesiones.get(id_sesion)
+                if entrada is not None and entrada[1] == inactivas[id_sesion][1]:
+                    del self._sesiones[id_sesion]
+                else:
+                    usadas.append((id_sesion,))
+        if usadas:
+            try:
+                with self.pool.conexion() as conn:
+                    with conn:
+                        conn.executemany(db.SQL_BORRAR_SESION, usadas)
+            except sqlite3.Error as e:
+                print(f"No se pudieron borrar sesiones archivadas en uso: {e}", file=sys.stderr)
+        self.archivadas += len(filas) - len(usadas)
+        return len(filas) - len(usadas)
+
+    def tamano_sesion(self, id_sesion):
+        with self._lock:
+            entrada = self._sesiones.get(id_sesion)
+            return tamano(entrada[0]) if entrada is not None else 0
+
+    def estadisticas(self):
+        with self._lock:
+            vistos = set()
+            tamanos = [tamano(datos, vistos) for datos, _ in self._sesiones.values()]
+        try:
+            with self.pool.conexion() as conn:
+                en_disco, bytes_disco = conn.execute(db.SQL_CONTAR_SESIONES).fetchone()
+        except sqlite3.Error:
+            en_disco, bytes_disco = 0, 0
+        total = sum(tamanos)
+        return {
+            "activas": len(tamanos),
+            "bytes_memoria": total,
+            "bytes_por_sesion": total / len(tamanos) if tamanos else 0.0,
+            "bytes_maximo": max(tamanos, default=0),
+            "archivadas": en_disco,
+            "bytes_archivadas": bytes_disco,
+            "total_archivadas": self.archivadas,
+            "total_recuperadas": self.recuperadas
+        }
@@ -0,0 +1,86 @@
+# Trabajos en segundo plano (generación del plan con IA)
+#
+# Un pool de hilos acotado compartido por todas las sesiones. Cada trabajo
+# acumula el texto que va produciendo para que la interfaz lo muestre
+# mientras se genera; la sesión sólo guarda el id del trabajo.
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_HILOS = int(os.environ.get("CALCULADORA_MAX_HILOS", "4"))
+MAX_POR_USUARIO = int(os.environ.get("CALCULADORA_MAX_POR_USUARIO", "1"))
+MAX_PENDIENTES = int(os.environ.get("CALCULADORA_MAX_PENDIENTES", "64"))
+# Trabajos terminados que nadie recogió se descartan después de este tiempo
+RETENCION_TRABAJOS = 15 * 60
+
+
+class TrabajoRechazado(RuntimeError):
+    pass
+
+
+class Trabajo:
+    def __init__(self, usuario):
+        self.id = uuid.uuid4().hex
+        self.usuario = usuario
+        self.partes = []
+        self.error = None
+        self.terminado = False
+        self.creado = time.time()
+
+    @property
+    def texto(self):
+        return "".join(self.partes)
+
+
+class GestorTrabajos:
+    def __init__(self, max_hilos=MAX_HILOS, max_por_usuario=MAX_POR_USUARIO, max_pendientes=MAX_PENDIENTES):
+        self.max_por_usuario = max_por_usuario
+        self.max_pendientes = max_pendientes
+        self._executor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="calculadora-ia")
+        self._trabajos = {}
+        self._lock = threading.Lock()
+
+    def _activos(self, usuario=None):
+        return [t for t in self._trabajos.values()
+                if not t.terminado and (usuario is None or t.usuario == usuario)]
+
+    def _purgar(self):
+        limite = time.time() - RETENCION_TRABAJOS
+        for trabajo_id in [t.id for t in self._trabajos.values() if t.terminado and t.creado < limite]:
+            del self._trabajos[trabajo_id]
+
+    def enviar(self, usuario, generador, *args):
+        # generador(*args) debe producir fragmentos de texto
+        with self._lock:
+            self._purgar()
+            if len(self._activos(usuario)) >= self.max_por_usuario:
+                raise TrabajoRechazado("Ya tienes un plan en proceso. Espera a que termine.")
+            if len(self._activos()) >= self.max_pendientes:
+                raise TrabajoRechazado("Hay demasiadas solicitudes en este momento. Intenta de nuevo en unos segundos.")
+            trabajo = Trabajo(usuario)
+            self._trabajos[trabajo.id] = trabajo
+        self._executor.submit(self._ejecutar, trabajo, generador, args)
+        return trabajo
+
+    @staticmethod
+    def _ejecutar(trabajo, generador, args):
+        try:
+            for parte in generador(*args):
+                trabajo.partes.append(parte)
+        except Exception as e:
+            trabajo.error = e
+        finally:
+            trabajo.terminado = True
+
+    def obtener(self, trabajo_id):
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def descartar(self, trabajo_id):
+        with self._lock:
+            self._trabajos.pop(trabajo_id, None)
+
+    def apagar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)